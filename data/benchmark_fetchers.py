@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+import osta.__http as http
+import osta.__replay as replay
+from osta.enrich_data import fetch_company_data
+import pandas as pd
+import argparse
+import tempfile
+import time
+
+# Record responses of real servers, or measure fetching of company data
+# with local server that serves recorded responses.
+#
+# python3 data/benchmark_fetchers.py record fixtures 1567535-0 2403929-2
+# python3 data/benchmark_fetchers.py replay fixtures 1567535-0 2403929-2 \
+#     --latency 0.05 --error-rate 0.1 --workers 1 4 8
+parser = argparse.ArgumentParser()
+parser.add_argument("mode", choices=["record", "replay"])
+parser.add_argument("fixture_dir")
+parser.add_argument("bids", nargs="+")
+parser.add_argument("--latency", type=float, default=0)
+parser.add_argument("--error-rate", type=float, default=0)
+parser.add_argument("--workers", type=int, nargs="+", default=[1])
+args = parser.parse_args()
+bids = pd.Series(args.bids)
+
+if args.mode == "record":
+    transport = getattr(replay, "__create_recording_transport")(
+        args.fixture_dir)
+    getattr(http, "__set_transport")(transport)
+    fetch_company_data(bids, only_ltd=True, use_cache=False)
+else:
+    server = getattr(replay, "__start_fixture_server")(
+        args.fixture_dir, latency=args.latency, error_rate=args.error_rate,
+        seed=0)
+    transport = getattr(replay, "__create_server_transport")(server)
+    getattr(http, "__set_transport")(transport)
+    for n_workers in args.workers:
+        # Without cache
+        start = time.perf_counter()
+        fetch_company_data(bids, only_ltd=True, use_cache=False,
+                           n_workers=n_workers, rate_limit=None)
+        duration = time.perf_counter() - start
+        print(f"workers={n_workers} cache=no {duration:.3f}s "
+              f"{len(bids)/duration:.1f} BIDs/s")
+        # With cache, first run fills the cache and second uses it
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for run in ["cold", "warm"]:
+                start = time.perf_counter()
+                fetch_company_data(bids, only_ltd=True, temp_dir=temp_dir,
+                                   n_workers=n_workers, rate_limit=None)
+                duration = time.perf_counter() - start
+                print(f"workers={n_workers} cache={run} {duration:.3f}s "
+                      f"{len(bids)/duration:.1f} BIDs/s")
+    server.shutdown()
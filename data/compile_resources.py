@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+import osta.__resources as resources
+
+# Tables and arguments that are used to load them in package osta
+tables = [
+    ["account_info.csv", {"index_col": 0}],
+    ["land_codes.csv", {"index_col": 0}],
+    ["mandatory_fields.csv", {}],
+    ["municipality_codes.csv", {"index_col": 0}],
+    ["municipality_codes.csv", {"index_col": 0, "dtype": str}],
+    ["municipality_codes.csv", {"index_col": 0, "dtype": "object"}],
+    ["optional_fields.csv", {}],
+    ["service_codes.csv", {"index_col": 0}],
+    ]
+# Create binary artifacts next to CSV files. They are used only when they
+# are created with the same pandas version from the current CSV file.
+for filename, args in tables:
+    path = getattr(resources, "__compile_resource")(filename, **args)
+    print(path)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sqlite3
+import json
+import time
+
+
+def __open_cache(path, timeout=30):
+    """
+    This function opens an on-disk key-value cache (SQLite database). The
+    database can be used by several processes at the same time.
+    Input: path of the database file, seconds to wait if database is locked
+    Output: sqlite3.Connection
+    """
+    con = sqlite3.connect(path, timeout=timeout)
+    # Write-ahead log lets readers and a writer work at the same time
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS cache ("
+        "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+    con.commit()
+    return con
+
+
+def __cache_get_many(con, keys, ttl=None):
+    """
+    This function gets values of multiple keys from the cache. Values that
+    are older than the time-to-live are not returned.
+    Input: sqlite3.Connection, list of keys, time-to-live in days or None
+    (values do not expire)
+    Output: dictionary of found values
+    """
+    res = {}
+    keys = [str(x) for x in keys]
+    # Values created before this time are expired
+    min_time = -1 if ttl is None else time.time() - ttl*24*60*60
+    # Search keys in chunks so that number of variables in a query is
+    # not exceeded
+    chunk_size = 500
+    for i in range(0, len(keys), chunk_size):
+        chunk = keys[i:i+chunk_size]
+        query = ("SELECT key, value FROM cache WHERE created >= ? AND "
+                 "key IN (" + ",".join("?"*len(chunk)) + ")")
+        for key, value in con.execute(query, [min_time] + chunk):
+            res[key] = json.loads(value)
+    return res
+
+
+def __cache_put(con, key, value):
+    """
+    This function adds a value to the cache. If the key already exists,
+    the value is replaced.
+    Input: sqlite3.Connection, key, JSON serializable value
+    Output: -
+    """
+    value = json.dumps(value, default=str)
+    with con:
+        con.execute(
+            "INSERT OR REPLACE INTO cache (key, value, created) "
+            "VALUES (?, ?, ?)", (str(key), value, time.time())
+            )
+    return None
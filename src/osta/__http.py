@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import threading
+import urllib.parse
+import random
+import time
+import math
+from typing import Dict
+
+# Default timeout (connect, read) of requests in seconds
+__DEFAULT_TIMEOUT = (10, 120)
+# Maximum number of concurrent requests (and pooled connections) per host
+__MAX_CONNECTIONS_PER_HOST = 8
+# Transport that is used to make requests. By default, a shared session is
+# created when the first request is made
+__CLIENT = {"transport": None}
+__CLIENT_LOCK = threading.Lock()
+__HOST_LIMITERS: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def __create_rate_limiter(rate_limit):
+    """
+    This function creates a rate limiter that can be shared between threads.
+    Input: maximum number of requests per second or None (no limit)
+    Output: function that waits until the next request can be made
+    """
+    # INPUT CHECK
+    if not (rate_limit is None or (isinstance(rate_limit, (int, float)) and
+                                   not isinstance(rate_limit, bool) and
+                                   rate_limit > 0)):
+        raise Exception(
+            "'rate_limit' must be None or a positive number."
+            )
+    # INPUT CHECK END
+    lock = threading.Lock()
+    # Time when the next request can be made
+    next_time = [0.0]
+
+    def wait():
+        if rate_limit is None:
+            return None
+        # Reserve the next slot, and wait until it is reached
+        with lock:
+            now = time.monotonic()
+            slot = max(now, next_time[0])
+            next_time[0] = slot + 1/rate_limit
+        if slot > now:
+            time.sleep(slot - now)
+        return None
+    return wait
+
+
+def __create_session(pool_size=__MAX_CONNECTIONS_PER_HOST):
+    """
+    This function creates a session that reuses connections (keep-alive).
+    The session can be shared between threads.
+    Input: maximum number of connections per host
+    Output: requests.Session
+    """
+    # Import here so that importing osta does not require loading requests
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # Ask server to compress the responses
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def __get_transport():
+    """
+    This function gets the transport that is used to make HTTP requests.
+    If transport is not set, a shared session is created.
+    Input: -
+    Output: object with request(method, url, **args) method
+    """
+    with __CLIENT_LOCK:
+        if __CLIENT["transport"] is None:
+            __CLIENT["transport"] = __create_session()
+        res = __CLIENT["transport"]
+    return res
+
+
+def __set_transport(transport=None):
+    """
+    This function sets the transport that is used to make HTTP requests.
+    It can be used to replace the network with a local stand-in, for
+    example, in tests and benchmarks.
+    Input: object with request(method, url, **args) method, or None
+    (shared session is used)
+    Output: previous transport
+    """
+    # INPUT CHECK
+    if not (transport is None or callable(getattr(transport, "request",
+                                                  None))):
+        raise Exception(
+            "'transport' must be None or have 'request' method."
+            )
+    # INPUT CHECK END
+    with __CLIENT_LOCK:
+        res = __CLIENT["transport"]
+        __CLIENT["transport"] = transport
+    return res
+
+
+def __get_host_limiter(url):
+    """
+    This function gets a semaphore that limits the number of concurrent
+    requests to a host.
+    Input: URL
+    Output: threading.BoundedSemaphore
+    """
+    host = urllib.parse.urlsplit(str(url)).netloc
+    with __CLIENT_LOCK:
+        if host not in __HOST_LIMITERS:
+            __HOST_LIMITERS[host] = threading.BoundedSemaphore(
+                __MAX_CONNECTIONS_PER_HOST)
+        res = __HOST_LIMITERS[host]
+    return res
+
+
+def __request(method, url, rate_limiter=None, max_retries=3,
+              backoff=0.5, **args):
+    """
+    This function makes a HTTP request with the shared transport. If the
+    server is busy (429) or there is a server error (5xx) or connection
+    error, the request is retried with exponential backoff and jitter.
+    Input: HTTP method, URL, rate limiter, maximum number of retries,
+    backoff factor in seconds, arguments passed into transport's request
+    Output: requests.Response
+    """
+    # Import here so that importing osta does not require loading requests
+    import requests
+    # Use default timeout if it is not specified
+    args.setdefault("timeout", __DEFAULT_TIMEOUT)
+    transport = __get_transport()
+    host_limiter = __get_host_limiter(url)
+    for attempt in range(max_retries + 1):
+        # Wait if rate limit is reached
+        if rate_limiter is not None:
+            rate_limiter()
+        try:
+            # Limit the number of concurrent requests to same host
+            with host_limiter:
+                r = transport.request(method, url, **args)
+        except (requests.ConnectionError, requests.Timeout):
+            # If there are no retries left, give the error
+            if attempt == max_retries:
+                raise
+            wait = None
+        else:
+            # If the request was succesful or there are no retries left,
+            # return the response
+            if not __is_retryable(r.status_code) or attempt == max_retries:
+                return r
+            wait = __get_retry_after(r)
+        # Wait before the next try. Use time that server specified, or
+        # exponential backoff with jitter
+        if wait is None:
+            wait = backoff * 2**attempt * (1 + random.random())
+        time.sleep(wait)
+
+
+def __is_retryable(status_code):
+    """
+    This function checks if the request can be retried based on status code.
+    Input: status code
+    Output: True or False
+    """
+    res = status_code == 429 or 500 <= status_code < 600
+    return res
+
+
+def __get_retry_after(r):
+    """
+    This function gets the time that server asks to wait before next request.
+    Input: requests.Response
+    Output: seconds or None
+    """
+    res = None
+    value = r.headers.get("Retry-After") if r.headers is not None else None
+    if value is not None:
+        try:
+            res = float(value)
+        except ValueError:
+            res = None
+    # Infinite and nan values cannot be waited. Negative values are
+    # interpreted as no wait, and long waits are limited to one minute.
+    if res is not None:
+        res = max(0.0, min(res, 60.0)) if math.isfinite(res) else None
+    return res
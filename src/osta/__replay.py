@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import osta.__http as http
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import urllib.parse
+import types
+import threading
+import hashlib
+import random
+import base64
+import json
+import time
+import os
+from typing import Dict
+
+
+def __create_recording_transport(fixture_dir, transport=None):
+    """
+    This function creates a transport that makes requests with another
+    transport and stores responses to fixture directory.
+    Input: path of fixture directory, transport that is used to make requests
+    (if None, new session is used)
+    Output: transport
+    """
+    # Check if spedicified directory exists. If not, create it
+    if not os.path.isdir(fixture_dir):
+        os.makedirs(fixture_dir)
+    transport = http.__create_session() if transport is None else transport
+
+    def request(method, url, **args):
+        r = transport.request(method, url, **args)
+        # Store the response
+        key = __get_fixture_key(method, url, params=args.get("params"),
+                                json_data=args.get("json"))
+        fixture = {
+            "method": method.upper(),
+            "url": url,
+            "status_code": r.status_code,
+            "headers": {"Content-Type": r.headers.get(
+                "Content-Type", "application/json")},
+            "content": base64.b64encode(r.content).decode("ascii"),
+            }
+        path = os.path.join(fixture_dir, key + ".json")
+        # Write to other file first so that other threads do not read
+        # partial file
+        temp_path = path + "." + str(threading.get_ident()) + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(fixture, f)
+        os.replace(temp_path, path)
+        return r
+    res = types.SimpleNamespace(request=request)
+    return res
+
+
+def __create_replay_transport(fixture_dir):
+    """
+    This function creates a transport that serves responses from fixture
+    directory without network.
+    Input: path of fixture directory
+    Output: transport
+    """
+    def request(method, url, **args):
+        key = __get_fixture_key(method, url, params=args.get("params"),
+                                json_data=args.get("json"))
+        fixture = __load_fixture(fixture_dir, key)
+        if fixture is None:
+            raise Exception(
+                f"Response was not found from fixtures: {method} {url}"
+                )
+        res = __create_response(fixture, url)
+        return res
+    res = types.SimpleNamespace(request=request)
+    return res
+
+
+def __start_fixture_server(fixture_dir, latency=0, error_rate=0,
+                           seed=None, port=0):
+    """
+    This function starts a local HTTP server that serves responses from
+    fixture directory. The server can be used instead of the real servers
+    with the transport that is created with __create_server_transport.
+    Input: path of fixture directory, latency in seconds (number or
+    (min, max)), probability of server error (503), seed for random numbers,
+    port (if 0, free port is used)
+    Output: ThreadingHTTPServer that runs in background thread
+    """
+    # INPUT CHECK
+    if isinstance(latency, (int, float)) and not isinstance(latency, bool):
+        latency = (latency, latency)
+    if not (isinstance(latency, (list, tuple)) and len(latency) == 2 and
+            all(isinstance(x, (int, float)) and not isinstance(x, bool)
+                for x in latency) and 0 <= latency[0] <= latency[1]):
+        raise Exception(
+            "'latency' must be non-negative number or (min, max)."
+            )
+    if not (isinstance(error_rate, (int, float)) and
+            not isinstance(error_rate, bool) and 0 <= error_rate <= 1):
+        raise Exception(
+            "'error_rate' must be a number between 0 and 1."
+            )
+    # INPUT CHECK END
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def handle(handler):
+        # Get the original request from the path
+        url = __get_original_url(handler.path)
+        length = int(handler.headers.get("Content-Length", 0))
+        body = handler.rfile.read(length) if length > 0 else None
+        json_data = None
+        if body:
+            try:
+                json_data = json.loads(body)
+            except ValueError:
+                json_data = None
+        # Simulate latency and server errors
+        with lock:
+            wait = rng.uniform(latency[0], latency[1])
+            error = rng.random() < error_rate
+        time.sleep(wait)
+        fixture = None
+        headers: Dict[str, str] = {}
+        if url is not None and not error:
+            key = __get_fixture_key(handler.command, url,
+                                    json_data=json_data)
+            fixture = __load_fixture(fixture_dir, key)
+        if error:
+            status, content = 503, b"Service Unavailable"
+        elif fixture is None:
+            status, content = 404, b"Not Found"
+        else:
+            status = fixture.get("status_code")
+            headers = fixture.get("headers", {})
+            content = base64.b64decode(fixture.get("content"))
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.send_header("Content-Length", str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep connections alive like real servers do
+        protocol_version = "HTTP/1.1"
+        do_GET = handle
+        do_POST = handle
+
+        def log_message(self, format, *args):
+            return None
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def __create_server_transport(server, transport=None):
+    """
+    This function creates a transport that sends requests to local server
+    instead of the real servers.
+    Input: server that is created with __start_fixture_server, transport
+    that is used to make requests (if None, new session is used)
+    Output: transport
+    """
+    host, port = server.server_address[0:2]
+    base_url = "http://" + str(host) + ":" + str(port)
+    transport = http.__create_session() if transport is None else transport
+
+    def request(method, url, **args):
+        # Add parameters to URL so that they are included in the path
+        url = __get_prepared_url(method, url, args.pop("params", None))
+        parts = urllib.parse.urlsplit(url)
+        path = "/" + parts.scheme + "/" + parts.netloc + parts.path
+        if parts.query:
+            path = path + "?" + parts.query
+        res = transport.request(method, base_url + path, **args)
+        return res
+    res = types.SimpleNamespace(request=request)
+    return res
+
+
+def __get_original_url(path):
+    """
+    This function gets the original URL from the path of the request that
+    was sent to local server.
+    Input: path
+    Output: URL or None
+    """
+    parts = path.lstrip("/").split("/", 2)
+    res = None
+    if len(parts) >= 2 and parts[0] in ["http", "https"]:
+        res = parts[0] + "://" + parts[1] + "/"
+        res = res + (parts[2] if len(parts) == 3 else "")
+    return res
+
+
+def __get_fixture_key(method, url, params=None, json_data=None):
+    """
+    This function creates a key that specifies a request.
+    Input: HTTP method, URL, parameters of URL, JSON body
+    Output: string
+    """
+    url = __get_prepared_url(method, url, params)
+    # Remove trailing slash so that URLs from local server match
+    url = url.rstrip("/")
+    key = json.dumps([method.upper(), url, json_data], sort_keys=True)
+    key = hashlib.md5(key.encode("utf-8")).hexdigest()
+    return key
+
+
+def __get_prepared_url(method, url, params=None):
+    """
+    This function adds parameters to URL and encodes it in the same way as
+    requests does.
+    Input: HTTP method, URL, parameters of URL
+    Output: URL
+    """
+    # Import here so that importing osta does not require loading requests
+    import requests
+    res = requests.Request(method, url, params=params).prepare().url
+    return res
+
+
+def __load_fixture(fixture_dir, key):
+    """
+    This function loads a fixture.
+    Input: path of fixture directory, key of the request
+    Output: dictionary or None
+    """
+    path = os.path.join(fixture_dir, key + ".json")
+    res = None
+    if os.path.isfile(path):
+        with open(path) as f:
+            res = json.load(f)
+    return res
+
+
+def __create_response(fixture, url):
+    """
+    This function creates a response from a fixture.
+    Input: dictionary, URL
+    Output: requests.Response
+    """
+    # Import here so that importing osta does not require loading requests
+    import requests
+    res = requests.models.Response()
+    res.status_code = fixture.get("status_code")
+    res.headers = requests.structures.CaseInsensitiveDict(
+        fixture.get("headers", {}))
+    res._content = base64.b64decode(fixture.get("content"))
+    res.encoding = "utf-8"
+    res.url = url
+    return res
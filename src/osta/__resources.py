@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import osta.__utils as utils
+import pandas as pd
+import importlib.resources
+import hashlib
+import pickle
+import json
+import os
+from typing import Dict
+
+# Tables and normalized key columns that are already loaded in this process
+__RESOURCE_CACHE: Dict[str, pd.DataFrame] = {}
+__RESOURCE_KEY_CACHE: Dict[str, Dict[str, pd.Series]] = {}
+
+
+def __load_resource(filename, **args):
+    """
+    This function loads a table from resources of package osta. Each table
+    is loaded only once per process. If a prebuilt binary artifact of the
+    table is available, it is used instead of parsing the CSV file.
+    Input: name of the file, arguments passed into pd.read_csv
+    Output: pd.DataFrame
+    """
+    key = __get_resource_key(filename, **args)
+    if key not in __RESOURCE_CACHE:
+        # Try to load compiled artifact. If it is not available, read CSV
+        df = __read_compiled_resource(filename, **args)
+        if df is None:
+            df = pd.read_csv(__get_resource_path(filename), **args)
+        __RESOURCE_CACHE[key] = df
+    # Return a copy so that the cached table is not modified
+    df = __RESOURCE_CACHE[key].copy()
+    return df
+
+
+def __load_resource_keys(filename, cols=None, **args):
+    """
+    This function loads normalized (string, lowercase) key columns of a
+    table from resources of package osta. The columns are normalized only
+    once per process.
+    Input: name of the file, columns to normalize (if None, all columns),
+    arguments passed into pd.read_csv
+    Output: pd.DataFrame including normalized columns
+    """
+    key = __get_resource_key(filename, **args)
+    if key not in __RESOURCE_KEY_CACHE:
+        __RESOURCE_KEY_CACHE[key] = {}
+    keys = __RESOURCE_KEY_CACHE[key]
+    df = None
+    cols = __load_resource(filename, **args).columns if cols is None else cols
+    # Normalize columns that are not yet normalized
+    for col in cols:
+        if col not in keys:
+            if df is None:
+                df = __load_resource(filename, **args)
+            keys[col] = utils.__normalize_keys(df[col])
+    df = pd.DataFrame({col: keys[col] for col in cols})
+    return df
+
+
+def __clear_resource_cache():
+    """
+    This function removes all the tables from the in-process cache.
+    Input: -
+    Output: -
+    """
+    __RESOURCE_CACHE.clear()
+    __RESOURCE_KEY_CACHE.clear()
+    return None
+
+
+def __compile_resource(filename, **args):
+    """
+    This function creates a binary artifact (pickle) of a table in resources
+    of package osta. The artifact is used instead of CSV when the table
+    is loaded with the same arguments. If the resource directory is not
+    writable, the artifact is stored in the cache directory of user.
+    Input: name of the file, arguments passed into pd.read_csv
+    Output: path of the artifact or None if it was not stored
+    """
+    csv_path = __get_resource_path(filename)
+    df = pd.read_csv(csv_path, **args)
+    # Get the first directory that is writable
+    path = None
+    for temp in __get_compiled_resource_paths(filename, **args):
+        dir_path = os.path.dirname(temp)
+        # Create cache directory if it does not exist
+        if not os.path.isdir(dir_path) and \
+                os.access(os.path.dirname(dir_path), os.W_OK):
+            os.makedirs(dir_path)
+        if os.path.isdir(dir_path) and os.access(dir_path, os.W_OK):
+            path = temp
+            break
+    if path is not None:
+        __write_compiled_resource(path, df, __get_file_hash(csv_path))
+    return path
+
+
+def __write_compiled_resource(path, df, sha1):
+    """
+    This function writes a table to binary artifact along with a metadata
+    file (JSON). The metadata includes pandas version, hash of the CSV file
+    and hash of the artifact. It is checked before the artifact is loaded.
+    Input: path of the artifact, pd.DataFrame, SHA-1 hash of the CSV file
+    Output: -
+    """
+    content = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+    metadata = {
+        "pandas": pd.__version__,
+        "sha1": sha1,
+        "artifact_sha1": hashlib.sha1(content).hexdigest(),
+        }
+    with open(path, "wb") as f:
+        f.write(content)
+    # Metadata is written last so that partial artifact is not used
+    with open(__get_metadata_path(path), "w") as f:
+        json.dump(metadata, f)
+    return None
+
+
+def __read_compiled_resource(filename, **args):
+    """
+    This function reads a binary artifact of a table if it is available and
+    up-to-date. The metadata file is checked before the artifact is
+    unpickled, and the artifact is not used if it fails to load.
+    Input: name of the file, arguments passed into pd.read_csv
+    Output: pd.DataFrame or None
+    """
+    df = None
+    sha1 = None
+    for path in __get_compiled_resource_paths(filename, **args):
+        metadata_path = __get_metadata_path(path)
+        if not (os.path.isfile(path) and os.path.isfile(metadata_path)):
+            continue
+        try:
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            # Artifact must be created from the current CSV file with same
+            # pandas version. The content of CSV file is compared with hash.
+            if not (isinstance(metadata, dict) and
+                    metadata.get("pandas") == pd.__version__):
+                continue
+            if sha1 is None:
+                sha1 = __get_file_hash(__get_resource_path(filename))
+            if metadata.get("sha1") != sha1:
+                continue
+            # Artifact must be the one that was written with the metadata
+            with open(path, "rb") as f:
+                content = f.read()
+            if hashlib.sha1(content).hexdigest() != \
+                    metadata.get("artifact_sha1"):
+                continue
+            temp = pickle.loads(content)
+        # If artifact cannot be loaded for any reason, CSV file is used
+        except Exception:
+            continue
+        if isinstance(temp, pd.DataFrame):
+            df = temp
+            break
+    return df
+
+
+def __get_resource_key(filename, **args):
+    """
+    This function creates a key that specifies the table and arguments
+    that are used to load it.
+    Input: name of the file, arguments passed into pd.read_csv
+    Output: string
+    """
+    text = repr(sorted(args.items())).encode("utf-8")
+    key = filename + "." + hashlib.md5(text).hexdigest()[:8]
+    return key
+
+
+def __get_resource_path(filename):
+    """
+    This function gets the path of a file in resources of package osta.
+    Input: name of the file
+    Output: path
+    """
+    # importlib.resources.files is available from Python 3.9
+    if hasattr(importlib.resources, "files"):
+        path = importlib.resources.files("osta") / "resources" / filename
+        path = str(path)
+    else:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "resources", filename)
+    return path
+
+
+def __get_compiled_resource_paths(filename, **args):
+    """
+    This function gets the paths where binary artifact of a table can be
+    stored: resources of package osta and cache directory of user.
+    Input: name of the file, arguments passed into pd.read_csv
+    Output: list of paths
+    """
+    key = __get_resource_key(filename, **args) + ".pkl"
+    cache_dir = os.environ.get("XDG_CACHE_HOME")
+    if not cache_dir:
+        cache_dir = os.path.join(os.path.expanduser("~"), ".cache")
+    res = [__get_resource_path(key), os.path.join(cache_dir, "osta", key)]
+    return res
+
+
+def __get_metadata_path(path):
+    """
+    This function gets the path of metadata file of a binary artifact.
+    Input: path of the artifact
+    Output: path
+    """
+    res = os.path.splitext(path)[0] + ".json"
+    return res
+
+
+def __get_file_hash(path):
+    """
+    This function calculates SHA-1 hash of the content of a file.
+    Input: path
+    Output: string
+    """
+    with open(path, "rb") as f:
+        res = hashlib.sha1(f.read()).hexdigest()
+    return res
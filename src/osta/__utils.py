@@ -3,7 +3,9 @@
 import pandas as pd
 import re
 import numpy as np
+import threading
 import warnings
+from typing import Dict, List, Set
 
 
 def __is_non_empty_df(df):
@@ -29,182 +31,590 @@ def __is_percentage(value):
     return res
 
 
+def __normalize_keys(values):
+    """
+    This function normalizes values so that they can be matched with
+    case insensitive search.
+    Input: pd.Series
+    Output: pd.Series including normalized values
+    """
+    res = values.astype(str).str.lower()
+    return res
+
+
 def __are_valid_bids(values):
     """
     This function checks if values are valid business IDs.
     Input: pd.Series
     Output: pd.Series of boolean values
     """
-    # Get original indices that are used to preserve the order
-    ind = values.index
+    # Check only unique values; codes are used to get the result for
+    # each original value
+    codes, uniq = pd.factorize(values.astype(str))
+    uniq = pd.Series(uniq, dtype=object)
     # If values contain correct pattern
-    patt = "^\\d\\d\\d\\d\\d\\d\\d-\\d$"
-    contains_patt = values.astype(str).str.contains(patt)
-    # Get those values that include the pattern
-    values = values[contains_patt]
-    # Initialize the result: which values do not include the pattern?
-    res = contains_patt[-contains_patt]
+    patt = "^[0-9]{7}-[0-9]$"
+    contains_patt = uniq.str.contains(patt).to_numpy(dtype=bool)
+    # Initialize the result: values that do not include the pattern are
+    # not valid
+    res = np.zeros(len(uniq), dtype=bool)
     # If there were values that include the pattern
-    if len(values) > 0:
-        # Split values from "-" to extract BID's first part and its check mark
-        values = values.astype(str).str.split("-", expand=True)
-        # Get check marks
-        check_marks = values.iloc[:, 1]
-        # Divide first part's numbers to own columns
-        values = values.iloc[:, 0].apply(lambda x: pd.Series(list(x)))
-        # Convert each column to integer
-        values = values.apply(lambda x: x.astype(int))
-        # To each column, different weight is applied
-        weights = [7, 9, 10, 5, 8, 4, 2]
-        values = values*weights
-        # Each row (bid) is summed-up
-        values = values.sum(axis=1)
-        # The sums are divided by 11, --> get the moduluses
-        values = values % 11
-        # The result is (11 - modulus) unless the modulus is 0.
-        # Then the result is 0.
-        values = 11 - values
-        values[values == 11] = 0
+    if any(contains_patt):
+        # Convert characters to digits; each row is one BID and "-" is in
+        # 8th column
+        digits = __get_digits(uniq[contains_patt], 9)
+        # Calculate check marks from the first part
+        check_marks = __get_bid_check_marks(digits[:, :7])
         # Test if the results match with their corresponding check mark
-        values = values == check_marks.astype(int)
-        # Add the result of check mark calculation to results
-        res = pd.concat([res, values])
-    # Preserve the order
-    res = res[ind]
+        res[contains_patt] = check_marks == digits[:, 8]
+    # Add results to original values
+    res = pd.Series(res[codes], index=values.index, name=values.name)
     return res
 
 
-def __are_valid_vat_numbers(values):
+# VAT number includes specific pattern of characters along with land code.
+# The patterns are for the part that comes after the land code.
+__VAT_NUMBER_PATTERN_LISTS = {
+    # Finland
+    "FI": ["\\d{8}"],
+    # Belgium
+    "BE": ["\\d{10}"],
+    # Bulgaria
+    "BG": ["\\d{9}", "\\d{10}"],
+    # Spain
+    "ES": ["[A-Z0-9]\\d{7}[A-Z0-9]"],
+    # Netherlands
+    "NL": ["\\d{9}B\\d{2}"],
+    # Ireland
+    "IE": ["\\d[A-Z0-9_.-/\\+=(){}?!]\\d{5}[A-Z]",
+           "\\d[A-Z0-9_.-/\\+=(){}?!]\\d{5}[A-Z][A-Z]"],
+    # Great Britain
+    "GB": ["\\d{9}", "\\d{12}", "GD\\d{3}", "HA\\d{3}"],
+    # Northern Ireland
+    "XI": ["\\d{9}", "\\d{12}", "GD\\d{3}", "HA\\d{3}"],
+    # Italy
+    "IT": ["\\d{11}"],
+    # Austria
+    "AT": ["U\\d{8}"],
+    # Greece
+    "EL": ["\\d{9}"],
+    # Croatia
+    "HR": ["\\d{11}"],
+    # Cypros
+    "CY": ["\\d{10}[A-Z]"],
+    # Latvia
+    "LV": ["\\d{11}"],
+    # Lithuenia
+    "LT": ["\\d{9}", "\\d{12}"],
+    # Luxemburg
+    "LU": ["\\d{8}"],
+    # Malta
+    "MT": ["\\d{8}"],
+    # Portugal
+    "PT": ["\\d{9}"],
+    # Poland
+    "PL": ["\\d{10}"],
+    # France
+    "FR": ["[A-Z0-9][A-Z0-9]\\d{9}"],
+    # Romania
+    "RO": ["[0-9]{2,10}"],
+    # Sweden
+    "SE": ["\\d{10}01"],
+    # Germany
+    "DE": ["\\d{9}"],
+    # Slovakia
+    "SK": ["\\d{11}"],
+    # Slovenia
+    "SI": ["\\d{9}"],
+    # Denmark
+    "DK": ["\\d{9}"],
+    # Czech Republic
+    "CZ": ["[0-9]{9,10}"],
+    # Hungary
+    "HU": ["\\d{9}"],
+    # Estonia
+    "EE": ["\\d{10}"],
+    }
+# Compile patterns of each country into one pattern. With ASCII flag, "\d"
+# matches only digits 0-9 and not, e.g., full-width digits.
+__VAT_NUMBER_PATTERNS = {
+    k: re.compile("|".join(v), flags=re.ASCII)
+    for k, v in __VAT_NUMBER_PATTERN_LISTS.items()}
+
+
+def __are_valid_vat_numbers(values, check_checksum=False):
     """
     This function checks if values are valid VAT numbers.
-    Input: pd.Series
+    Input: pd.Series, whether to check also check digits of countries
+    that are supported (FI, SE, DE, BE, IT, NL, PL)
     Output: pd.Series of boolean values
     """
-    # VAT number includes specific pattern of characters along
-    # with land code. Test if it is found
-    patt_to_search = [
-        # Finland
-        "^FI\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Belgium
-        "^BE\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Bulgaria
-        "^BG\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        "^BG\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Spain
-        "^ES[A-Z0-9]\\d\\d\\d\\d\\d\\d\\d[A-Z0-9]$",
-        # Netherlands
-        "^NL\\d\\d\\d\\d\\d\\d\\d\\d\\d[B]\\d\\d$",
-        # Ireland
-        "^IE\\d[A-Z0-9_.-/\\+=(){}?!]\\d\\d\\d\\d\\d[A-Z]$",
-        "^IE\\d[A-Z0-9_.-/\\+=(){}?!]\\d\\d\\d\\d\\d[A-Z][A-Z]$",
-        # Great Britain
-        "^GB\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        "^GB\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        "^GBGD\\d\\d\\d$",
-        "^GBHA\\d\\d\\d$",
-        # Northern Ireland
-        "^XI\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        "^XI\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        "^XIGD\\d\\d\\d$",
-        "^XIHA\\d\\d\\d$",
-        # Italy
-        "^IT\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Austria
-        "^ATU\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Greece
-        "^EL\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Croatia
-        "^HR\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Cypros
-        "^CY\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d[A-Z]$",
-        # Latvia
-        "^LV\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Lithuenia
-        "^LT\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        "^LT\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Luxemburg
-        "^LU\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Malta
-        "^MT\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Portugal
-        "^PT\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Poland
-        "^PL\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # France
-        "^FR[A-Z0-9][A-Z0-9]\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Romania
-        "^RO[0-9]{2,10}$",
-        # Sweden
-        "^SE\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d01$",
-        # Germany
-        "^DE\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Slovakia
-        "^SK\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Slovenia
-        "^SI\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Denmark
-        "^DK\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Czech Republic
-        "^CZ[0-9]{9,10}$"
-        # Hungary
-        "^HU\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        # Estonia
-        "^EE\\d\\d\\d\\d\\d\\d\\d\\d\\d\\d$",
-        ]
-    # Remove spaces if there are any; find patterns with case
-    # insensitive search
-    res = values.astype(str).str.replace(" ", "").str.contains(
-        "|".join(patt_to_search), flags=re.IGNORECASE)
-    # Combine results
-    return res
-
-
-def __test_if_date(df):
+    # Remove spaces if there are any; search is case insensitive. Check only
+    # unique values; codes are used to get the result for each original
+    # value
+    values_mod = values.astype(str).str.replace(" ", "").str.upper()
+    codes, uniq = pd.factorize(values_mod)
+    uniq = pd.Series(uniq, dtype=object)
+    # Initialize the result
+    res = np.zeros(len(uniq), dtype=bool)
+    # Get land codes and the rest of the values
+    land_codes = uniq.str[:2]
+    numbers = uniq.str[2:]
+    # Loop over land codes, and check values with pattern of the country
+    for land_code in land_codes.drop_duplicates():
+        patt = __VAT_NUMBER_PATTERNS.get(land_code)
+        if patt is None:
+            continue
+        ind = (land_codes == land_code).to_numpy()
+        temp = numbers[ind].str.fullmatch(patt).to_numpy(dtype=bool)
+        # Check also check digits if specified
+        check_digits = __VAT_NUMBER_CHECKSUMS.get(land_code)
+        if check_checksum and check_digits is not None and any(temp):
+            temp[temp] = check_digits(numbers[ind][temp])
+        res[ind] = temp
+    # Add results to original values
+    res = pd.Series(res[codes], index=values.index, name=values.name)
+    return res
+
+
+def __get_digits(values, n_digits):
+    """
+    This function converts values with fixed number of digits into matrix
+    of integers.
+    Input: pd.Series, number of digits that are taken from the beginning
+    Output: np.array where each row is a value and column is a digit
+    """
+    chars = "".join(values.str[:n_digits]).encode("ascii")
+    codes = np.frombuffer(chars, dtype=np.uint8).reshape(-1, n_digits)
+    digits = codes.astype(np.int64) - ord("0")
+    return digits
+
+
+def __get_bid_check_marks(digits):
+    """
+    This function calculates check marks of Finnish business IDs.
+    Input: np.array where each row includes 7 digits
+    Output: np.array of check marks (10 if check mark cannot be valid)
+    """
+    # To each number, different weight is applied, and each row (bid) is
+    # summed-up
+    weights = np.array([7, 9, 10, 5, 8, 4, 2])
+    sums = digits @ weights
+    # The sums are divided by 11, --> get the moduluses
+    # The result is (11 - modulus) unless the modulus is 0.
+    # Then the result is 0.
+    check_marks = 11 - sums % 11
+    check_marks[check_marks == 11] = 0
+    return check_marks
+
+
+def __luhn_is_valid(digits):
+    """
+    This function checks digits with Luhn algorithm.
+    Input: np.array where each row includes digits and the last one is a
+    check digit
+    Output: np.array of boolean values
+    """
+    # Every second digit from the right is doubled
+    weights = np.tile([1, 2], digits.shape[1])[:digits.shape[1]][::-1]
+    temp = digits * weights
+    temp[temp > 9] -= 9
+    res = temp.sum(axis=1) % 10 == 0
+    return res
+
+
+def __vat_checksum_fi(values):
+    """
+    Check digits of Finnish VAT numbers (same as business IDs).
+    Input: pd.Series of VAT numbers without land code
+    Output: np.array of boolean values
+    """
+    digits = __get_digits(values, 8)
+    res = __get_bid_check_marks(digits[:, :7]) == digits[:, 7]
+    return res
+
+
+def __vat_checksum_se(values):
+    """
+    Check digits of Swedish VAT numbers (Luhn on organization number).
+    Input: pd.Series of VAT numbers without land code
+    Output: np.array of boolean values
+    """
+    res = __luhn_is_valid(__get_digits(values, 10))
+    return res
+
+
+def __vat_checksum_it(values):
+    """
+    Check digits of Italian VAT numbers (Luhn).
+    Input: pd.Series of VAT numbers without land code
+    Output: np.array of boolean values
+    """
+    res = __luhn_is_valid(__get_digits(values, 11))
+    return res
+
+
+def __vat_checksum_de(values):
+    """
+    Check digits of German VAT numbers (ISO 7064, MOD 11,10).
+    Input: pd.Series of VAT numbers without land code
+    Output: np.array of boolean values
+    """
+    digits = __get_digits(values, 9)
+    product = np.full(digits.shape[0], 10)
+    for i in range(8):
+        temp = (digits[:, i] + product) % 10
+        temp[temp == 0] = 10
+        product = (2 * temp) % 11
+    check_digits = 11 - product
+    check_digits[check_digits == 10] = 0
+    res = check_digits == digits[:, 8]
+    return res
+
+
+def __vat_checksum_be(values):
+    """
+    Check digits of Belgian VAT numbers (97 - modulus of 97).
+    Input: pd.Series of VAT numbers without land code
+    Output: np.array of boolean values
+    """
+    digits = __get_digits(values, 10)
+    number = digits[:, :8] @ (10 ** np.arange(7, -1, -1))
+    check_digits = digits[:, 8] * 10 + digits[:, 9]
+    res = 97 - number % 97 == check_digits
+    return res
+
+
+def __vat_checksum_nl(values):
+    """
+    Check digits of Dutch VAT numbers (modulus of 11, or modulus of 97 that
+    is used for sole proprietors).
+    Input: pd.Series of VAT numbers without land code
+    Output: np.array of boolean values
+    """
+    digits = __get_digits(values, 9)
+    weights = np.array([9, 8, 7, 6, 5, 4, 3, 2])
+    res = (digits[:, :8] @ weights) % 11 == digits[:, 8]
+    # Letters are converted to numbers (A=10, B=11...) for modulus of 97
+    res_97 = [int("2321" + x[:9] + "11" + x[10:]) % 97 == 1 for x in values]
+    res = res | np.array(res_97, dtype=bool)
+    return res
+
+
+def __vat_checksum_pl(values):
+    """
+    Check digits of Polish VAT numbers (weighted modulus of 11).
+    Input: pd.Series of VAT numbers without land code
+    Output: np.array of boolean values
+    """
+    digits = __get_digits(values, 10)
+    weights = np.array([6, 5, 7, 2, 3, 4, 5, 6, 7])
+    res = (digits[:, :9] @ weights) % 11 == digits[:, 9]
+    return res
+
+
+# Check digits that are supported
+__VAT_NUMBER_CHECKSUMS = {
+    "FI": __vat_checksum_fi,
+    "SE": __vat_checksum_se,
+    "IT": __vat_checksum_it,
+    "DE": __vat_checksum_de,
+    "BE": __vat_checksum_be,
+    "NL": __vat_checksum_nl,
+    "PL": __vat_checksum_pl,
+    }
+
+
+# Patterns of values that are interpreted as dates
+__DATE_PATTERNS = [
+    "\\d\\d\\d\\d\\d\\d\\d\\d",
+    "\\d\\d\\d\\d\\d\\d\\d",
+    "\\d\\d\\d\\d\\d\\d",
+
+    "^\\d\\d[-/.]\\d\\d[-/.]\\d\\d\\d\\d$",
+    "^\\d[-/.]\\d\\d[-/.]\\d\\d\\d\\d$",
+    "^\\d\\d[-/.]\\d[-/.]\\d\\d\\d\\d$",
+    "^\\d[-/.]\\d[-/.]\\d\\d\\d\\d$",
+    "^\\d[-/.]\\d[-/.]\\d\\d$",
+    "^\\d[-/.]\\d[-/.]\\d\\d\\d\\d$",
+
+    "^\\d\\d\\d\\d[-/.]\\d\\d[-/.]\\d\\d$",
+    "^\\d\\d\\d\\d[-/.]\\d[-/.]\\d\\d$",
+    "^\\d\\d\\d\\d[-/.]\\d\\d[-/.]\\d$",
+    "^\\d\\d[-/.]\\d[-/.]\\d$",
+    ]
+# Compile patterns into one pattern
+__DATE_PATTERN = re.compile("|".join(__DATE_PATTERNS))
+
+
+def __create_column_profile(values, sample_size=None, sample_margin=0.1):
+    """
+    This function creates a profile of a column. Unique values are searched
+    only once, and the profile is used by functions that detect the type of
+    data, so that they need to check only unique values. If the column is
+    longer than sample size, the profile is created from stratified sample of
+    rows, and the profile of whole column is created only when the result
+    from sample is near the threshold (see __is_over_threshold).
+    Input: pd.Series, number of rows in sample (if None, all rows are used),
+    margin around threshold where whole column is checked
+    Output: A dictionary including number of values, data type, unique
+    values, their counts, string representations, lengths and whether they
+    are digits. Patterns (BID, VAT number, date) are detected when they are
+    needed with __get_profile_item.
+    """
+    # If the column is long, create profile from sample
+    if sample_size is not None and len(values) > sample_size:
+        ind = __get_sample_index(len(values), sample_size)
+        res = __create_column_profile(values.iloc[ind])
+        res["sample_of"] = values
+        res["sample_margin"] = sample_margin
+        return res
+    # Get unique values and positions where they first occur
+    codes, uniq = pd.factorize(values)
+    ind = np.flatnonzero(codes >= 0)
+    counts = np.bincount(codes[ind], minlength=len(uniq))
+    pos = ind[np.unique(codes[ind], return_index=True)[1]]
+    uniq = values.iloc[pos].reset_index(drop=True)
+    # Get string representations, their lengths and whether they are digits
+    strings = uniq.astype(str)
+    lengths = strings.str.len().to_numpy(dtype=int)
+    is_digit = strings.str.isdigit().to_numpy(dtype=bool)
+    # Get how many values have each length
+    hist_lengths, hist_counts = np.unique(
+        np.repeat(lengths, counts), return_counts=True)
+    n = len(values)
+    n_not_null = int(counts.sum())
+    res = {
+        "series": values,
+        "n": n,
+        "n_not_null": n_not_null,
+        "null_ratio": (n - n_not_null)/n if n > 0 else 0,
+        "dtype": values.dtype,
+        "values": uniq,
+        "counts": counts,
+        "strings": strings,
+        "lengths": lengths,
+        "length_hist": dict(zip(hist_lengths, hist_counts)),
+        "is_digit": is_digit,
+        "digit_ratio": (counts[is_digit].sum()/n_not_null
+                        if n_not_null > 0 else 0),
+        }
+    return res
+
+
+def __get_profile_item(profile, key):
+    """
+    This function gets an item from the profile of column. Patterns are
+    detected only when they are needed for the first time.
+    Input: profile from __create_column_profile, name of the item
+    Output: value of the item
+    """
+    if key not in profile:
+        if key == "bid":
+            # Whether unique values are valid business IDs
+            res = __are_valid_bids(profile["values"]).to_numpy(dtype=bool)
+        elif key == "vat_number":
+            # Whether unique values are valid VAT numbers
+            res = __are_valid_vat_numbers(
+                profile["values"]).to_numpy(dtype=bool)
+        elif key == "date":
+            # Whether unique values have pattern of date
+            res = profile["strings"].str.contains(
+                __DATE_PATTERN).to_numpy(dtype=bool)
+        elif key == "keys":
+            # Normalized unique values for case insensitive search
+            res = __normalize_keys(profile["values"])
+        elif key == "is_monotonic_increasing":
+            # Sample cannot tell the order of whole column
+            res = profile.get(
+                "sample_of", profile["series"]).is_monotonic_increasing
+        else:
+            raise Exception(
+                f"'{key}' is not an item of column profile."
+                )
+        profile[key] = res
+    return profile[key]
+
+
+def __get_profile_ratio(profile, ind, n=None):
+    """
+    This function calculates the portion of values that fulfill a condition.
+    Input: profile from __create_column_profile, boolean array specifying
+    unique values that fulfill the condition, number of values that is
+    used as a denominator (by default, all values including NaNs)
+    Output: float
+    """
+    n = profile["n"] if n is None else n
+    res = profile["counts"][ind].sum()/n if n > 0 else 0
+    return res
+
+
+def __get_profile_full(profile):
+    """
+    This function gets the profile of whole column. If the profile is
+    created from sample, the profile of whole column is created once.
+    Input: profile from __create_column_profile
+    Output: profile of whole column
+    """
+    res = profile
+    if "sample_of" in profile:
+        if "full" not in profile:
+            profile["full"] = __create_column_profile(profile["sample_of"])
+        res = profile["full"]
+    return res
+
+
+def __is_over_threshold(profile, get_ratio, th):
+    """
+    This function checks whether the portion of values that fulfill a
+    condition is over threshold. If the profile is created from sample and
+    the portion is near threshold, whole column is checked.
+    Input: profile from __create_column_profile, function that calculates the
+    portion from profile, threshold
+    Output: Boolean value
+    """
+    ratio = get_ratio(profile)
+    # If sample was not clear, check the whole column
+    if "sample_of" in profile and abs(
+            ratio - th) <= profile["sample_margin"]:
+        ratio = get_ratio(__get_profile_full(profile))
+    res = bool(ratio >= th)
+    return res
+
+
+def __get_sample_index(n, size, seed=0):
+    """
+    This function gets the indices of stratified sample of rows. Rows are
+    divided into blocks of equal size, and one row is taken from each block
+    so that sample covers whole data even if it is ordered.
+    Input: number of rows, size of sample, seed of random number generator
+    Output: np.array of sorted indices
+    """
+    rng = np.random.default_rng(seed)
+    bounds = np.linspace(0, n, size + 1).astype(int)
+    res = rng.integers(bounds[:-1], bounds[1:])
+    return res
+
+
+def __create_column_relations(df):
+    """
+    This function creates an object that is used to analyze relationships
+    between columns. Columns are converted into integer codes, and the
+    numbers of unique combinations of columns are calculated only once. The
+    object can be shared between threads.
+    Input: DataFrame
+    Output: A dictionary including data, codes of columns, numbers of
+    unique combinations and a lock that guards them
+    """
+    res = {
+        "df": df,
+        "codes": {},
+        "n_unique": {},
+        "lock": threading.Lock(),
+        }
+    return res
+
+
+def __get_column_codes(relations, col_i):
+    """
+    This function gets integer codes of column. Missing values have code -1.
+    Input: relations from __create_column_relations, index of the column
+    Output: A list including codes and the number of unique values
+    """
+    res = relations["codes"].get(col_i)
+    if res is None:
+        # Codes are calculated without lock so that threads can factorize
+        # different columns at the same time. If other thread stored the
+        # codes first, its result is used.
+        codes, uniq = pd.factorize(relations["df"].iloc[:, col_i].to_numpy())
+        with relations["lock"]:
+            res = relations["codes"].setdefault(col_i, [codes, len(uniq)])
+    return res
+
+
+def __get_n_unique_rows(relations, cols):
+    """
+    This function calculates the number of unique combinations of values in
+    specified columns. Rows that have missing values are not counted. The
+    result is same as df.iloc[:, cols].dropna().drop_duplicates().shape[0].
+    Input: relations from __create_column_relations, list of column indices
+    Output: integer
+    """
+    key = tuple(sorted(set(cols)))
+    res = relations["n_unique"].get(key)
+    if res is None:
+        # Combinations are calculated without lock, similarly as codes
+        key_codes, n = __get_column_codes(relations, key[0])
+        # Combine codes of columns one by one
+        for col_i in key[1:]:
+            codes, n_col = __get_column_codes(relations, col_i)
+            # Rows with missing values are not combined
+            ind = (key_codes >= 0) & (codes >= 0)
+            temp = key_codes[ind].astype(np.int64) * n_col + codes[ind]
+            # Factorize again so that codes stay small and do not overflow
+            temp, uniq = pd.factorize(temp)
+            key_codes = np.full(len(key_codes), -1, dtype=np.int64)
+            key_codes[ind] = temp
+            n = len(uniq)
+        with relations["lock"]:
+            res = relations["n_unique"].setdefault(key, n)
+    return res
+
+
+def __column_determines(relations, col_i, col_j):
+    """
+    This function checks whether each value of a column corresponds to only
+    one value in other column, i.e., the column determines the other column.
+    Input: relations from __create_column_relations, index of the column,
+    index of the other column
+    Output: Boolean value
+    """
+    res = (__get_n_unique_rows(relations, [col_i, col_j]) ==
+           __get_n_unique_rows(relations, [col_i]))
+    return res
+
+
+def __test_if_date(df, profile=None):
     """
     This function checks if the column defines dates
-    Input: Series
+    Input: Series, profile of the column
     Output: Boolean value
     """
+    # Create a profile of column if it is not given
+    profile = __create_column_profile(df) if profile is None else profile
     # Initialize result
     res = False
-    df = df.dropna()
-    if len(df) > 0 and df.dtype == "datetime64":
+
+    def get_ratio(p):
+        # Portion of values that have pattern of date
+        res = __get_profile_ratio(p, __get_profile_item(p, "date"),
+                                  n=p["n_not_null"])
+        return res
+    n = profile["n_not_null"]
+    if n > 0 and profile["dtype"] == "datetime64":
         res = True
-    elif len(df) > 0 and df.dtype in ["object"]:
-        patt_to_search = [
-            "\\d\\d\\d\\d\\d\\d\\d\\d",
-            "\\d\\d\\d\\d\\d\\d\\d",
-            "\\d\\d\\d\\d\\d\\d",
-
-            "^\\d\\d[-/.]\\d\\d[-/.]\\d\\d\\d\\d$",
-            "^\\d[-/.]\\d\\d[-/.]\\d\\d\\d\\d$",
-            "^\\d\\d[-/.]\\d[-/.]\\d\\d\\d\\d$",
-            "^\\d[-/.]\\d[-/.]\\d\\d\\d\\d$",
-            "^\\d[-/.]\\d[-/.]\\d\\d$",
-            "^\\d[-/.]\\d[-/.]\\d\\d\\d\\d$",
-
-            "^\\d\\d\\d\\d[-/.]\\d\\d[-/.]\\d\\d$",
-            "^\\d\\d\\d\\d[-/.]\\d[-/.]\\d\\d$",
-            "^\\d\\d\\d\\d[-/.]\\d\\d[-/.]\\d$",
-            "^\\d\\d[-/.]\\d[-/.]\\d$",
-            ]
-        patt_found = df.astype(str).str.contains("|".join(patt_to_search))
-        if all(patt_found):
-            res = True
+    elif n > 0 and profile["dtype"] in ["object"]:
+        # All the values must be dates
+        res = __is_over_threshold(profile, get_ratio, 1)
     return res
 
 
-def __test_if_voucher(df, col_i, colnames):
+def __test_if_voucher(df, col_i, colnames, profile=None, relations=None):
     """
     This function checks if the column defines vouchers
-    Input: DataFrame, index of the column, found final column names
+    Input: DataFrame, index of the column, found final column names, profile
+    of the column, relations between columns
     Output: Boolean value
     """
+    # Create a profile of column if it is not given
+    profile = (__create_column_profile(df.iloc[:, col_i])
+               if profile is None else profile)
     # Initialize result
     res = False
     # If data includes already dates and values of column are increasing
     # and they are not dates,the column includes voucher values
-    if "date" in colnames and df.iloc[:, col_i].is_monotonic_increasing and \
+    if "date" in colnames and \
+            __get_profile_item(profile, "is_monotonic_increasing") and \
             not df.iloc[:, col_i].equals(df.iloc[:, colnames.index("date")]):
         res = True
     else:
@@ -233,10 +643,11 @@ def __test_if_voucher(df, col_i, colnames):
                                               colnames=colnames,
                                               variables=variables,
                                               voucher_th=thresholds[i],
+                                              relations=relations,
                                               )
             test_res.append(temp_res)
         # If not float, then  it is not sum
-        if df.dtypes[col_i] == "float64":
+        if profile["dtype"] == "float64":
             test_res.append(False)
         else:
             test_res.append(True)
@@ -246,14 +657,19 @@ def __test_if_voucher(df, col_i, colnames):
     return res
 
 
-def __test_if_voucher_help(df, col_i, colnames, variables, voucher_th):
+def __test_if_voucher_help(df, col_i, colnames, variables, voucher_th,
+                           relations=None):
     """
     This function is a help function for voucher tester.
     This function tests if there are more unique values than there are
     tested values
-    Input: DataFrame, index of the column, found final column names
+    Input: DataFrame, index of the column, found final column names,
+    relations between columns
     Output: Boolean value
     """
+    # Create relations between columns if they are not given
+    relations = (__create_column_relations(df)
+                 if relations is None else relations)
     # Initialize results
     res = False
     # Check which variables are shared between variables and colnames
@@ -261,22 +677,13 @@ def __test_if_voucher_help(df, col_i, colnames, variables, voucher_th):
     # If variables were found from the colnames
     if len(var_shared) > 0:
         # Get only specified columns
-        temp = df.iloc[:, [colnames.index(var) for var in var_shared]]
-        # Remove rows with NA
-        temp = temp.dropna()
-        # Drop duplicates, now we have unique rows
-        temp = temp.drop_duplicates()
-        # Add column to variables
-        var_shared.append(np.unique(df.columns[col_i])[0])
-        # Get only specified columns with column that is being checked
-        temp_col = df.iloc[:, [colnames.index(var) for var in var_shared]]
-        # Remove rows with NA
-        temp_col = temp_col.dropna()
-        # Drop duplicates, now we have unique rows
-        temp_col = temp_col.drop_duplicates()
+        cols = [colnames.index(var) for var in var_shared]
+        # Add column that is being checked
+        cols_col = cols + [colnames.index(df.columns[col_i])]
         # If there are voucher_th times more unique rows, the column
         # is not related to columns that are matched
-        if temp_col.shape[0] > temp.shape[0]*voucher_th:
+        if __get_n_unique_rows(relations, cols_col) > \
+                __get_n_unique_rows(relations, cols)*voucher_th:
             res = True
     return res
 
@@ -357,3 +764,234 @@ def __subset_data_based_on_year(df, df_db, db_year=None,
     # Get only unique values
     df_db = df_db.drop_duplicates(subset=["number", "name"])
     return df_db
+
+
+def __token_sort_ratio(*args, **kwargs):
+    """
+    This function is the default scorer of partial matching. It calls
+    fuzz.token_sort_ratio so that fuzzywuzzy is imported only when partial
+    matching is used.
+    Input: arguments passed into fuzz.token_sort_ratio
+    Output: score
+    """
+    from fuzzywuzzy import fuzz
+    res = fuzz.token_sort_ratio(*args, **kwargs)
+    return res
+
+
+def __get_scorer(scorer):
+    """
+    This function gets the scorer that is used in partial matching. The
+    default scorer is replaced with fuzz.token_sort_ratio that fuzzywuzzy
+    can recognize.
+    Input: scorer function
+    Output: scorer function
+    """
+    if scorer is __token_sort_ratio:
+        from fuzzywuzzy import fuzz
+        scorer = fuzz.token_sort_ratio
+    return scorer
+
+
+def __build_fuzzy_index(values, ngram=3):
+    """
+    This function builds an index of character n-grams from names. The index
+    is used to shortlist candidates for partial matching so that names do not
+    have to be scored against all the names.
+    Input: pd.Series including names, length of n-grams
+    Output: A dictionary including unique names, their positions in values,
+    and n-grams pointing to names
+    """
+    values = pd.Series(values).reset_index(drop=True)
+    # Get only unique names; the first occurence is used
+    values = values[values.notna()].astype(str)
+    values = values[~values.duplicated()]
+    names = values.tolist()
+    # Loop over names and collect their n-grams
+    positions: Dict[str, List[int]] = {}
+    for i, name in enumerate(names):
+        for gram in __get_ngrams(name, ngram):
+            positions.setdefault(gram, []).append(i)
+    ngrams = {k: np.array(v) for k, v in positions.items()}
+    res = {
+        "names": names,
+        "pos": values.index.to_numpy(),
+        "ngrams": ngrams,
+        "ngram": ngram,
+        }
+    return res
+
+
+def __get_ngrams(name, ngram):
+    """
+    This function splits a name into unique character n-grams. Each word is
+    handled separately so that the order of words does not matter.
+    Input: name, length of n-grams
+    Output: set of n-grams
+    """
+    from fuzzywuzzy.utils import full_process
+    res: Set[str] = set()
+    for word in full_process(name).split():
+        # Add spaces so that beginning and end of words are also included
+        word = " " + word + " "
+        res.update(word[i:i+ngram] for i in range(len(word)-ngram+1))
+    return res
+
+
+def __fuzzy_index_extract_one(name, index, scorer, score_cutoff=0,
+                              n_candidates=20):
+    """
+    This function finds the most similar name from the fuzzy index. Names
+    sharing the most n-grams with the name are shortlisted and only they are
+    scored.
+    Input: name, index from __build_fuzzy_index, scorer, minimum score,
+    the number of shortlisted names
+    Output: None or a list including the most similar name, its score and its
+    position in original values
+    """
+    from fuzzywuzzy import process
+    res = None
+    # Get names that share n-grams with the name
+    grams = [index["ngrams"][x] for x in __get_ngrams(name, index["ngram"])
+             if x in index["ngrams"]]
+    if len(grams) > 0:
+        counts = np.bincount(np.concatenate(grams),
+                             minlength=len(index["names"]))
+        # Get names that have the most shared n-grams
+        candidates = np.flatnonzero(counts)
+        if len(candidates) > n_candidates:
+            th = np.sort(counts[candidates])[-n_candidates]
+            candidates = candidates[counts[candidates] >= th]
+        # Score candidates in original order so that ties are resolved
+        # similarly as without index
+        choices = {i: index["names"][i] for i in candidates}
+        temp = process.extractOne(name, choices, scorer=scorer,
+                                  score_cutoff=score_cutoff)
+        if temp is not None:
+            res = [temp[0], temp[1], index["pos"][temp[2]]]
+    return res
+
+
+def __normalize_headers(values):
+    """
+    This function normalizes column names for partial matching. Names are
+    made lowercase, diacritics are removed (e.g. ä -> a, å -> a) and
+    punctuation and extra whitespace are removed in the same way as
+    fuzzywuzzy does.
+    Input: list of names
+    Output: pd.Series including normalized names
+    """
+    res = pd.Series(list(values), dtype=object).astype(str)
+    # Remove diacritics by splitting letters into base letter and diacritic
+    res = res.str.normalize("NFKD").str.encode(
+        "ascii", errors="ignore").str.decode("ascii")
+    res = res.str.lower().str.replace("\\W+", " ", regex=True).str.strip()
+    return res
+
+
+def __score_headers(headers, keys, scorer):
+    """
+    This function scores column names against names in dictionary of fields.
+    Names are normalized, and each unique pair of normalized names is scored
+    only once. The resulting score matrix can be used for matching with
+    multiple thresholds.
+
+    With fuzzywuzzy's ratio and token_sort_ratio, upper bounds of scores are
+    calculated for all the pairs at once from counts of characters. Only
+    pairs that can be the best match of the column name are scored with the
+    scorer; the scores of other pairs are 0. Other scorers can be arbitrary
+    functions, so all the pairs are scored with them.
+    Input: list of column names, list of names in dictionary, scorer
+    Output: A dictionary including rows of column names, names in dictionary
+    and score matrix
+    """
+    from fuzzywuzzy import fuzz
+    scorer = __get_scorer(scorer)
+    keys = list(keys)
+    # Normalize names and get unique normalized names. The first name is used
+    # so that ties are resolved in the same order as in dictionary.
+    headers_norm = __normalize_headers(headers)
+    keys_norm = __normalize_headers(keys)
+    uniq_headers = headers_norm.drop_duplicates()
+    uniq_keys = keys_norm.drop_duplicates()
+    # Get upper bounds of scores if the scorer is known
+    bounds = None
+    if scorer in [fuzz.ratio, fuzz.token_sort_ratio]:
+        bounds = __get_score_bounds(uniq_headers, uniq_keys)
+    # Score the unique pairs. Empty names do not match with anything.
+    scores = np.zeros((len(uniq_headers), len(uniq_keys)))
+    for i, header in enumerate(uniq_headers):
+        if not header:
+            continue
+        if bounds is None:
+            scores[i, :] = [scorer(header, key) for key in uniq_keys]
+            continue
+        # Score pairs in order of upper bounds until the bound is smaller
+        # than the best score. Pairs with equal bound are scored so that
+        # ties are resolved in the same order as in dictionary.
+        best = 0
+        for j in np.argsort(-bounds[i, :], kind="stable"):
+            if bounds[i, j] < best:
+                break
+            scores[i, j] = scorer(header, uniq_keys.iloc[j])
+            best = max(best, scores[i, j])
+    rows = dict(zip(uniq_headers, range(len(uniq_headers))))
+    res = {
+        "rows": {h: rows[x] for h, x in zip(headers, headers_norm)},
+        "keys": [keys[i] for i in uniq_keys.index],
+        "scores": scores,
+        }
+    return res
+
+
+def __get_score_bounds(headers, keys):
+    """
+    This function calculates upper bounds of fuzzywuzzy's ratio between
+    normalized names. The ratio is 2*M/T, where T is the total number of
+    characters and M the number of matching characters. M cannot be larger
+    than the number of characters that are common to both names.
+    Input: pd.Series of normalized column names, pd.Series of normalized
+    names in dictionary
+    Output: np.array of upper bounds where rows are column names
+    """
+    # Count characters of names into matrices. Normalized names include only
+    # ASCII characters.
+    counts = []
+    for values in [headers, keys]:
+        values = values.tolist()
+        lengths = [len(x) for x in values]
+        chars = np.frombuffer("".join(values).encode("ascii"),
+                              dtype=np.uint8)
+        rows = np.repeat(np.arange(len(values)), lengths)
+        temp = np.zeros((len(values), 128), dtype=np.int64)
+        np.add.at(temp, (rows, chars), 1)
+        counts.append(temp)
+    # Take only characters that are present
+    ind = (counts[0].sum(axis=0) > 0) & (counts[1].sum(axis=0) > 0)
+    counts_h = counts[0][:, ind]
+    counts_k = counts[1][:, ind]
+    total = counts[0].sum(axis=1)[:, None] + counts[1].sum(axis=1)[None, :]
+    # Number of common characters of each pair, calculated against all the
+    # names in dictionary at once
+    common = np.zeros(total.shape, dtype=np.int64)
+    for i in range(counts_h.shape[0]):
+        common[i, :] = np.minimum(counts_k, counts_h[i, :]).sum(axis=1)
+    # Scores are rounded to integers, so bound is rounded up
+    res = np.ceil(200 * common / np.maximum(total, 1))
+    return res
+
+
+def __get_header_match(header_scores, header):
+    """
+    This function gets the name from dictionary of fields that is the most
+    similar with the column name.
+    Input: A dictionary from __score_headers, column name
+    Output: A list including the most similar name and its score or None
+    """
+    res = None
+    scores = header_scores["scores"]
+    row = header_scores["rows"].get(header)
+    if row is not None and scores.shape[1] > 0:
+        i = int(np.argmax(scores[row, :]))
+        res = [header_scores["keys"][i], scores[row, i]]
+    return res
@@ -1,13 +1,21 @@
 # -*- coding: utf-8 -*-
 import osta.__utils as utils
+import osta.__resources as resources
+import osta.__cache as cache
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import numpy as np
 import warnings
-from fuzzywuzzy import fuzz
-from fuzzywuzzy import process
-import pkg_resources
+import tempfile
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
 
 
-def change_names(df, guess_names=True, make_unique=True, fields=None, **args):
+def change_names(df, guess_names=True, make_unique=True, fields=None,
+                 use_cache=False, temp_dir=None, verify_sample=None,
+                 n_workers=1, **args):
     """
     Change column names of pandas.DataFrame
 
@@ -30,6 +38,26 @@ def change_names(df, guess_names=True, make_unique=True, fields=None, **args):
         to such CSV file or None. When fields=None,function's
         default dictionary is used. (By default: fields=None)
 
+        `use_cache`: A boolean value specifying whether to store the
+        found column names to on-disk cache. When data has same column names
+        and data types as data that has been already processed, the column
+        names are got from cache. (By default: use_cache=False)
+
+        `temp_dir`: None or a string specifying path of temporary directory
+        to store cache. If None, device's default temporary directory is used.
+        (By default: temp_dir=None)
+
+        `verify_sample`: None or a positive integer specifying the number of
+        rows that are used to verify column names from cache. If guessed
+        names of the sample do not match with cache, names are guessed from
+        whole data. If None, names are not verified.
+        (By default: verify_sample=None)
+
+        `n_workers`: An integer value specifying the number of columns whose
+        data is checked concurrently when names are guessed. The final names
+        are decided column by column afterwards, so the result is same as
+        when columns are checked one by one. (By default: n_workers=1)
+
         `**args`: Additional arguments passes into other functions:
 
         `pattern_th`: A numeric value [0,1] specifying the threshold of
@@ -45,6 +73,16 @@ def change_names(df, guess_names=True, make_unique=True, fields=None, **args):
         observations where the pattern must be present to conclude that
         column includes specific type of data. (By default: match_th=0.2)
 
+        `sample_size`: None or a positive integer specifying the number of
+        rows that are used to detect the type of data. The rows are
+        taken evenly from whole data. If the result from sample is near
+        match_th, whole column is checked. If None, all rows are used.
+        (By default: sample_size=None)
+
+        `sample_margin`: A numeric value [0,1] specifying how near match_th
+        the result from sample must be so that whole column is checked.
+        (By default: sample_margin=0.1)
+
     Details:
         This function changes the column names to standardized names that are
         required in other functions in osta package. If the names are already
@@ -118,57 +156,49 @@ def change_names(df, guess_names=True, make_unique=True, fields=None, **args):
         raise Exception(
             "'fields' must be pd.DataFrame, dict, string or None."
             )
+    if not isinstance(use_cache, bool):
+        raise Exception(
+            "'use_cache' must be True or False."
+            )
+    if not (isinstance(temp_dir, str) or temp_dir is None):
+        raise Exception(
+            "'temp_dir' must be None or string specifying temporary directory."
+            )
+    if not (verify_sample is None or (isinstance(verify_sample, int) and
+                                      not isinstance(verify_sample, bool) and
+                                      verify_sample > 0)):
+        raise Exception(
+            "'verify_sample' must be None or a positive integer."
+            )
+    if not (isinstance(n_workers, int) and not isinstance(n_workers, bool)
+            and n_workers > 0):
+        raise Exception(
+            "'n_workers' must be a positive integer."
+            )
     # INPUT CHECK END
     # Get fields / matches between column names and standardized names
     fields = __get_fields_df(fields)
-    # Initialize lists for column names
-    colnames = []
-    colnames_not_found = []
-    colnames_not_found_i = []
-    # Loop over column names
-    for i, col in enumerate(df.columns):
-        # Column name to lower case and remove spaces from beginning and end
-        # Get matching value from the dictionary
-        col_name = fields.get(col.lower().strip())
-        # If exact match was not found
-        if col_name is None:
-            # Do not change the colum name,
-            # and add it to not-found column names list
-            col_name = col
-            colnames_not_found.append(col_name)
-            colnames_not_found_i.append(i)
-        # Append the list of column names
-        colnames.append(col_name)
-
-    # If there are column names that were not detected and user wants them
-    # to be guessed
-    if len(colnames_not_found) > 0 and guess_names:
-        # Initialize list for new and old column names for warning message
-        colnames_old = []
-        colnames_new = []
-        for i in colnames_not_found_i:
-            col = df.columns[i]
-            name = __guess_name(df=df,
-                                col_i=i,
-                                colnames=colnames,
-                                fields=fields, **args)
-            # if the column name was changed
-            if col != name:
-                # Change name
-                colnames[i] = name
-                # Append old and new column name list
-                colnames_old.append(col)
-                colnames_new.append(name)
-        # If there are columns that were changed, give warning
-        if len(colnames_new) > 0:
-            warnings.warn(
-                message=f"The following column names... \n {colnames_old}\n"
-                f"... were replaced with \n {colnames_new}",
-                category=Warning
-                )
-        # Update not-found column names
-        colnames_not_found = [i for i in colnames_not_found
-                              if i not in colnames_old]
+    # Get the new column names. If cache is used and same kind of data has
+    # been already processed, get them from cache
+    if use_cache:
+        res = __get_colnames_with_cache(
+            df=df, guess_names=guess_names, fields=fields,
+            temp_dir=temp_dir, verify_sample=verify_sample,
+            n_workers=n_workers, **args)
+    else:
+        res = __get_colnames(df=df, guess_names=guess_names, fields=fields,
+                             n_workers=n_workers, **args)
+    colnames = res["colnames"]
+    colnames_old = res["colnames_old"]
+    colnames_new = res["colnames_new"]
+    colnames_not_found = res["colnames_not_found"]
+    # If there are columns that were changed, give warning
+    if len(colnames_new) > 0:
+        warnings.warn(
+            message=f"The following column names... \n {colnames_old}\n"
+            f"... were replaced with \n {colnames_new}",
+            category=Warning
+            )
     # Replace column names with new ones
     df.columns = colnames
 
@@ -211,6 +241,183 @@ def change_names(df, guess_names=True, make_unique=True, fields=None, **args):
 # HELP FUNCTIONS
 
 
+def __get_colnames(df, guess_names, fields, n_workers=1, **args):
+    """
+    This function finds standardized column names.
+    Input: DataFrame, whether to guess names, dictionary of fields, number
+    of columns that are checked concurrently
+    Output: A dictionary including new column names, names that were guessed
+    and their original names, and names that were not detected
+    """
+    # Initialize lists for column names
+    colnames = []
+    colnames_old = []
+    colnames_new = []
+    colnames_not_found = []
+    colnames_not_found_i = []
+    # Loop over column names
+    for i, col in enumerate(df.columns):
+        # Column name to lower case and remove spaces from beginning and end
+        # Get matching value from the dictionary
+        col_name = fields.get(col.lower().strip())
+        # If exact match was not found
+        if col_name is None:
+            # Do not change the colum name,
+            # and add it to not-found column names list
+            col_name = col
+            colnames_not_found.append(col_name)
+            colnames_not_found_i.append(i)
+        # Append the list of column names
+        colnames.append(col_name)
+
+    # If there are column names that were not detected and user wants them
+    # to be guessed
+    if len(colnames_not_found) > 0 and guess_names:
+        # Score all the column names against dictionary at once. The scores
+        # are used with strict and loose threshold
+        header_scores = utils.__score_headers(
+            colnames_not_found, fields.keys(),
+            args.get("scorer", utils.__token_sort_ratio))
+        # Relationships between columns are calculated only once
+        relations = utils.__create_column_relations(df)
+        # Search total, net price and VAT amount together. Columns whose
+        # names strongly match with dictionary are not searched (similarly
+        # as in __guess_name).
+        sums = {}
+        pattern_th = args.get("pattern_th", 0.9)
+        if utils.__is_percentage(pattern_th):
+            pattern_th_strict = 0.95 if pattern_th <= 0.95 else pattern_th
+            cols = [i for i in colnames_not_found_i
+                    if __test_if_loose_match(
+                        col=df.columns[i], fields=fields,
+                        pattern_th=pattern_th_strict,
+                        header_scores=header_scores) == df.columns[i]]
+            sums = __find_sum_columns(df=df, colnames=colnames, cols=cols)
+        for i, name in sums.items():
+            colnames_old.append(colnames[i])
+            colnames_new.append(name)
+            colnames[i] = name
+        colnames_not_found_i = [i for i in colnames_not_found_i
+                                if i not in sums.keys()]
+        # Profiles of columns. They store the results of tests that depend
+        # only on the data of the column.
+        profiles: Dict[int, Dict[str, Any]] = {}
+        # Tests that depend only on the column are run first. If there are
+        # multiple workers, columns are tested concurrently, and each worker
+        # fills its own profile that is added here. Otherwise, the columns
+        # are tested in __guess_name.
+        if n_workers > 1 and len(colnames_not_found_i) > 1:
+            def get_profile(i):
+                temp: Dict[int, Dict[str, Any]] = {}
+                __get_column_results(df=df, col_i=i, fields=fields,
+                                     header_scores=header_scores,
+                                     profiles=temp, **args)
+                return temp[i]
+            with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                profiles = dict(zip(colnames_not_found_i, executor.map(
+                    get_profile, colnames_not_found_i)))
+        # Decide names column by column. Only the tests that depend on names
+        # of other columns (e.g., whether BID belongs to organization or
+        # supplier, and voucher) are done here, so the result does not
+        # depend on the order in which the columns were tested concurrently.
+        for i in colnames_not_found_i:
+            col = df.columns[i]
+            name = __guess_name(df=df,
+                                col_i=i,
+                                colnames=colnames,
+                                fields=fields,
+                                header_scores=header_scores,
+                                relations=relations,
+                                profiles=profiles, **args)
+            # if the column name was changed
+            if col != name:
+                # Change name
+                colnames[i] = name
+                # Append old and new column name list
+                colnames_old.append(col)
+                colnames_new.append(name)
+        # Update not-found column names
+        colnames_not_found = [i for i in colnames_not_found
+                              if i not in colnames_old]
+    res = {
+        "colnames": colnames,
+        "colnames_old": colnames_old,
+        "colnames_new": colnames_new,
+        "colnames_not_found": colnames_not_found,
+        }
+    return res
+
+
+def __get_colnames_with_cache(df, guess_names, fields, temp_dir=None,
+                              verify_sample=None, n_workers=1, **args):
+    """
+    This function finds standardized column names by using on-disk cache.
+    Column names of data that have same column names, data types and
+    arguments are got from cache.
+    Input: DataFrame, whether to guess names, dictionary of fields,
+    temporary directory, number of rows that are used to verify names
+    from cache, number of columns that are checked concurrently
+    Output: A dictionary including new column names, names that were guessed
+    and their original names, and names that were not detected
+    """
+    if temp_dir is None:
+        # Get the name of higher level tmp directory
+        temp_dir_path = tempfile.gettempdir()
+        temp_dir = temp_dir_path + "/osta_tmp_dir"
+    # Check if spedicified directory exists. If not, create it
+    if not os.path.isdir(temp_dir):
+        os.makedirs(temp_dir)
+    con = cache.__open_cache(temp_dir + "/" + "change_names_cache.sqlite")
+    try:
+        key = __get_colnames_fingerprint(df, guess_names, fields, **args)
+        res = cache.__cache_get_many(con, [key]).get(key)
+        # If names were found from cache and they should be verified, guess
+        # names from sample of rows
+        if res is not None and verify_sample is not None and guess_names:
+            n = min(verify_sample, df.shape[0])
+            rng = np.random.default_rng(0)
+            ind = np.sort(rng.choice(df.shape[0], size=n, replace=False))
+            res_sample = __get_colnames(df=df.iloc[ind, :].copy(),
+                                        guess_names=guess_names,
+                                        fields=fields, n_workers=n_workers,
+                                        **args)
+            # If the names do not match, names are guessed from whole data
+            if res_sample != res:
+                res = None
+        # If names were not found, find them and store to cache
+        if res is None:
+            res = __get_colnames(df=df, guess_names=guess_names,
+                                 fields=fields, n_workers=n_workers, **args)
+            cache.__cache_put(con, key, res)
+    finally:
+        con.close()
+    return res
+
+
+def __get_colnames_fingerprint(df, guess_names, fields, **args):
+    """
+    This function creates a fingerprint of data that specifies column names,
+    data types and arguments that are used to find new column names.
+    Input: DataFrame, whether to guess names, dictionary of fields,
+    arguments passed into other functions
+    Output: string
+    """
+    # Functions are specified by their name
+    args = {k: (str(v.__module__) + "." + v.__qualname__
+                if callable(v) and hasattr(v, "__qualname__") else v)
+            for k, v in args.items()}
+    parts = [
+        [str(x) for x in df.columns],
+        [str(x) for x in df.dtypes],
+        guess_names,
+        sorted((str(k), str(v)) for k, v in fields.items()),
+        sorted((str(k), repr(v)) for k, v in args.items()),
+        ]
+    text = json.dumps(parts)
+    res = hashlib.md5(text.encode("utf-8")).hexdigest()
+    return res
+
+
 def __get_fields_df(fields, **args):
     """
     Fetch dictionary that contains fields and create a dictionary from it.
@@ -220,14 +427,10 @@ def __get_fields_df(fields, **args):
     # If fields was not provided, open files that include fields
     if fields is None:
         # Load data from /resources of package osta
-        path = pkg_resources.resource_filename(
-            "osta", "resources/" + "mandatory_fields.csv")
-        mandatory_fields = pd.read_csv(path
-                                       ).set_index("key")["value"].to_dict()
-        path = pkg_resources.resource_filename(
-            "osta", "resources/" + "optional_fields.csv")
-        optional_fields = pd.read_csv(path
-                                      ).set_index("key")["value"].to_dict()
+        mandatory_fields = resources.__load_resource(
+            "mandatory_fields.csv").set_index("key")["value"].to_dict()
+        optional_fields = resources.__load_resource(
+            "optional_fields.csv").set_index("key")["value"].to_dict()
         # Combine fields into one dictionary
         fields = {}
         fields.update(mandatory_fields)
@@ -261,56 +464,53 @@ def __get_fields_df(fields, **args):
 
 
 def __guess_name(df, col_i, colnames, fields, pattern_th=0.9, match_th=0.8,
-                 **args):
+                 sample_size=None, sample_margin=0.1, header_scores=None,
+                 relations=None, profiles=None, **args):
     """
-    Guess column names based on pattern.
+    Guess column names based on pattern. Results of tests that depend only
+    on the column are got from __get_column_results, and tests that depend
+    on names of other columns are run here.
     Input: DataFrame, index of column being guesses,
     current column names, match
-    between column names and standardized names.
+    between column names and standardized names, scores between column names
+    and names in dictionary, relations between columns, dictionary of
+    profiles of columns that are already created.
     Output: A guessed column name
     """
-    # INPUT CHECK
-    # Types of all other arguments are fixed
-    # pattern_th must be numeric value 0-1
-    if not utils.__is_percentage(pattern_th):
-        raise Exception(
-            "'pattern_th' must be a number between 0-1."
-            )
-    # match_th must be numeric value 0-100
-    if not utils.__is_percentage(match_th):
-        raise Exception(
-            "'match_th' must be a number between 0-1."
-            )
-    # INPUT CHECK END
-    # Remove spaces from beginning and end of the values
-    df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
     # Get the name of the column
     col = df.columns[col_i]
+    # Create relations between columns if they are not given
+    relations = (utils.__create_column_relations(df)
+                 if relations is None else relations)
+    # Get results of tests that depend only on the column. If they were not
+    # calculated beforehand, they are calculated now.
+    profiles = {} if profiles is None else profiles
+    results = __get_column_results(df=df, col_i=col_i, fields=fields,
+                                   pattern_th=pattern_th, match_th=match_th,
+                                   sample_size=sample_size,
+                                   sample_margin=sample_margin,
+                                   header_scores=header_scores,
+                                   profiles=profiles, **args)
+    profile = profiles[col_i]
 
-    # Try strict loose match (0.95) if pattern_th is smaller than 0.95
-    pattern_th_strict = 0.95 if pattern_th <= 0.95 else pattern_th
-    res = __test_if_loose_match(col=col, fields=fields,
-                                pattern_th=pattern_th_strict, **args)
-    # If there were match, column is renamed
-    if res != col:
-        col = res
+    # If there were strict match, column is renamed
+    if results["loose_match_strict"] != col:
+        col = results["loose_match_strict"]
     # Try if column is ID column
-    elif __test_if_BID(df=df, col_i=col_i, match_th=match_th):
+    elif results["bid"]:
         # BID can be from organization or supplier
         col = __org_or_suppl_BID(df=df, col_i=col_i, colnames=colnames,
-                                 match_th=match_th)
+                                 match_th=match_th, profile=profile,
+                                 relations=relations,
+                                 in_db=results["org_bid"])
     # Test if date
-    elif utils.__test_if_date(df=df.iloc[:, col_i]):
+    elif results["date"]:
         col = "date"
     # Test if column includes country codes
-    elif __test_if_in_db(df=df, col_i=col_i, colnames=colnames,
-                         db_file="land_codes.csv",
-                         test="country", match_th=match_th,
-                         **args):
+    elif results["country"]:
         col = "country"
     # Test if column includes VAT numbers
-    elif __test_if_vat_number(df=df, col_i=col_i, colnames=colnames,
-                              match_th=match_th):
+    elif results["vat_number"]:
         col = "vat_number"
     # Test if org_name
     elif __test_if_in_db(df=df, col_i=col_i, colnames=colnames,
@@ -319,50 +519,33 @@ def __guess_name(df, col_i, colnames, fields, pattern_th=0.9, match_th=0.8,
                          cols_not_match=["suppl_name", "suppl_number"],
                          cols_to_match=["org_number", "org_id"],
                          datatype=["object"],
-                         **args):
+                         profile=profile, relations=relations,
+                         found=results["org_name"], **args):
         col = "org_name"
     # Test if service_cat
-    elif __test_if_in_db(df=df, col_i=col_i, colnames=colnames,
-                         db_file="service_codes.csv",
-                         test="number", match_th=match_th,
-                         do_not_match=["account_number", "account_name"],
-                         datatype=["int64"],
-                         **args):
+    elif results["service_cat"]:
         col = "service_cat"
     # Test if service_cat_name
-    elif __test_if_in_db(df=df, col_i=col_i, colnames=colnames,
-                         db_file="service_codes.csv",
-                         test="name", match_th=match_th,
-                         do_not_match=["account_number", "account_name"],
-                         datatype=["object"],
-                         **args):
+    elif results["service_cat_name"]:
         col = "service_cat_name"
     # Test if account_number
-    elif __test_if_in_db(df=df, col_i=col_i, colnames=colnames,
-                         db_file="account_info.csv",
-                         test="number", match_th=match_th,
-                         do_not_match=["service_cat", "service_cat_name"],
-                         datatype=["int64"],
-                         **args):
+    elif results["account_number"]:
         col = "account_number"
     # Test if account_name
-    elif __test_if_in_db(df=df, col_i=col_i, colnames=colnames,
-                         db_file="account_info.csv",
-                         test="name", match_th=match_th,
-                         do_not_match=["service_cat", "service_cat_name"],
-                         datatype=["object"],
-                         **args):
+    elif results["account_name"]:
         col = "account_name"
     # # Test if org_number
     elif __test_match_between_colnames(df=df, col_i=col_i, colnames=colnames,
                                        cols_match=["org_name", "org_id"],
-                                       datatype=["int64"]
+                                       datatype=["int64"],
+                                       relations=relations
                                        ):
         col = "org_number"
     # Test if suppl_name
     elif __test_match_between_colnames(df=df, col_i=col_i, colnames=colnames,
                                        cols_match=["suppl_id"],
-                                       datatype=["object"]
+                                       datatype=["object"],
+                                       relations=relations
                                        ):
         col = "suppl_name"
     # test if price_ex_vat
@@ -387,32 +570,137 @@ def __guess_name(df, col_i, colnames, fields, pattern_th=0.9, match_th=0.8,
                         ):
         col = "vat_amount"
     # Test if voucher
-    elif utils.__test_if_voucher(df=df, col_i=col_i, colnames=colnames):
+    elif utils.__test_if_voucher(df=df, col_i=col_i, colnames=colnames,
+                                 profile=profile, relations=relations):
         col = "voucher"
     else:
         # Get match from partial matching
-        col = __test_if_loose_match(col=col, fields=fields,
-                                    pattern_th=pattern_th, **args)
+        col = results["loose_match"]
     return col
 
 
+def __get_column_results(df, col_i, fields, pattern_th=0.9, match_th=0.8,
+                         sample_size=None, sample_margin=0.1,
+                         header_scores=None, profiles=None, **args):
+    """
+    This function runs the tests that depend only on the column, i.e., not
+    on names of other columns. The results are stored to the profile of the
+    column so that the tests can be run concurrently before names are
+    decided in __guess_name. Tests are run in the same order as in
+    __guess_name, and they are stopped when the name is decided.
+    Input: DataFrame, index of the column, match between column names and
+    standardized names, scores between column names and names in
+    dictionary, dictionary of profiles of columns that are already created
+    Output: A dictionary including results of tests
+    """
+    # INPUT CHECK
+    # Types of all other arguments are fixed
+    # pattern_th must be numeric value 0-1
+    if not utils.__is_percentage(pattern_th):
+        raise Exception(
+            "'pattern_th' must be a number between 0-1."
+            )
+    # match_th must be numeric value 0-100
+    if not utils.__is_percentage(match_th):
+        raise Exception(
+            "'match_th' must be a number between 0-1."
+            )
+    # sample_size must be None or positive integer
+    if not (sample_size is None or (isinstance(sample_size, int) and
+                                    not isinstance(sample_size, bool) and
+                                    sample_size > 0)):
+        raise Exception(
+            "'sample_size' must be None or a positive integer."
+            )
+    # sample_margin must be numeric value 0-1
+    if not utils.__is_percentage(sample_margin):
+        raise Exception(
+            "'sample_margin' must be a number between 0-1."
+            )
+    # INPUT CHECK END
+    # Create a profile of the column. It is used by all the tests so that
+    # values are processed only once. If sample size is specified, profile
+    # is created from sample of rows.
+    profiles = {} if profiles is None else profiles
+    if col_i not in profiles:
+        profiles[col_i] = utils.__create_column_profile(
+            df.iloc[:, col_i], sample_size=sample_size,
+            sample_margin=sample_margin)
+    profile = profiles[col_i]
+    # If the results are already calculated
+    if "results" in profile:
+        return profile["results"]
+    col = df.columns[col_i]
+
+    def in_db(db_file, test):
+        # Test if values can be found from data base
+        return __test_if_found_in_db(df=df, col_i=col_i, db_file=db_file,
+                                     test=test, match_th=match_th,
+                                     profile=profile)
+    # Tests that are run if name did not match strictly. Organization name
+    # is decided with other columns, so the tests after it are run even
+    # if values were found from data base.
+    tests = [
+        ("bid", lambda: __test_if_BID(
+            df=df, col_i=col_i, match_th=match_th, profile=profile)),
+        ("date", lambda: utils.__test_if_date(
+            df=df.iloc[:, col_i], profile=profile)),
+        ("country", lambda: in_db("land_codes.csv", "country")),
+        ("vat_number", lambda: __test_if_vat_number(
+            df=df, col_i=col_i, colnames=None, match_th=match_th,
+            profile=profile)),
+        ("org_name", lambda: in_db("municipality_codes.csv", "name")),
+        ("service_cat", lambda: in_db("service_codes.csv", "number")),
+        ("service_cat_name", lambda: in_db("service_codes.csv", "name")),
+        ("account_number", lambda: in_db("account_info.csv", "number")),
+        ("account_name", lambda: in_db("account_info.csv", "name")),
+        ]
+    # Try strict loose match (0.95) if pattern_th is smaller than 0.95
+    pattern_th_strict = 0.95 if pattern_th <= 0.95 else pattern_th
+    res = {}
+    res["loose_match_strict"] = __test_if_loose_match(
+        col=col, fields=fields, pattern_th=pattern_th_strict,
+        header_scores=header_scores, **args)
+    # If there were match, column is renamed and other tests are not needed
+    if res["loose_match_strict"] == col:
+        for key, test in tests:
+            res[key] = test()
+            if res[key] and key != "org_name":
+                break
+        else:
+            # Order of values is used to test if the column is voucher
+            utils.__get_profile_item(profile, "is_monotonic_increasing")
+            # Get match from partial matching
+            res["loose_match"] = __test_if_loose_match(
+                col=col, fields=fields, pattern_th=pattern_th,
+                header_scores=header_scores, **args)
+        # BID can be from organization if it is found from data base
+        if res.get("bid"):
+            res["org_bid"] = in_db("municipality_codes.csv", "bid")
+    profile["results"] = res
+    return res
+
+
 def __test_if_loose_match(col, fields, pattern_th,
-                          scorer=fuzz.token_sort_ratio,
-                          **args):
+                          scorer=utils.__token_sort_ratio,
+                          header_scores=None, **args):
     """
     Guess column names based on pattern on it.
-    Input: Column name and names that are tried to be match with it
+    Input: Column name and names that are tried to be match with it, scores
+    between column names and names in dictionary
     Output: A guessed column name
     """
     # If column is not empty
     if col.strip():
+        # Score the column name if the scores were not calculated already
+        if header_scores is None or col not in header_scores["rows"]:
+            header_scores = utils.__score_headers([col], fields.keys(), scorer)
         # Try partial match, get the most similar key value
-        col_name_part = process.extractOne(col, fields.keys(),
-                                           scorer=scorer)
+        col_name_part = utils.__get_header_match(header_scores, col)
         # Value [0,1] to a number between 0-100
         pattern_th = pattern_th*100
         # If the matching score is over threshold
-        if col_name_part[1] >= pattern_th:
+        if col_name_part is not None and col_name_part[1] >= pattern_th:
             # Get only the key name
             col_name_part = col_name_part[0]
             # Based on the key, get the value
@@ -420,46 +708,58 @@ def __test_if_loose_match(col, fields, pattern_th,
     return col
 
 
-def __test_if_BID(df, col_i, match_th):
+def __test_if_BID(df, col_i, match_th, profile=None):
     """
     This function checks if the column defines BIDs (y-tunnus)
-    Input: DataFrame, index of the column, found final column names
+    Input: DataFrame, index of the column, found final column names, profile
+    of the column
     Output: Boolean value
     """
-    # Initialize result as False
-    res = False
-    # Test if pattern found
-    patt_found = utils.__are_valid_bids(df.iloc[:, col_i])
-    patt_found = patt_found.value_counts()/df.shape[0]
-    # Test of length correct
-    len_correct = df.iloc[:, col_i].astype(str).str.len() == 9
-    len_correct = len_correct.value_counts()/df.shape[0]
-    # If Trues exist in both, get the smaller portion. Otherwise, True was not
-    # found and the result is 0 / not found
-    if True in patt_found.index and True in len_correct.index:
-        # Get portion of Trues and take only value
-        patt_found = patt_found[patt_found.index][0]
-        len_correct = len_correct[len_correct.index][0]
-        # Get smaller value
-        patt_found = min(patt_found, len_correct)
-    else:
-        patt_found = 0
+    # Create a profile of column if it is not given
+    profile = (utils.__create_column_profile(df.iloc[:, col_i])
+               if profile is None else profile)
+
+    def get_ratio(p):
+        # Test if pattern found
+        patt_found = utils.__get_profile_ratio(
+            p, utils.__get_profile_item(p, "bid"))
+        # Test of length correct
+        len_correct = utils.__get_profile_ratio(p, p["lengths"] == 9)
+        # If Trues exist in both, get the smaller portion. Otherwise, True was
+        # not found and the result is 0 / not found
+        if patt_found > 0 and len_correct > 0:
+            # Get smaller value
+            patt_found = min(patt_found, len_correct)
+        else:
+            patt_found = 0
+        return patt_found
     # Check if over threshold
-    if patt_found >= match_th:
-        res = True
+    res = utils.__is_over_threshold(profile, get_ratio, match_th)
     return res
 
 
-def __org_or_suppl_BID(df, col_i, colnames, match_th):
+def __org_or_suppl_BID(df, col_i, colnames, match_th, profile=None,
+                       relations=None, in_db=None):
     """
     This function checks if the column defines BID of organization or supplier
-    Input: DataFrame, index of the column, found final column names
+    Input: DataFrame, index of the column, found final column names, profile
+    of the column, relations between columns, whether BIDs were found from
+    data base (if None, it is tested)
     Output: The final colname of BID column
     """
-    # If BID can be found from the database
-    if __test_if_in_db(df=df, col_i=col_i, colnames=colnames,
-                       db_file="municipality_codes.csv",
-                       test="bid", match_th=match_th):
+    # Create a profile of column if it is not given
+    profile = (utils.__create_column_profile(df.iloc[:, col_i])
+               if profile is None else profile)
+    # Create relations between columns if they are not given
+    relations = (utils.__create_column_relations(df)
+                 if relations is None else relations)
+    # Test if BID can be found from the database
+    if in_db is None:
+        in_db = __test_if_found_in_db(df=df, col_i=col_i,
+                                      db_file="municipality_codes.csv",
+                                      test="bid", match_th=match_th,
+                                      profile=profile)
+    if in_db:
         res = "org_bid"
     else:
         # Initialize result as supplier ID
@@ -470,15 +770,10 @@ def __org_or_suppl_BID(df, col_i, colnames, match_th):
         for col_match in cols_match:
             # If the column is in colnames
             if col_match in colnames:
-                # Subset the data by taking only specified columns
-                temp = df.iloc[:, [col_i, colnames.index(col_match)]]
-                # Drop rows with blank values
-                temp = temp.dropna()
-                # Number of unique combinations
-                n_uniq = temp.drop_duplicates().shape[0]
                 # If there are as many combinations as there are
                 # individual values these columns match
-                if n_uniq == df.iloc[:, colnames.index(col_match)].nunique():
+                if utils.__column_determines(
+                        relations, colnames.index(col_match), col_i):
                     res = "org_id"
         # If all the identifiers are missing, give "bid", because we
         # cannot be sure
@@ -495,19 +790,26 @@ def __org_or_suppl_BID(df, col_i, colnames, match_th):
         if "org_id" in colnames and all(df.iloc[:, col_i] ==
                                         df.iloc[:, colnames.index("org_id")]):
             res = "org_id"
-        # If there are not many unique values, it might be organization ID
-        if df.iloc[:, col_i].nunique()/df.shape[0] < 0.5:
+        # If there are not many unique values, it might be organization ID.
+        # Sample has relatively more unique values, so whole column is used.
+        profile = utils.__get_profile_full(profile)
+        if len(profile["values"])/profile["n"] < 0.5:
             res = "org_id"
     return res
 
 
-def __test_match_between_colnames(df, col_i, colnames, cols_match, datatype):
+def __test_match_between_colnames(df, col_i, colnames, cols_match, datatype,
+                                  relations=None):
     """
     This function checks if the column defines extra information of
     another column / if the column is related to that
-    Input: DataFrame, index of the column, found final column names
+    Input: DataFrame, index of the column, found final column names,
+    relations between columns
     Output: Boolean value
     """
+    # Create relations between columns if they are not given
+    relations = (utils.__create_column_relations(df)
+                 if relations is None else relations)
     # Initialize results as False
     res = False
     # Test the data type
@@ -516,15 +818,10 @@ def __test_match_between_colnames(df, col_i, colnames, cols_match, datatype):
         for col_match in cols_match:
             # If the column is in colnames
             if col_match in colnames:
-                # Subset the data by taking only specified columns
-                temp = df.iloc[:, [col_i, colnames.index(col_match)]]
-                # Drop rows with blank values
-                temp = temp.dropna()
-                # Number of unique combinations
-                n_uniq = temp.drop_duplicates().shape[0]
                 # If there are as many combinations as there are
                 # individual values these columns match
-                if n_uniq == df.iloc[:, colnames.index(col_match)].nunique():
+                if utils.__column_determines(
+                        relations, colnames.index(col_match), col_i):
                     res = True
     return res
 
@@ -541,68 +838,175 @@ def __test_if_sums(df, col_i, colnames, test_sum, match_with, datatype):
     # If all columns are available
     if all(mw in colnames for mw in match_with):
         # Take only specific columns
-        ind = list(colnames.index(mw) for mw in match_with)
-        ind.append(col_i)
-        # Preserve the order of indices
-        ind.sort()
-        df = df.iloc[:, ind]
-        # Drop empty rows
-        df = df.dropna()
+        ind = {mw: colnames.index(mw) for mw in match_with}
+        ind[test_sum] = col_i
         # If the datatypes are correct
-        if all(df.dtypes == datatype):
-            # If VAT is tested and value is correct
-            if test_sum == "vat_amount" and\
-                all(df.iloc[:, col_i] ==
-                    df.iloc[:, colnames.index("total")] -
-                    df.iloc[:, colnames.index("price_ex_vat")]):
-                res = True
-            # If total is tested and value is correct
-            elif test_sum == "total" and\
-                all(df.iloc[:, col_i] ==
-                    df.iloc[:, colnames.index("price_ex_vat")] +
-                    df.iloc[:, colnames.index("vat_amount")]):
-                res = True
-            # If price_ex_vat is tested and value is correct
-            elif test_sum == "price_ex_vat" and\
-                all(df.iloc[:, col_i] ==
-                    df.iloc[:, colnames.index("total")] -
-                    df.iloc[:, colnames.index("vat_amount")]):
-                res = True
+        if all(df.dtypes[i] == datatype for i in ind.values()):
+            # Total must be sum of net price and VAT amount
+            res = __is_sum(df.iloc[:, ind["total"]],
+                           df.iloc[:, ind["price_ex_vat"]],
+                           df.iloc[:, ind["vat_amount"]])
+    return res
+
+
+def __is_sum(total, price, vat, tol=0.01):
+    """
+    This function checks if total is sum of net price and VAT amount. Rows
+    with missing values are not checked.
+    Input: total, net price and VAT amount (pd.Series or np.array), tolerance
+    that allows rounding errors
+    Output: Boolean value
+    """
+    diff = np.abs(np.asarray(total, dtype=float) -
+                  np.asarray(price, dtype=float) -
+                  np.asarray(vat, dtype=float))
+    diff = diff[~np.isnan(diff)]
+    res = bool(np.all(diff <= tol + 1e-9))
+    return res
+
+
+def __find_sum_columns(df, colnames, cols, tol=0.01, sample_size=1000,
+                       head_size=50, max_values=1000000):
+    """
+    This function searches columns that define total, net price and VAT
+    amount. Combinations of columns are first tested from the first rows of
+    a sample, and the candidates are checked from the whole sample and then
+    from all rows. Combinations are compared in chunks so that memory use
+    does not grow with the cube of the number of columns.
+    Input: DataFrame, found final column names, indices of columns whose
+    names are not known, tolerance that allows rounding errors, number of
+    rows in sample, number of rows that are used to find candidates, maximum
+    number of values that are compared at once
+    Output: A dictionary including indices of columns and their new names
+    """
+    res: Dict[int, str] = {}
+    names = ["total", "price_ex_vat", "vat_amount"]
+    # Only unknown columns are searched. Columns that already have a name
+    # are used to complete the combination.
+    cols = sorted(set(i for i, col in enumerate(colnames) if col in names)
+                  | set(cols))
+    cols = [i for i in cols if df.dtypes[i] == "float64"]
+    # If there is nothing to search
+    if len(cols) < 3 or all(name in colnames for name in names):
+        return res
+    # Get sample of rows
+    n = df.shape[0]
+    ind = (utils.__get_sample_index(n, sample_size)
+           if n > sample_size else np.arange(n))
+    x = df.iloc[ind, cols].to_numpy(dtype=float)
+    # Columns that include only zeros could be added to any column, so they
+    # are not searched
+    nonzero = np.any(np.abs(np.nan_to_num(x)) > tol, axis=0)
+    cols = [i for i, keep in zip(cols, nonzero) if keep]
+    x = x[:, nonzero]
+    m = len(cols)
+    if m < 3:
+        return res
+    # Candidates are searched from the first rows. Pairs of columns are
+    # compared in chunks that include at most max_values values.
+    x_head = x[:head_size, :]
+    chunk_size = max(1, max_values // (x_head.shape[0] * m))
+    for a in range(m):
+        for start in range(0, m, chunk_size):
+            ind_b = np.arange(start, min(start + chunk_size, m))
+            # Compare the column with sums of pairs. Rows with missing values
+            # are not checked.
+            diff = np.abs(x_head[:, a, None, None] - x_head[:, ind_b, None] -
+                          x_head[:, None, :])
+            found = np.all((diff <= tol + 1e-9) | np.isnan(diff), axis=0)
+            # Test each pair only once and do not use the column itself
+            found &= ind_b[:, None] < np.arange(m)[None, :]
+            found[ind_b == a, :] = False
+            found[:, a] = False
+            for b, c in np.argwhere(found):
+                b = ind_b[b]
+                # Check candidate from the whole sample. At least one row
+                # must be without missing values.
+                diff_sample = x[:, a] - x[:, b] - x[:, c]
+                if np.all(np.isnan(diff_sample)) or \
+                        not __is_sum(x[:, a], x[:, b], x[:, c], tol=tol):
+                    continue
+                temp = __get_sum_names(df=df, colnames=colnames,
+                                       cols=[cols[a], cols[b], cols[c]])
+                # If names are not contradictory and the combination is
+                # correct also in all rows
+                if temp is not None and __is_sum(df.iloc[:, cols[a]],
+                                                 df.iloc[:, cols[b]],
+                                                 df.iloc[:, cols[c]],
+                                                 tol=tol):
+                    res = {i: name for i, name in temp.items()
+                           if colnames[i] != name}
+                    return res
     return res
 
 
-def __test_if_vat_number(df, col_i, colnames, match_th):
+def __get_sum_names(df, colnames, cols):
+    """
+    This function gets names for columns where first column is sum of
+    other columns. VAT amount is smaller than net price.
+    Input: DataFrame, found final column names, indices of total and two
+    other columns
+    Output: A dictionary including indices of columns and their names or
+    None if names are contradictory with names that are already found
+    """
+    a, b, c = cols
+    parts = ["price_ex_vat", "vat_amount"]
+    # If one of the parts has already name, the other gets the other name
+    if colnames[b] in parts:
+        name_b = colnames[b]
+    elif colnames[c] in parts:
+        name_b = parts[1 - parts.index(colnames[c])]
+    # Otherwise, the column that has smaller values is VAT amount
+    elif np.nanmedian(np.abs(df.iloc[:, b])) < \
+            np.nanmedian(np.abs(df.iloc[:, c])):
+        name_b = "vat_amount"
+    else:
+        name_b = "price_ex_vat"
+    found = {
+        a: "total",
+        b: name_b,
+        c: parts[1 - parts.index(name_b)],
+        }
+    # Names must match with names that are already found
+    res: Optional[Dict[int, str]] = found
+    if any(colnames[i] in ["total"] + parts and colnames[i] != name
+           for i, name in found.items()):
+        res = None
+    return res
+
+
+def __test_if_vat_number(df, col_i, colnames, match_th, profile=None):
     """
     This function checks if the column defines VAT numbers
-    Input: DataFrame, index of the column, found final column names
+    Input: DataFrame, index of the column, found final column names, profile
+    of the column
     Output: Boolean value
     """
-    # Initialize result
-    res = False
-    # Get specific column and remove NaNs
-    df = df.iloc[:, col_i]
-    nrow = df.shape[0]
-    df = df.dropna()
-    # Check if values are VAT numbers
-    res_patt = utils.__are_valid_vat_numbers(df)
+    # Create a profile of column if it is not given
+    profile = (utils.__create_column_profile(df.iloc[:, col_i])
+               if profile is None else profile)
+
+    def get_ratio(p):
+        # Check if values are VAT numbers
+        res_patt = utils.__get_profile_item(p, "vat_number")
+        return utils.__get_profile_ratio(p, res_patt)
     # How many times the pattern was found from values? If enough, then we
     # can be sure that the column includes VAT numbers
-    if sum(res_patt)/nrow >= match_th:
-        res = True
+    res = utils.__is_over_threshold(profile, get_ratio, match_th)
     return res
 
 
 def __test_if_in_db(df, col_i, colnames, test, db_file, match_th,
                     datatype=None, cols_not_match=None, cols_to_match=None,
-                    **args):
+                    profile=None, relations=None, found=None, **args):
     """
     This function tests if the column includes account or service category info
     Input: DataFrame, index of the column, found final column names, account
-    or service data type to search
+    or service data type to search, profile of the column, relations between
+    columns, whether values were found from data base (if None, it is tested)
     Output: Boolean value
     """
     # Initialize results as False
-    res = False
     res2 = False
     res3 = False
     # Check that the column does not match with other specified columns
@@ -610,51 +1014,83 @@ def __test_if_in_db(df, col_i, colnames, test, db_file, match_th,
         res2 = __test_match_between_colnames(df=df, col_i=col_i,
                                              colnames=colnames,
                                              cols_match=cols_not_match,
-                                             datatype=datatype)
+                                             datatype=datatype,
+                                             relations=relations)
     # Check if other columns that specify same instance are found
     if cols_to_match is not None:
         if cols_to_match is not None:
             res3 = __test_match_between_colnames(df=df, col_i=col_i,
                                                  colnames=colnames,
                                                  cols_match=cols_to_match,
-                                                 datatype=datatype)
-    # Get specific column and remove NaNs
-    df = df.iloc[:, col_i]
-    df = df.dropna()
-    df.drop_duplicates()
-    # Does the column include integers
-    res_list = df.astype(str).str.isdigit()
-    if ((any(res_list) and test == "number") or (all(
-            -res_list) and test != "number")):
-        # Test if col values can be found from the table
-        # Load codes from resources of package osta
-        path = pkg_resources.resource_filename(
-            "osta",
-            "resources/" + db_file)
-        db = pd.read_csv(path, index_col=0)
-        # If countries, take whole data, otherwise get only specific column
-        if test == "country":
-            db = db.drop("code_num", axis=1)
-        else:
-            db = db[[test]]
-        # Initialize a data frame
-        df_res = pd.DataFrame()
-        # Loop over columns of database
-        for i, data in db.items():
-            # Does the column include certain codes?
-            if data.dtype == "object" and df.dtype == "object":
-                temp = df.astype(str).str.lower().isin(
-                    data.astype(str).str.lower())
-            else:
-                temp = df.isin(data)
-            df_res[i] = temp
-        # How many times the value was found from the codes? If enough, then we
-        # can be sure that the column includes land codes
-        if sum(df_res.sum(axis=1) > 0)/df_res.shape[0] >= match_th:
-            res = True
+                                                 datatype=datatype,
+                                                 relations=relations)
+    # Test if values can be found from data base. The result depends only on
+    # the column, so it can be given if it is already tested.
+    res = (__test_if_found_in_db(df=df, col_i=col_i, test=test,
+                                 db_file=db_file, match_th=match_th,
+                                 profile=profile)
+           if found is None else found)
     # Combine result
     if res2 is False and (res or res3):
         res = True
     else:
         res = False
     return res
+
+
+def __test_if_found_in_db(df, col_i, test, db_file, match_th, profile=None):
+    """
+    This function tests if the values of column can be found from data base.
+    The result depends only on the column.
+    Input: DataFrame, index of the column, account or service data type to
+    search, data base, threshold, profile of the column
+    Output: Boolean value
+    """
+    # Create a profile of column if it is not given
+    profile = (utils.__create_column_profile(df.iloc[:, col_i])
+               if profile is None else profile)
+
+    def get_ratio(p):
+        # The result depends only on the column, so it is stored to profile
+        # and calculated only once
+        key = "in_db/" + db_file + "/" + test
+        if key not in p:
+            p[key] = calc_ratio(p)
+        return p[key]
+
+    def calc_ratio(p):
+        ratio = 0
+        # Does the column include integers? Only unique values without NaNs
+        # are checked
+        res_list = p["is_digit"]
+        if ((any(res_list) and test == "number") or (all(
+                ~res_list) and test != "number")) and p["n_not_null"] > 0:
+            # Test if col values can be found from the table
+            # Load codes from resources of package osta
+            db = resources.__load_resource(db_file, index_col=0)
+            # If countries, take whole data, otherwise get only specific
+            # column
+            if test == "country":
+                db = db.drop("code_num", axis=1)
+            else:
+                db = db[[test]]
+            # Get lowercase values of database; they are normalized only once
+            db_keys = resources.__load_resource_keys(
+                db_file, cols=db.columns, index_col=0)
+            # Initialize result for unique values
+            found = np.zeros(len(p["values"]), dtype=bool)
+            # Loop over columns of database
+            for i, data in db.items():
+                # Does the column include certain codes?
+                if data.dtype == "object" and p["dtype"] == "object":
+                    temp = utils.__get_profile_item(p, "keys").isin(
+                        db_keys[i])
+                else:
+                    temp = p["values"].isin(data)
+                found = found | temp.to_numpy(dtype=bool)
+            # How many times the value was found from the codes?
+            ratio = utils.__get_profile_ratio(p, found, n=p["n_not_null"])
+        return ratio
+    # If enough, then we can be sure that the column includes the values
+    res = utils.__is_over_threshold(profile, get_ratio, match_th)
+    return res
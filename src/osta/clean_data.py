@@ -1,12 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import osta.__utils as utils
+import osta.__resources as resources
 import pandas as pd
 import warnings
-from fuzzywuzzy import fuzz
-from fuzzywuzzy import process
-import pkg_resources
 import numpy as np
+from typing import Any, Dict, List, Tuple
 
 
 def clean_data(df, **args):
@@ -23,6 +22,7 @@ def clean_data(df, **args):
         `**args`: Additional arguments passes into other functions:
 
         `date_format`: The format of date that will be in output data.
+        If None, dates are returned as datetime64 values.
         (By default: date_format="%d-%m-%Y")
 
         `dayfirst`: Boolean value or None to specify the format of date
@@ -35,6 +35,12 @@ def clean_data(df, **args):
         If None, function determines the format automatically.
         (By default: yearfirst=None)
 
+        `mixed_dates`: Boolean value specifying whether the date column can
+        include dates in different formats, e.g., '02.01.2023',
+        '2023-01-02' and '20230102'. If True, dates are grouped based on
+        their shape, and the format is determined for each group.
+        (By default: mixed_dates=False)
+
         `country_format`: A string speciying the format of country in the
         output data. Must be one of the following options: 'name_fin',
         'name_en', "code_2char", 'code_3char', 'code_num', or 'code_iso'.
@@ -84,6 +90,11 @@ def clean_data(df, **args):
         If None, the most current information is used and duplicates from
         previous years are removed. (By default: db_year=None)
 
+        `check_vat_checksum`: A boolean value specifying whether check
+        digits of VAT numbers are also checked. Check digits are checked for
+        Finnish, Swedish, German, Belgian, Italian, Dutch and Polish VAT
+        numbers. (By default: check_vat_checksum=False)
+
         `disable_*`: A boolean value specifying whether * data
         is checked. * can be one of the following options: 'org',
         'suppl', 'date', 'sums', 'country', 'voucher', 'account' or
@@ -226,9 +237,7 @@ def __standardize_country(df, disable_country=False,
         return df
     # INPUT CHECK END
     # Load data base
-    path = pkg_resources.resource_filename(
-        "osta", "resources/" + "land_codes.csv")
-    country_codes = pd.read_csv(path, index_col=0)
+    country_codes = resources.__load_resource("land_codes.csv", index_col=0)
     # country_format must be one of the database columns
     if not (isinstance(country_format, str) and
             country_format in country_codes.columns):
@@ -237,24 +246,16 @@ def __standardize_country(df, disable_country=False,
             f"{country_codes.columns.tolist()}"
             )
     # INPUT CHECK END
-    # Get country data from df
-    df_country = df[cols_to_check]
-    # Get unique countries
-    df_country = df_country.drop_duplicates()
-    # Loop over values and add info on them
-    not_found = pd.DataFrame()
-    for i, x in df_country.iterrows():
-        # Get the country from data base; case insensitive search
-        ind = country_codes.applymap(
-            lambda col: str(col).lower()).isin(
-                x.astype(str).str.lower().values.tolist()).sum(axis=1) > 0
-        if any(ind):
-            temp = country_codes.loc[ind, :]
-            # Assing result to original DF
-            df.loc[df[cols_to_check[0]] == x[0], cols_to_check[0]] = temp[
-                country_format].values[0]
-        else:
-            not_found = pd.concat([not_found, x], axis=1)
+    # Get the countries from data base; case insensitive search
+    pos = __find_countries(df[cols_to_check[0]])
+    found = pos >= 0
+    # Get countries that were not found; missing values are not searched
+    not_found = df.loc[~found & df[cols_to_check[0]].notna(), cols_to_check]
+    not_found = not_found.drop_duplicates().T
+    # Assign result to original DF
+    if any(found):
+        df.loc[found, cols_to_check[0]] = country_codes[
+            country_format].values[pos[found]]
     # If some countries were not detected
     if not_found.shape[1] > 0:
         warnings.warn(
@@ -265,6 +266,42 @@ def __standardize_country(df, disable_country=False,
     return df
 
 
+def __get_country_lookup():
+    """
+    This function creates a lookup table where all the names and codes of
+    countries point to the country in data base. The search is case
+    insensitive.
+    Input: -
+    Output: A dictionary including lowercase names and codes as keys and
+    row positions of data base as values
+    """
+    # Lowercase values of data base; they are normalized only once
+    keys = resources.__load_resource_keys("land_codes.csv", index_col=0)
+    res: Dict[str, int] = {}
+    # If name or code is shared, the first country is used
+    for i, row in enumerate(keys.itertuples(index=False, name=None)):
+        for key in row:
+            res.setdefault(key, i)
+    return res
+
+
+def __find_countries(values):
+    """
+    This function finds countries from data base.
+    Input: pd.Series including countries in any format
+    Output: np.array including row positions of data base (-1 if country
+    was not found or value is missing)
+    """
+    lookup = __get_country_lookup()
+    # Search only unique values
+    codes, uniq = pd.factorize(values.to_numpy())
+    pos = utils.__normalize_keys(pd.Series(uniq, dtype=object)).map(lookup)
+    # Last value is used for missing values
+    pos = np.append(pos.fillna(-1).to_numpy(dtype=int), -1)
+    res = pos[codes]
+    return res
+
+
 def __clean_sums(df, disable_sums=False, **args):
     """
     This function checks that sums (total, vat, netsum) are in float format,
@@ -330,7 +367,8 @@ def __clean_sums(df, disable_sums=False, **args):
 
 
 def __standardize_date(df, disable_date=False, date_format="%d-%m-%Y",
-                       dayfirst=None, yearfirst=None, **args):
+                       dayfirst=None, yearfirst=None, mixed_dates=False,
+                       **args):
     """
     This function identifies the format of dates and standardize them.
     Input: df
@@ -356,10 +394,63 @@ def __standardize_date(df, disable_date=False, date_format="%d-%m-%Y",
         raise Exception(
             "'yearfirst' must be True or False or None."
             )
+    if not (isinstance(date_format, str) or date_format is None):
+        raise Exception(
+            "'date_format' must be a string or None."
+            )
+    if not isinstance(mixed_dates, bool):
+        raise Exception(
+            "'mixed_dates' must be True or False."
+            )
     # INPUT CHECK END
+    # Get unique dates of date column. Each date is processed only once, and
+    # the results are assigned to all rows based on codes.
+    codes, df_date = pd.factorize(df.loc[:, col_to_check],
+                                  use_na_sentinel=False)
+    df_date = pd.Series(df_date)
+    # Standardize dates; either all dates have the same format or format is
+    # determined for each group of dates that have similar shape
+    if mixed_dates:
+        df_date_mod = __parse_mixed_dates(df_date, date_format=date_format,
+                                          dayfirst=dayfirst,
+                                          yearfirst=yearfirst)
+    else:
+        df_date_mod = __parse_dates(df_date, date_format=date_format,
+                                    dayfirst=dayfirst, yearfirst=yearfirst)
+    # Convert dates
+    if df_date_mod is not None:
+        # Assign dates to all rows
+        df[col_to_check] = df_date_mod.values[codes]
+        # Check if there were Nones
+        df_date = df_date[df_date_mod.isna() & df_date.notna()]
+        df_date = df_date.values.tolist()
+        if len(df_date) > 0:
+            warnings.warn(
+                message=f"The format of following dates where not detected, "
+                f"and they are converted to NaN. "
+                f"Please check them for errors: {df_date}",
+                category=Warning
+                )
+    else:
+        warnings.warn(
+            message="The format of dates where not detected, "
+            "and the 'date' column is unchanged. Please check that dates "
+            "have separators between days, months, and years.",
+            category=Warning
+            )
+    return df
+
+
+def __parse_dates(df_date, date_format, dayfirst, yearfirst):
+    """
+    This function identifies the format of dates and converts them.
+    All the dates are expected to have the same format.
+    Input: series, format of output, if day comes first, if year comes first
+    Output: series or None if the format was not detected
+    """
     convert_date = False
-    # Get date column
-    df_date = df.loc[:, col_to_check]
+    # Format of dates that are converted
+    format_in = None
     # Split dates from separator. Result is multiple columns
     # with year, month and day separated
     df_date_mod = df_date.astype(str).str.split(r"[-/.]", expand=True)
@@ -369,6 +460,10 @@ def __standardize_date(df, disable_date=False, date_format="%d-%m-%Y",
         if not (isinstance(dayfirst, bool) or isinstance(yearfirst, bool)):
             df_date_mod, dayfirst, yearfirst = __get_format_of_dates_w_sep(
                 df_date_mod)
+            format_in = __get_date_format(dayfirst, yearfirst)
+        else:
+            # Format is specified only by dayfirst and yearfirst
+            df_date_mod = df_date
         convert_date = True
     # Try to reformat DDMMYYYY format
     elif utils.__test_if_date(df_date_mod.iloc[:, 0]):
@@ -381,38 +476,104 @@ def __standardize_date(df, disable_date=False, date_format="%d-%m-%Y",
             dayfirst, yearfirst = __get_format_of_dates_wo_sep(df_date_mod)
         # If format was found, standardize
         if dayfirst is not None and yearfirst is not None:
-            # Add separators to dates
+            # Convert dates into datetime values. They do not have to be
+            # parsed anymore, so format is not needed.
             df_date_mod = __convert_dates_without_sep(
                 df_date_mod,
                 char_len=char_len,
                 dayfirst=dayfirst,
                 yearfirst=yearfirst)
             convert_date = True
+    res = None
     # Convert dates
     if convert_date and dayfirst is not None and yearfirst is not None:
-        # Standardize dates
-        df[col_to_check] = pd.to_datetime(df_date_mod, dayfirst=dayfirst,
-                                          yearfirst=yearfirst,
-                                          errors="coerce")
-        # Change the formatting
-        df[col_to_check] = df[col_to_check].dt.strftime(date_format)
-        # Check if there were Nones
-        df_date = df_date[df.loc[:, col_to_check].isna()].values.tolist()
-        if len(df_date) > 0:
-            warnings.warn(
-                message=f"The format of following dates where not detected, "
-                f"and they are converted to NaN. "
-                f"Please check them for errors: {df_date}",
-                category=Warning
-                )
+        res = __convert_dates(df_date_mod,
+                              format_in=format_in,
+                              date_format=date_format,
+                              dayfirst=dayfirst,
+                              yearfirst=yearfirst)
+    return res
+
+
+def __parse_mixed_dates(df_date, date_format, dayfirst, yearfirst):
+    """
+    This function converts dates that can have different formats. Dates
+    are grouped based on their shape, and the format is determined
+    separately for each group.
+    Input: series, format of output, if day comes first, if year comes first
+    Output: series or None if the format was not detected for any group
+    """
+    # Get shapes of dates; missing values are not included in any group
+    sig = __get_date_signature(df_date)
+    sig[df_date.isna()] = np.nan
+    # Loop over groups, and convert dates of each group with single call
+    parsed = []
+    for ind in df_date.groupby(sig).groups.values():
+        temp = __parse_dates(df_date[ind], date_format=date_format,
+                             dayfirst=dayfirst, yearfirst=yearfirst)
+        if temp is not None:
+            parsed.append(temp)
+    # Combine groups. Dates that were not converted are NaN
+    res = None
+    if len(parsed) > 0:
+        res = pd.concat(parsed).reindex(df_date.index)
+    return res
+
+
+def __get_date_signature(df):
+    """
+    This function creates a signature that describes the shape of dates,
+    e.g., "D.D.Y" for "02.01.2023" or "Y-D-D" for "2023-01-02". Dates
+    without separators are grouped based on their length, i.e., whether the
+    year has 2 or 4 characters.
+    Input: series
+    Output: series
+    """
+    df = df.astype(str)
+    # Segments with 3-4 characters are years, and segments with 1-2
+    # characters are days or months
+    res = df.str.replace(r"\d{3,}", "Y", regex=True)
+    res = res.str.replace(r"\d+", "D", regex=True)
+    # Dates without separators, e.g., DDMMYYYY, DMYYYY, DDMMYY
+    ind = df.str.isdigit()
+    res[ind] = np.where(df[ind].str.len() > 6, "N8", "N6")
+    return res
+
+
+def __convert_dates(df, format_in, date_format, dayfirst, yearfirst):
+    """
+    This function converts dates into datetime values and then into
+    specified format.
+    Input: series, format of dates (if None, format is inferred by pandas),
+    format of output (if None, datetime values are returned), if day
+    comes first, if year comes first
+    Output: series
+    """
+    # If format is known, pandas does not have to guess it for each value
+    if format_in is None:
+        res = pd.to_datetime(df, dayfirst=dayfirst, yearfirst=yearfirst,
+                             errors="coerce")
     else:
-        warnings.warn(
-            message="The format of dates where not detected, "
-            "and the 'date' column is unchanged. Please check that dates "
-            "have separators between days, months, and years.",
-            category=Warning
-            )
-    return df
+        res = pd.to_datetime(df, format=format_in, errors="coerce")
+    # Change the formatting
+    if date_format is not None:
+        res = res.dt.strftime(date_format)
+    return res
+
+
+def __get_date_format(dayfirst, yearfirst):
+    """
+    This function gets the format of dates that are created in
+    __get_format_of_dates_w_sep.
+    Input: if day comes first, if year comes first
+    Output: format string or None
+    """
+    res = None
+    if dayfirst is not None and yearfirst is not None:
+        res = "%Y/" if yearfirst else ""
+        res = res + ("%d/%m" if dayfirst else "%m/%d")
+        res = res + ("" if yearfirst else "/%Y")
+    return res
 
 
 def __get_format_of_dates_w_sep(df):
@@ -513,79 +674,41 @@ def __get_format_of_dates_wo_sep(df):
     Input: series
     Output: If year comes first, if day comes first
     """
+    # Get characters of dates in matrix
+    mat, lengths = __get_char_matrix(df)
     # Get maximum number of characters
-    char_len = int(max(df.astype(str).str.len()))
+    char_len = int(lengths.max()) if len(lengths) > 0 else 0
     yearfirst = None
     dayfirst = None
     if char_len == 8 or char_len == 6:
         # Expected year range
-        years = list(range(1970, 2050)) if char_len == 8 else list(
-            range(15, 50))
+        years = [1970, 2049] if char_len == 8 else [15, 49]
         # Get only those values that have maximum number of characters
-        ind = df.astype(str).str.len() == char_len
-        date_temp = df[ind]
+        mat = mat[lengths == char_len, :]
 
-        # Find place of year
+        # Find place of year; which values are between expected years?
         year_len = 4 if char_len == 8 else 2
-        i = 0
-        j = year_len
-        res_year = pd.DataFrame()
-        for x in range(0, char_len-1, year_len):
-            i_temp = i + x
-            j_temp = j + x
-            temp = date_temp.astype(str).str[i_temp:j_temp]
-            # Which values are between expected years?
-            res = max(years) >= int(max(temp)) >= min(years)
-            # Add to DF
-            res = pd.DataFrame([i_temp, j_temp, res], index=["i", "j", "res"])
-            res_year = pd.concat([res_year, res], axis=1)
-        # Adjust column names
-        res_year.columns = range(res_year.shape[1])
-        # Get values based on results
-        i_year = [res_year.loc["i", x] for i, x in enumerate(res_year.columns)
-                  if res_year.loc["res", x]]
-        j_year = [res_year.loc["j", x] for i, x in enumerate(res_year.columns)
-                  if res_year.loc["res", x]]
+        i_year = [i for i in range(0, char_len-1, year_len)
+                  if years[1] >= __get_numbers(
+                      mat, i, year_len)[0].max() >= years[0]]
         # Get only the individual values, if there are only one valid result
-        if (len(i_year) == 1 and len(j_year) == 1):
-            i_year_ind = int(i_year[0])
-            j_year_ind = int(j_year[0])
+        if len(i_year) == 1:
             # Remove year from dates
-            if i_year_ind == 0:
-                date_temp = date_temp.astype(str).str[j_year_ind:]
+            if i_year[0] == 0:
+                mat = mat[:, year_len:]
             else:
-                date_temp = date_temp.astype(str).str[:i_year_ind]
+                mat = mat[:, :i_year[0]]
             # Get place of the year
-            yearfirst = True if i_year_ind == 0 else False
-    # If year was found
-    if yearfirst is not None:
-        # Expected day and month ranges
-        months = list(range(1, 13))
-        days = list(range(1, 32))
-        # Ger place of the month and day
-        i = 0
-        j = 2
-        res_day = pd.DataFrame()
-        for x in range(0, char_len-year_len-1, 2):
-            i_temp = i + x
-            j_temp = j + x
-            temp = date_temp.astype(str).str[i_temp:j_temp]
-            # Which values are between expected days?
-            res_d = max(days) >= int(max(temp)) >= min(days)
-            # Which values are between expected months?
-            res_m = max(months) >= int(max(temp)) >= min(months)
-            # Add to DF
-            res = pd.DataFrame([res_d, res_m], index=["day", "month"])
-            res_day = pd.concat([res_day, res], axis=1)
-        # Adjust column names
-        res_day.columns = range(res_day.shape[1])
-        # Get index of where month is located
-        month_i = [i for i, x in enumerate(res_day.columns)
-                   if res_day.loc["day", x] and res_day.loc["month", x]]
+            yearfirst = True if i_year[0] == 0 else False
+    # If year was found and there are days and months left
+    if yearfirst is not None and mat.shape[1] >= 4:
+        # Get index of where month is located; which values are between
+        # expected months (and days)?
+        month_i = [i for i, x in enumerate([0, 2])
+                   if 12 >= __get_numbers(mat, x, 2)[0].max() >= 1]
         if len(month_i) == 1:
-            month_ind = int(month_i[0])
             # If month was the latter
-            dayfirst = True if month_ind == res_day.shape[1]-1 else False
+            dayfirst = True if month_i[0] == 1 else False
     # Combine result
     result = [dayfirst, yearfirst]
     return result
@@ -596,102 +719,157 @@ def __convert_dates_without_sep(df, char_len, dayfirst, yearfirst):
     This function standardizes the dates that are without
     separators between days, months and years.
     Input: series
-    Output: list of values with separators
+    Output: series with datetime values
     """
-    # Create result DF and add columns
-    res = pd.DataFrame(df)
-    res.columns = ["original"]
-    res = res.assign(mod=res["original"])
-    res = res.assign(day=None)
-    res = res.assign(month=None)
-    res = res.assign(year=None)
-
-    # Modify first values that have maximum amount of characters
+    # Get characters of dates in matrix
+    mat, lengths = __get_char_matrix(df)
     year_len = 4 if char_len == 8 else 2
-    # Get the year based on yearfirst, and remove year from dates
-    if yearfirst:
-        year = res["mod"].astype(str).str[:year_len]
-        res["mod"] = res["mod"].astype(str).str[year_len:]
-    else:
-        year = res["mod"].astype(str).str[-year_len:]
-        res["mod"] = res["mod"].astype(str).str[:-year_len]
-    # Add year to results
-    res["year"] = year
+    # Initialize results
+    year = np.zeros(len(lengths), dtype=np.int64)
+    month = np.zeros(len(lengths), dtype=np.int64)
+    day = np.zeros(len(lengths), dtype=np.int64)
+    is_valid = np.zeros(len(lengths), dtype=bool)
+    # Loop over numbers of characters. Values with same number of characters
+    # have days, months and years in same places.
+    for x in np.flatnonzero(np.bincount(lengths)):
+        # Number of characters that are left for day and month
+        dm_len = x - year_len
+        # Number of characters in the first value of day and month. Values
+        # that have 2 or 4 characters are sure cases (1 or 2 characters for
+        # both days and months).
+        first_len = dm_len // 2 if dm_len in [2, 4] else None
+        ind = lengths == x
+        # If all the values have same number of characters, all rows are
+        # taken without copying them
+        ind = slice(None) if ind.all() else ind
+        temp = mat[ind, :]
+        # Get place where day and month start
+        dm_start = year_len if yearfirst else 0
+        # For values that have 3 character, we have to do differently,
+        # because we cannot be sure what values are months and what day.
+        # Determine this by looking a common pattern
+        if dm_len == 3:
+            first_len = __get_day_month_len(temp, dm_start, dayfirst)
+        if first_len is None:
+            continue
+        # Get the year based on yearfirst
+        year[ind], is_valid_y = __get_numbers(
+            temp, 0 if yearfirst else dm_len, year_len)
+        # Based on dayfirst, get days and months
+        first, is_valid_1 = __get_numbers(temp, dm_start, first_len)
+        second, is_valid_2 = __get_numbers(temp, dm_start + first_len,
+                                           dm_len - first_len)
+        day[ind] = first if dayfirst else second
+        month[ind] = second if dayfirst else first
+        is_valid[ind] = is_valid_y & is_valid_1 & is_valid_2
+    # Year with 2 characters is interpreted in same way as "%y"
+    if year_len == 2:
+        year = np.where(year < 69, year + 2000, year + 1900)
+
+    # Combine result to dates
+    res = __create_dates(year, month, day, is_valid)
+    res = pd.Series(res, index=df.index)
+    return res
 
-    # Add days and months for sure cases (2 or 1 characters for both days
-    # and months)
+
+def __get_day_month_len(mat, start, dayfirst):
+    """
+    This function determines the number of characters in the first value of
+    day and month when they have 3 characters together. Both options are
+    tested; the values must be in the range of days and months.
+    Input: np.array with characters, place where day and month start, if day
+    comes first
+    Output: number of characters or None if it was not determined
+    """
+    # Get tests ranges; in which range 1st and 2nd set of values should be?
+    days = [1, 31]
+    months = [1, 12]
+    temp_test1 = days if dayfirst else months
+    temp_test2 = months if dayfirst else days
+    # Loop over number of characters that values can have
+    lens = []
     for i in [1, 2]:
-        dm_len = char_len-year_len if i == 2 else char_len-year_len-2
-        ind = res["mod"].astype(str).str.len() == dm_len
-        # Based on dayfirst, get values; remove them from mod column
-        if dayfirst:
-            day = res.loc[ind, "mod"].astype(str).str[:i]
-            month = res.loc[ind, "mod"].astype(str).str[i:]
-        else:
-            month = res.loc[ind, "mod"].astype(str).str[:i]
-            day = res.loc[ind, "mod"].astype(str).str[i:]
-        # Add to data
-        res.loc[ind, "day"] = day
-        res.loc[ind, "month"] = month
-        # Remove from mod column
-        res.loc[ind, "mod"] = ""
-
-    # For values that have 3 character, we have to do differently, because
-    # we cannot be sure what values are months and what day.
-    # Determine this by looking a common pattern
-    # Expected day and month ranges
-    if any(res["mod"] != ""):
-        months = list(range(1, 13))
-        days = list(range(1, 32))
-        # Get indices where day+month has 3 characters
-        ind = res["mod"].astype(str).str.len() == 3
-
-        # Get tests ranges; in which range 1st and 2nd set of values should be?
-        temp_test1 = days if dayfirst else months
-        temp_test2 = months if dayfirst else days
-        res_day = pd.DataFrame()
-        # Loop over number of characters that values can have
-        for i in [1, 2]:
-            # Get values
-            temp1 = res["mod"].astype(str).str[:i]
-            temp2 = res["mod"].astype(str).str[i:]
-            # Test values
-            temp1 = max(temp_test1) >= int(max(temp1)) >= min(temp_test1)
-            temp2 = max(temp_test2) >= int(max(temp2)) >= min(temp_test2)
-            # Add to DF
-            len1 = i
-            len2 = max(res["mod"].astype(str).str.len())-i
-            temp = pd.DataFrame([len1, len2, temp1, temp2])
-            res_day = pd.concat([res_day, temp], axis=1)
-        # Adjust index and column names
-        index = ["day", "month"] if dayfirst else ["month", "day"]
-        res_day.index = ["len1", "len2"] + index
-        res_day.columns = range(res_day.shape[1])
-        # Get values where the pattern is correct; how many characters
-        # days and months have?
-        res_i = res_day.loc[index, :].sum(axis=0) == res_day.loc[
-            index, :].shape[0]
-        if sum(res_i) == 1:
-            res_day = res_day.loc[["len1", "len2"], res_i]
-            # Get place of the month and day, based on dayfirst
-            if dayfirst:
-                day = res.loc[ind, "mod"].astype(str).str[
-                    :res_day.loc["len1"].values[0]]
-                month = res.loc[ind, "mod"].astype(str).str[
-                    res_day.loc["len1"].values[0]:]
-            else:
-                month = res.loc[ind, "mod"].astype(str).str[
-                    :res_day.loc["len1"].values[0]]
-                day = res.loc[ind, "mod"].astype(str).str[
-                    res_day.loc["len1"].values[0]:]
-            # Add to data
-            res.loc[ind, "day"] = day
-            res.loc[ind, "month"] = month
-            # Remove from mod column
-            res.loc[ind, "mod"] = ""
-
-    # Combine result to date with separators
-    res = res["day"] + "/" + res["month"] + "/" + res["year"]
+        temp1 = __get_numbers(mat, start, i)[0].max()
+        temp2 = __get_numbers(mat, start + i, 3-i)[0].max()
+        # Test values
+        if (temp_test1[1] >= temp1 >= temp_test1[0] and
+                temp_test2[1] >= temp2 >= temp_test2[0]):
+            lens.append(i)
+    # The length is determined only if exactly one option is possible
+    res = lens[0] if len(lens) == 1 else None
+    return res
+
+
+def __get_char_matrix(df):
+    """
+    This function converts values into matrix where each column includes one
+    character. Shorter values are padded with zeros.
+    Input: series
+    Output: np.array (uint8) with characters, np.array with number of
+    characters
+    """
+    values = df.astype(str).to_numpy()
+    lengths = np.fromiter(map(len, values), dtype=np.int64,
+                          count=len(values))
+    width = max(int(lengths.max()), 1) if len(lengths) > 0 else 1
+    # Fixed width byte array can be viewed as matrix of characters
+    try:
+        mat = values.astype("S" + str(width))
+        mat = mat.view(np.uint8).reshape(len(values), width)
+    except UnicodeEncodeError:
+        # Characters that are not ASCII are not digits
+        mat = values.astype("U" + str(width))
+        mat = mat.view(np.uint32).reshape(len(values), width)
+        mat = np.minimum(mat, 255).astype(np.uint8)
+    return [mat, lengths]
+
+
+def __get_numbers(mat, start, width):
+    """
+    This function gets numbers from matrix of characters.
+    Input: np.array with characters, place of the first digit, number of
+    digits
+    Output: np.array with numbers, np.array specifying if the number is valid
+    """
+    res = np.zeros(mat.shape[0], dtype=np.int64)
+    # Number is valid if all its characters are digits
+    is_valid = np.full(mat.shape[0], 0 < width and start + width <= mat.shape[1])
+    # Calculate numbers digit by digit. Characters that are not digits are
+    # over 9 after subtraction, since unsigned values wrap around.
+    for i in range(start, min(start + width, mat.shape[1])):
+        digit = mat[:, i] - np.uint8(ord("0"))
+        is_valid = is_valid & (digit <= 9)
+        res = res * 10 + digit
+    res = np.where(is_valid, res, 0)
+    return [res, is_valid]
+
+
+def __create_dates(year, month, day, is_valid):
+    """
+    This function creates dates from years, months and days. Dates that do
+    not exist are NaT.
+    Input: np.array with years, np.array with months, np.array with days,
+    np.array specifying which values are valid
+    Output: np.array with datetime values
+    """
+    # Number of days in months. February has 29 days in leap years.
+    month_days = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+    is_leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = month_days[np.clip(month, 0, 12)] + (is_leap & (month == 2))
+    # Dates must exist and they must be inside the range of pandas
+    is_valid = (is_valid & (month >= 1) & (month <= 12) & (day >= 1) &
+                (day <= month_days) & (year > pd.Timestamp.min.year) &
+                (year < pd.Timestamp.max.year))
+    # Calculate days since 1970-01-01. Years start from March so that leap
+    # day is the last day of year.
+    year = year - (month <= 2)
+    era = year // 400
+    year = year - era * 400
+    day = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day = era * 146097 + year * 365 + year // 4 - year // 100 + day - 719468
+    # Convert days into nanoseconds
+    res = np.where(is_valid, day * 86400 * 10**9, np.iinfo(np.int64).min)
+    res = res.astype(np.int64).view("datetime64[ns]")
     return res
 
 
@@ -718,9 +896,8 @@ def __standardize_org(df, disable_org=False, org_data=None, **args):
         return df
     # INPUT CHECK END
     if org_data is None:
-        path = pkg_resources.resource_filename(
-            "osta", "resources/" + "municipality_codes.csv")
-        org_data = pd.read_csv(path, index_col=0, dtype=str)
+        org_data = resources.__load_resource("municipality_codes.csv",
+                                             index_col=0, dtype=str)
     # Column of db that are matched with columns that are being checked
     # Subset to match with cols_to_check
     cols_to_match = ["bid", "vat_number", "number", "name"]
@@ -767,9 +944,8 @@ def __standardize_account(df, disable_account=False, account_data=None,
         return df
     # INPUT CHECK END
     if account_data is None:
-        path = pkg_resources.resource_filename(
-            "osta", "resources/" + "account_info.csv")
-        account_data = pd.read_csv(path, index_col=0)
+        account_data = resources.__load_resource("account_info.csv",
+                                                 index_col=0)
         # Subset by taking only specific years
         account_data = utils.__subset_data_based_on_year(
             df, df_db=account_data, **args)
@@ -819,9 +995,8 @@ def __standardize_service(df, disable_service=False,
         return df
     # INPUT CHECK END
     if service_data is None:
-        path = path = pkg_resources.resource_filename(
-            "osta", "resources/" + "service_codes.csv")
-        service_data = pd.read_csv(path, index_col=0)
+        service_data = resources.__load_resource("service_codes.csv",
+                                                 index_col=0)
         # Subset by taking only specific years
         service_data = utils.__subset_data_based_on_year(
             df, df_db=service_data, **args)
@@ -887,7 +1062,8 @@ def __standardize_suppl(df, disable_suppl=False, suppl_data=None, **args):
 
 def __standardize_based_on_db(df, df_db,
                               cols_to_check, cols_to_match,
-                              pattern_th=0.7, scorer=fuzz.token_sort_ratio,
+                              pattern_th=0.7,
+                              scorer=utils.__token_sort_ratio,
                               disable_partial=False,
                               **args):
     """
@@ -904,6 +1080,8 @@ def __standardize_based_on_db(df, df_db,
             )
     # Value [0,1] to a number between 0-100, because fuzzywuzzy requires that
     pattern_th = pattern_th*100
+    # Get default scorer if it is not specified
+    scorer = utils.__get_scorer(scorer)
     # INPUT CHECK END
     # Which column are found from df and df_db
     cols_df = [x for x in cols_to_check if x in df.columns]
@@ -1025,113 +1203,120 @@ def __replace_old_values_with_new(df,
                                   old_values, new_values,
                                   cols_to_check, cols_to_match):
     """
-    Replace values of df with new_values based on corresponding old_values
+    Replace values of df with new_values based on corresponding old_values.
+    Rows of df are matched with old values by their keys, and all the values
+    are replaced at once. Rows that include missing values are not replaced.
     Input: df, current values of it, and new values that replace old values
     Output: df with new values
     """
     # Which values were modified?
     # Get indices of those rows that are changed
     ind_mod = (old_values.fillna("") != new_values.fillna("")).sum(axis=1) > 0
-    ind_mod = [i for i, x in enumerate(ind_mod) if x]
-    # Loop over those rows and replace the values of original data columns
+    ind_mod = np.flatnonzero(ind_mod.to_numpy())
+    if len(ind_mod) == 0:
+        return df
+    # Get keys of old values and rows of df; same rows have same key
+    keys = __get_row_keys(pd.concat([old_values, df], ignore_index=True))
+    keys_old = keys[:old_values.shape[0]]
+    keys_df = keys[old_values.shape[0]:]
+    # Group old values by their current value. Values with missing values
+    # do not match with any row.
+    old_na = old_values.isna().any(axis=1).to_numpy()
+    new_na = new_values.isna().any(axis=1).to_numpy()
+    old_rows = list(old_values.itertuples(index=False, name=None))
+    new_rows = list(new_values.itertuples(index=False, name=None))
+    groups: Dict[Tuple[Any, ...], List[int]] = {}
+    for i in np.flatnonzero(~old_na):
+        groups.setdefault(old_rows[i], []).append(i)
+    # Replace values in the same order as they were modified. If new value
+    # is modified later, rows are replaced again.
+    final = {}
     for i in ind_mod:
-        # Get old and new rows
-        old_row = old_values.iloc[i, :].values.tolist()
-        new_row = new_values.iloc[i, :].values.tolist()
-        # Replace values with new ones
-        df.loc[(df == old_row).sum(axis=1) == df.shape[1], :] = new_row
+        if old_na[i]:
+            continue
+        members = groups.pop(old_rows[i], [])
+        for j in members:
+            final[j] = i
+        if len(members) > 0 and not new_na[i]:
+            groups.setdefault(new_rows[i], []).extend(members)
+    # Get the new values for each key and assign them all at once
+    target = np.full(len(keys), -1)
+    for j, i in final.items():
+        target[keys_old[j]] = i
+    target = target[keys_df]
+    rows = np.flatnonzero(target >= 0)
+    if len(rows) > 0:
+        for k in range(df.shape[1]):
+            df.iloc[rows, k] = new_values.iloc[target[rows], k].to_numpy()
     return df
 
 
+def __get_row_keys(df):
+    """
+    This function converts rows into integer keys. Rows that have same
+    values have same key.
+    Input: df
+    Output: np.array of keys
+    """
+    res = np.zeros(df.shape[0], dtype=np.int64)
+    for k in range(df.shape[1]):
+        codes, uniq = pd.factorize(df.iloc[:, k].to_numpy())
+        # Combine keys with codes of the column and make them small again
+        res = pd.factorize(res * (len(uniq) + 1) + codes + 1)[0]
+    return res
+
+
 def __get_matches_from_db(df, df_db,
                           cols_to_check, cols_to_match,
                           pattern_th, scorer,
                           disable_partial):
     """
     Is there some data missing or incorrect? Based on df_db, this function
-    replaces values of df.
+    replaces values of df. All unique rows are matched at once with hash
+    indexes that are built from the database.
     Input: df, and data base
     Output: df with correct values
     """
     # Create a copy that will be modified
     df_mod = df.copy()
-    # Initialize DF for warning messages
+    # Get values of database that are assigned to df
+    values_db = df_db.loc[:, cols_to_match]
+    # Build hash indexes; each key column of database is normalized once
+    db_index = __build_db_index(df_db, cols_to_match)
+    # Get position of the first matching database row for each variable
+    pos = __find_positions_from_db(df, db_index,
+                                   cols_to_check, cols_to_match)
+    # Which variable is used? BID takes the precedence, then VAT number,
+    # number and name
+    found = pos.notna().values
+    col_used = found.argmax(axis=1)
+    found = found.any(axis=1)
+    row_pos = pos.values[np.arange(df.shape[0]), col_used]
+    # If there were other variables, check if they match with data base
+    # values acquired by the variable that was used
+    missmatch = np.zeros(df.shape[0], dtype=bool)
     missmatch_df = pd.DataFrame()
-    not_detected_df = pd.DataFrame()
+    if len(cols_to_check) > 1:
+        missmatch, missmatch_df = __check_if_missmatch_db(
+            pos=pos, found=found, col_used=col_used, row_pos=row_pos,
+            values_db=values_db, cols_to_check=cols_to_check,
+            cols_to_match=cols_to_match)
+    # If false, try partial match if values include names
     part_match_df = pd.DataFrame()
-
-    # Loop over rows
-    for i, row in df.iterrows():
-        # Intialize a DF for variables' position in data base
-        temp = pd.DataFrame()
-        # Loop over variables
-        for j, x in enumerate(cols_to_check):
-            # Get name, number and id if they are found from the df,
-            # otherwise get False
-            var_df = row[df.columns == cols_to_check[j]]
-            var_df = var_df.astype(str).str.lower().values
-            # Can name, number and BID be found from the df_db?
-            # Get True/False list
-            var_db = df_db.loc[:, cols_to_match[j]].astype(
-                str).str.lower().values
-            var_db = var_db == var_df
-            # Add to DF
-            temp[x] = var_db
-        # Loop over variables
-        found = False
-        missmatch = False
-        for j, x in enumerate(cols_to_check):
-            # If 1st, 2nd... or nth variable was found from database
-            if any(temp[x]):
-                row_db = df_db.loc[temp[x].tolist(), cols_to_match]
-                # row_db = row_db.values.tolist()[0]
-                found = True
-                # If there were other variables,
-                # check if they match with data base
-                # values acquired by jth variable
-                if temp.shape[1] > 1:
-                    missmatch_df, missmatch = __check_if_missmatch_db(
-                       temp=temp, row_db=row_db, j=j, df_db=df_db,
-                       cols_to_check=cols_to_check,
-                       cols_to_match=cols_to_match,
-                       missmatch_df=missmatch_df)
-            # If match was found, break for loop; do not check other variables
-            if found:
-                break
-        # If false, try partial match if values include names
-        if found is False and "name" in cols_to_match:
-            # Get name from df and database
-            name_df = row[df.columns == cols_to_check[
-                cols_to_match.index("name")]].values[0]
-            name_db = df_db.loc[:, "name"]
-            # Try partial match, get the most similar name
-            name_part = process.extractOne(name_df, name_db, scorer=scorer)
-            # If the matching score is over threshold
-            if disable_partial is False and name_part[1] >= pattern_th:
-                # Get only the name
-                name_part = name_part[0]
-                # Find row based on name with partial match
-                row_db = (df_db.loc[df_db.loc[:, "name"] == name_part,
-                                    cols_to_match])
-                # Add row to final data
-                df_mod.iloc[i, :] = row_db.values.tolist()[0]
-                # Store info for warning message
-                temp = pd.DataFrame([name_df, name_part],
-                                    index=[cols_to_check[
-                                        cols_to_match.index("name")],
-                                        "found match"])
-                part_match_df = pd.concat([part_match_df, temp], axis=1)
-                found = True
-        # If match was found add row to final data
-        if found and missmatch is False:
-            # There might be multiple matches, get first one.
-            row_db = row_db.iloc[[0], :] if row_db.shape[0] > 1 else row_db
-            # Assign the row only
-            df_mod.iloc[i, :] = row_db.iloc[0, :]
-        else:
-            # Store data for warning message: data was not found
-            row = pd.DataFrame(row)
-            not_detected_df = pd.concat([not_detected_df, row], axis=1)
+    if disable_partial is False and "name" in cols_to_match:
+        row_pos, found, part_match_df = __get_partial_matches_from_db(
+            df=df, df_db=df_db, found=found, row_pos=row_pos,
+            cols_to_check=cols_to_check, cols_to_match=cols_to_match,
+            pattern_th=pattern_th, scorer=scorer)
+    # If match was found add row to final data. There might be multiple
+    # matches, the first one is used.
+    ind = found & ~missmatch
+    if any(ind):
+        temp = values_db.iloc[row_pos[ind].astype(int), :]
+        for k in range(df_mod.shape[1]):
+            df_mod.iloc[ind, k] = temp.iloc[:, k].values
+    # Store data for warning message: data was not found
+    not_detected_df = df.loc[~ind, :]
     # If some data had missmatch
     if missmatch_df.shape[0] > 0:
         missmatch_df = missmatch_df.drop_duplicates()
@@ -1147,7 +1332,7 @@ def __get_matches_from_db(df, df_db,
         warnings.warn(
             message=f"The following data "
             f"was not detected. Please check it for errors: "
-            f"\n{not_detected_df.transpose()}",
+            f"\n{not_detected_df}",
             category=Warning
             )
     # If partial match of name was used
@@ -1162,52 +1347,144 @@ def __get_matches_from_db(df, df_db,
     return df_mod
 
 
-def __check_if_missmatch_db(temp, row_db, j, df_db,
-                            cols_to_check, cols_to_match, missmatch_df):
+def __build_db_index(df_db, cols_to_match):
+    """
+    This function builds hash indexes from key columns of database.
+    Input: data base, columns that are used as keys
+    Output: A dictionary including pd.Series (normalized value -> position of
+    the first matching row in data base) for each key column
+    """
+    db_index = {}
+    for col in cols_to_match:
+        # Get only those values that are not missing
+        values = df_db[col]
+        ind = values.notna().values
+        values = utils.__normalize_keys(values[ind])
+        # Get positions of rows; the first occurence is used
+        pos = pd.Series(np.arange(df_db.shape[0])[ind], index=values.values)
+        pos = pos[~pos.index.duplicated()]
+        db_index[col] = pos
+    return db_index
+
+
+def __find_positions_from_db(df, db_index, cols_to_check, cols_to_match):
+    """
+    This function finds positions of matching database rows for each row and
+    variable of df.
+    Input: df, hash indexes of database, columns being checked and matched
+    Output: pd.DataFrame including positions (or NaN if not found) where
+    columns are variables
+    """
+    pos = pd.DataFrame(index=range(df.shape[0]))
+    for x, col in zip(cols_to_check, cols_to_match):
+        values = df[x]
+        # Get positions of the first matching rows
+        temp = utils.__normalize_keys(values).map(db_index[col])
+        # Missing values are not matched
+        temp[values.isna()] = np.nan
+        pos[x] = temp.values.astype(float)
+    return pos
+
+
+def __check_if_missmatch_db(pos, found, col_used, row_pos, values_db,
+                            cols_to_check, cols_to_match):
     """
     This function checks if there are missmatch between row values of df
     and database.
-    Input: df with indices that specify the row being checked currently,
-    database row, j is the index of variable being checked,
-    whole database, cols being checked, cols being matched, DF containing
+    Input: positions of matching database rows for each variable, whether
+    the row was found, index of variable that was used, position of row that
+    was found, database values, cols being checked, cols being matched.
+    Output: boolean values indicating if missmatch was found, DF containing
     missmatches.
-    Output: DF containing missmatches, and boolean value indicating if
-    missmatch was found.
     """
     # Initialize result
-    missmatch = False
-    # Take other columns than j
-    temp = temp.loc[:, [x for x in cols_to_check
-                        if x not in cols_to_check[j]]]
-    temp = temp.loc[:, temp.sum(axis=0) > 0]
-    # If other variables had also matches
-    if temp.shape[1] > 0:
-        # Loop over variables
-        for k, c in enumerate(temp.columns):
+    missmatch = np.zeros(pos.shape[0], dtype=bool)
+    records: List[Tuple[int, pd.DataFrame]] = []
+    # Loop over variables that were used to find the row
+    for j, x in enumerate(cols_to_check):
+        ind_j = found & (col_used == j)
+        if not any(ind_j):
+            continue
+        # Take other columns than j
+        cols_other = [c for c in cols_to_check if c != x]
+        cols_other_db = [values_db.columns.get_loc(c) for c in cols_to_match
+                         if c != cols_to_match[j]]
+        # Get values that will be added to the final data if everything's OK
+        value = values_db.iloc[row_pos[ind_j].astype(int), cols_other_db]
+        value = value.reset_index(drop=True)
+        rows_j = np.flatnonzero(ind_j)
+        # Loop over other variables that had also matches
+        for c in cols_other:
+            pos_c = pos[c].values[ind_j]
+            ind_c = ~np.isnan(pos_c)
+            if not any(ind_c):
+                continue
             # Get variable from database
-            temp_db = df_db.loc[
-                temp[c].values, [
-                    x for x in cols_to_match
-                    if x not in cols_to_match[j]]
-                ].values.tolist()[0]
-            # Get variable that was in values that will be
-            # added to the final data if everything's OK
-            value = [row_db.values.tolist()[0][num] for num, x in
-                     enumerate(cols_to_match) if x not in
-                     cols_to_match[j]]
+            temp_db = values_db.iloc[pos_c[ind_c].astype(int), cols_other_db]
+            temp_db = temp_db.reset_index(drop=True)
+            temp_value = value.loc[ind_c, :].reset_index(drop=True)
             # Check if they equal
-            if value != temp_db:
-                # Get values
-                names1 = temp.columns.tolist()
+            not_equal = ((temp_value != temp_db) &
+                         ~(temp_value.isna() & temp_db.isna())).any(axis=1)
+            not_equal = not_equal.values
+            for k in np.flatnonzero(not_equal):
                 # Store data for warning message
-                names2 = list("Found " + x for x in names1)
-                names = [x for z in zip(names1, names2) for x in z]
-                values = pd.DataFrame([value, temp_db], index=names)
-                missmatch_df = pd.concat([missmatch_df, values],
-                                         axis=1, ignore_index=True)
-                # Missmatch was found
-                missmatch = True
-    return [missmatch_df, missmatch]
+                names = [c, "Found " + c]
+                values = pd.DataFrame([temp_value.iloc[k, :].tolist(),
+                                       temp_db.iloc[k, :].tolist()],
+                                      index=names)
+                records.append((int(rows_j[ind_c][k]), values))
+            # Missmatch was found
+            missmatch[rows_j[ind_c][not_equal]] = True
+    # Combine data for warning message in the order of rows
+    missmatch_df = pd.DataFrame()
+    if len(records) > 0:
+        records = sorted(records, key=lambda x: x[0])
+        missmatch_df = pd.concat([x[1] for x in records],
+                                 axis=1, ignore_index=True)
+    return [missmatch, missmatch_df]
+
+
+def __get_partial_matches_from_db(df, df_db, found, row_pos,
+                                  cols_to_check, cols_to_match,
+                                  pattern_th, scorer):
+    """
+    This function finds rows from database with partial matching of names.
+    Only those rows that were not found with exact match are searched.
+    Input: df, data base, whether the rows were found, positions of found
+    rows, cols being checked, cols being matched, threshold and scorer.
+    Output: Updated positions and found rows, DF containing partial matches
+    """
+    found = found.copy()
+    row_pos = row_pos.copy()
+    part_match = []
+    # Get name from df
+    col_name = cols_to_check[cols_to_match.index("name")]
+    names_df = df[col_name].values
+    # Build index of names in database only if it is needed
+    if any(~found):
+        fuzzy_index = utils.__build_fuzzy_index(df_db.loc[:, "name"])
+    # Loop over rows that were not found; missing names cannot be matched
+    for i in np.flatnonzero(~found):
+        name_df = names_df[i]
+        if not isinstance(name_df, str):
+            continue
+        # Try partial match, get the most similar name if the matching score
+        # is over threshold
+        name_part = utils.__fuzzy_index_extract_one(
+            name_df, fuzzy_index, scorer=scorer, score_cutoff=pattern_th)
+        if name_part is not None:
+            # Get the position of the first row with the found name
+            row_pos[i] = name_part[2]
+            found[i] = True
+            # Store info for warning message
+            part_match.append([name_df, name_part[0]])
+    part_match_df = pd.DataFrame()
+    if len(part_match) > 0:
+        part_match_df = pd.DataFrame(part_match,
+                                     columns=[col_name, "found match"])
+        part_match_df = part_match_df.transpose()
+    return [row_pos, found, part_match_df]
 
 
 def __check_variable_pair(df, cols_to_check, dtypes, **args):
@@ -1235,7 +1512,8 @@ def __check_variable_pair(df, cols_to_check, dtypes, **args):
     return df
 
 
-def __check_vat_number(df, cols_to_check, disable_vat_number=False, **args):
+def __check_vat_number(df, cols_to_check, disable_vat_number=False,
+                       check_vat_checksum=False, **args):
     """
     This function checks that VAT numbers has correct patterns
     and match with business IDs.
@@ -1247,6 +1525,10 @@ def __check_vat_number(df, cols_to_check, disable_vat_number=False, **args):
         raise Exception(
             "'disable_vat_number' must be True or False."
             )
+    if not isinstance(check_vat_checksum, bool):
+        raise Exception(
+            "'check_vat_checksum' must be True or False."
+            )
     # Check if column(s) is found as non-duplicated
     cols_to_check = utils.__not_duplicated_columns_found(df, cols_to_check)
     # All columns must be present
@@ -1264,7 +1546,8 @@ def __check_vat_number(df, cols_to_check, disable_vat_number=False, **args):
     df = df.dropna(subset=vat_number_col)
 
     # Test iv valid VAT number
-    res = -utils.__are_valid_vat_numbers(df[vat_number_col])
+    res = -utils.__are_valid_vat_numbers(df[vat_number_col],
+                                         check_checksum=check_vat_checksum)
 
     # If BIDs are available
     if bid_col and country_col:
@@ -1274,20 +1557,12 @@ def __check_vat_number(df, cols_to_check, disable_vat_number=False, **args):
         bids = bids.astype(str).str.replace("-", "")
 
         # Get country codes from data base
-        path = pkg_resources.resource_filename(
-            "osta",
-            "resources/" + "land_codes.csv")
-        codes = pd.read_csv(path, index_col=0)
-
-        # Get unique countries
-        uniq_countries = df[country_col].drop_duplicates()
-        for country in uniq_countries:
-            # Get the country from data base and get 2 character code
-            temp = codes.loc[(codes == country).sum(axis=1) == 1, "code_2char"]
-            temp = temp.values
-            temp = temp[0] if len(temp) == 1 else ""
-            # Add to data
-            df.loc[df[country_col] == temp, "2_char_code"] = temp
+        codes = resources.__load_resource("land_codes.csv", index_col=0)
+
+        # Get the countries from data base and get 2 character code
+        pos = __find_countries(df[country_col])
+        df["2_char_code"] = np.where(
+            pos >= 0, codes["code_2char"].values[pos], np.nan)
         # Add country code to bid
         bids = df["2_char_code"] + bids
         # Check that it is same as VAT number
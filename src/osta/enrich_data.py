@@ -1,21 +1,34 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import osta.__utils as utils
+import osta.__resources as resources
+import osta.__http as http
+import osta.__cache as cache
 import pandas as pd
 import warnings
-import pkg_resources
-import requests
 import sys
-import selenium.webdriver as webdriver
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.firefox.options import Options as firefox_opt
-from selenium.webdriver.chrome.options import Options as chrome_opt
-from selenium.webdriver.ie.options import Options as ie_opt
 import re
 import tempfile
 import os
 import json
+import time
+import unicodedata
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Tuple
+
+
+# Columns of company data fetched from PRH's database
+__COMPANY_DATA_COLS = [
+    "bid",
+    "name",
+    "liquidation",
+    "liquidation_date",
+    "company_form",
+    "business_line",
+    "muni",
+    "old_bid",
+    ]
 
 
 def enrich_data(df, **args):
@@ -149,9 +162,8 @@ def __add_org_data(df, disable_org=False, org_data=None, **args):
         return df
     # INPUT CHECK END
     # Load default database
-    path = pkg_resources.resource_filename(
-        "osta", "resources/" + "municipality_codes.csv")
-    org_data_def = pd.read_csv(path, index_col=0)
+    org_data_def = resources.__load_resource("municipality_codes.csv",
+                                             index_col=0)
     # Column of db that are matched with columns that are being checked
     # Subset to match with cols_to_check
     cols_to_match = ["bid", "vat_number", "number", "name"]
@@ -207,9 +219,8 @@ def __add_account_data(df, disable_account=False, account_data=None,
     # INPUT CHECK END
     # Load default database
     if account_data is None:
-        path = pkg_resources.resource_filename(
-            "osta", "resources/" + "account_info.csv")
-        account_data = pd.read_csv(path, index_col=0)
+        account_data = resources.__load_resource("account_info.csv",
+                                                 index_col=0)
         # Subset by taking only specific years
         account_data = utils.__subset_data_based_on_year(
             df, df_db=account_data, **args)
@@ -254,9 +265,8 @@ def __add_service_data(df, disable_service=False, service_data=None, **args):
     # INPUT CHECK END
     # Load default database
     if service_data is None:
-        path = pkg_resources.resource_filename(
-            "osta", "resources/" + "service_codes.csv")
-        service_data = pd.read_csv(path, index_col=0)
+        service_data = resources.__load_resource("service_codes.csv",
+                                                 index_col=0)
         # Subset by taking only specific years SIIRRÄ UTILSIIN
         service_data = utils.__subset_data_based_on_year(
             df, df_db=service_data, **args)
@@ -409,8 +419,8 @@ def __add_sums(df, disable_sums=False, **args):
 
 
 def fetch_company_data(ser, language="en", only_ltd=False, merge_bid=True,
-                       use_cache=True, temp_dir=None,
-                       **args):
+                       use_cache=True, temp_dir=None, cache_ttl=None,
+                       n_workers=1, rate_limit=5, **args):
     """
     Fetch company data from databases.
 
@@ -435,6 +445,20 @@ def fetch_company_data(ser, language="en", only_ltd=False, merge_bid=True,
         to store cache. If None, device's default temporary directory is used.
         (By default: temp_dir=None)
 
+        `cache_ttl`: None or a positive number specifying the number of days
+        that results are kept in cache. Older results are fetched again and
+        replaced in cache. If None, results do not expire.
+        (By default: cache_ttl=None)
+
+        `n_workers`: An integer value specifying the number of BIDs that
+        are fetched concurrently. The result is same as when BIDs are
+        fetched one by one. (By default: n_workers=1)
+
+        `rate_limit`: None or a positive number specifying the maximum number
+        of requests per second. If server is busy or there is a server error,
+        requests are retried with exponential backoff. If None, the rate is
+        not limited. (By default: rate_limit=5)
+
     Details:
         This function fetches company data from Finnish Patent and Registration
         Office (Patentti- ja Rekisterihallitus, PRH) and The Business
@@ -478,17 +502,34 @@ def fetch_company_data(ser, language="en", only_ltd=False, merge_bid=True,
         raise Exception(
             "'temp_dir' must be None or string specifying temporary directory."
             )
+    if not (cache_ttl is None or (isinstance(cache_ttl, (int, float)) and
+                                  not isinstance(cache_ttl, bool) and
+                                  cache_ttl > 0)):
+        raise Exception(
+            "'cache_ttl' must be None or a positive number."
+            )
+    if not (isinstance(n_workers, int) and not isinstance(n_workers, bool)
+            and n_workers > 0):
+        raise Exception(
+            "'n_workers' must be a positive integer."
+            )
+    if not (rate_limit is None or (isinstance(rate_limit, (int, float)) and
+                                   not isinstance(rate_limit, bool) and
+                                   rate_limit > 0)):
+        raise Exception(
+            "'rate_limit' must be None or a positive number."
+            )
     # INPUT CHECK END
-    # Get language in right format for database
-    lan = "se" if language == "sv" else language
     # Remove None values and duplicates
     ser = ser.dropna()
     ser = ser.drop_duplicates()
     # Initialize result DF
     df = pd.DataFrame()
 
-    # If cache is used, check if file can be found from temp directory
-    filename = "company_data_from_prh_cache.csv"
+    # If cache is used, open the database from temp directory and get the
+    # BIDs that can be already found from it
+    con = None
+    cached = {}
     if use_cache:
         if temp_dir is None:
             # Get the name of higher level tmp directory
@@ -497,149 +538,74 @@ def fetch_company_data(ser, language="en", only_ltd=False, merge_bid=True,
         # Check if spedicified directory exists. If not, create it
         if not os.path.isdir(temp_dir):
             os.makedirs(temp_dir)
-        # Check if file can be found and load it
-        if filename in os.listdir(temp_dir):
-            df = pd.read_csv((temp_dir + "/" + filename), index_col=0)
-            # Remove those business ids that can be already found in cache
-            if "bid" in df.columns:
-                ser = ser[~ser.isin(df["bid"])]
-
-    # For progress bar, specify the width of it
-    progress_bar_width = 50
-    # Loop though BIDs
-    for bid_i, bid in enumerate(ser.to_numpy()):
-        # Update the progress bar
-        percent = 100*((bid_i+1)/len(ser))
-        sys.stdout.write('\r')
-        sys.stdout.write("Completed: [{:{}}] {:>3}%"
-                         .format('='*int(percent/(100/progress_bar_width)),
-                                 progress_bar_width, int(percent)))
-        sys.stdout.flush()
-        # Get data from database
-        path = "https://avoindata.prh.fi/bis/v1/" + str(bid)
-        r = requests.get(path)
-        # Convert to dictionaries
-        text = r.json()
-        # Get results only
-        df_temp = pd.json_normalize(text["results"])
-        # If results were found, continue
-        if not df_temp.empty:
-            # Change names
-            df_temp = df_temp.rename(columns={
-                "businessId": "bid",
-                "name": "name",
-                "registrationDate": "registration_date",
-                "companyForm": "company_form_short",
-                "liquidations": "liquidation",
-                "companyForms": "company_form",
-                "businessLines": "business_line",
-                "registedOffices": "muni",
-                "businessIdChanges": "old_bid",
-                })
-            # Get certain data and convert into Series
-            col_info = ["bid", "name"]
-            series = df_temp.loc[:, col_info]
-            series = series.squeeze()
-            # Loop over certain information columns
-            info = [
-                "liquidation",
-                "company_form",
-                "business_line",
-                "muni",
-                "old_bid",
-                    ]
-            for col in info:
-                # Get data
-                temp = df_temp[col]
-                temp = temp.explode().apply(pd.Series)
-                # If information is included
-                if len(temp.dropna(axis=0, how="all")) > 0:
-                    if any(x in col for x in ["company_form",
-                                              "business_line",
-                                              "muni"]):
-                        # If certain data, capitalize and add column names
-                        # with language
-                        # Remove those values that are outdated
-                        ind = temp["endDate"].isna()
-                        if any(ind):
-                            temp = temp.loc[ind, :]
-                        # Get only specific language
-                        ind = temp["language"].astype(str).str.lower() == lan
-                        if any(ind):
-                            temp_name = temp.loc[ind, "name"].astype(
-                                str).str.capitalize()
-                        else:
-                            temp_name = temp.loc[:, "name"].astype(
-                                str).str.capitalize()
-                        # Ensure that there is only one value
-                        temp_name = temp_name.iloc[[0]]
-                        temp_name.index = [col]
-                    elif any(x in col for x in ["liquidation"]):
-                        # If certain data, get name and date with
-                        # specific language
-                        ind = temp["language"].astype(str).str.lower() == lan
-                        if any(ind):
-                            temp_name = temp.loc[ind, "description"].astype(
-                                str).str.capitalize()
-                            temp_date = temp.loc[ind, "registrationDate"]
-                        else:
-                            temp_name = temp.loc[:, "description"].astype(
-                                str).str.capitalize()
-                            temp_date = temp.loc[:, "registrationDate"]
-                        # Ensure that there is only one value
-                        temp_name = temp_name.iloc[[0]]
-                        temp_date = temp_date.iloc[[0]]
-                        # Add names
-                        temp_name.index = [col]
-                        temp_date.index = [col + "_date"]
-                        # Combine results
-                        temp_name = pd.concat([temp_name, temp_date])
-                    elif any(x in col for x in ["old_bid"]):
-                        # If certain data, capitalize and add
-                        # column names with numbers
-                        temp_name = temp["oldBusinessId"]
-                        temp_col = [col]
-                        if len(temp_name) > 1:
-                            temp_col.extend([col + "_" + str(x) for x in
-                                             range(2, len(temp_name)+1)])
-                        temp_name.index = temp_col
-                    # Add to final data
-                    series = pd.concat([series, temp_name])
-            # Convert Series to DF and transpose it to correct format
-            res = pd.DataFrame(series).transpose()
-        elif not only_ltd:
-            # If BID was not found from the database, try to find
-            # with web search
+        filename = "company_data_from_prh_cache.sqlite"
+        con = cache.__open_cache(temp_dir + "/" + filename)
+        # Results depend on language, so it is included in keys
+        keys = [language + "/" + str(x) for x in ser]
+        cached = cache.__cache_get_many(con, keys, ttl=cache_ttl)
+
+    # Fetch data of each BID that is not in cache. If there are multiple
+    # workers, BIDs are fetched concurrently. Results are handled in the
+    # original order so the result is same as when fetched sequentially.
+    rate_limiter = http.__create_rate_limiter(rate_limit)
+    bids = ser.to_numpy().tolist()
+    keys = [language + "/" + str(x) for x in bids]
+    try:
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            futures = [executor.submit(
+                __fetch_company_data_help, bid, language=language,
+                only_ltd=only_ltd, rate_limiter=rate_limiter)
+                for bid, key in zip(bids, keys) if key not in cached]
+            results = iter(futures)
             try:
-                res = __fetch_company_data_from_website(bid, language)
-            except Exception:
-                res = pd.DataFrame([bid], index=["bid"]).transpose()
-        else:
-            # If user want only ltd info and data was not found
-            res = pd.DataFrame([bid], index=["bid"]).transpose()
-        # Add to DataFrame
-        if df.empty:
-            df = res
-        else:
-            df = pd.merge(df, res, how="outer")
-        # In every 50 BID, save the result to cache
-        if use_cache and bid_i % 50:
-            df.to_csv((temp_dir + "/" + filename))
-
+                # For progress bar, specify the width of it
+                progress_bar_width = 50
+                # Loop though BIDs
+                records = []
+                for bid_i, key in enumerate(keys):
+                    # Get the result from cache or from the database
+                    if key in cached:
+                        res = cached[key]
+                    else:
+                        res = next(results).result()
+                        # Store the result to cache. Results that include
+                        # only BID are not stored, so that they are
+                        # searched again next time
+                        if con is not None and len(res) > 1:
+                            cache.__cache_put(con, key, res)
+                    records.append(res)
+                    # Update the progress bar
+                    percent = 100*((bid_i+1)/len(ser))
+                    sys.stdout.write('\r')
+                    sys.stdout.write("Completed: [{:{}}] {:>3}%"
+                                     .format('='*int(percent/(100/progress_bar_width)),
+                                             progress_bar_width, int(percent)))
+                    sys.stdout.flush()
+            except BaseException:
+                # Cancel fetches that are not yet started
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        if con is not None:
+            con.close()
+
+    # Create DataFrame from the results. Columns are always included in same
+    # order, additional columns (old BIDs) are added to the end
+    columns = list(__COMPANY_DATA_COLS)
+    columns.extend(sorted({x for res in records for x in res
+                           if x not in __COMPANY_DATA_COLS},
+                          key=__get_old_bid_order))
     # Combine BID columns into one
-    if merge_bid and "old_bid" in df.columns:
-        regex = re.compile(r"old_bid")
-        ind = [True if regex.search(x) else False for x in df.columns]
-        bid_cols = df.loc[:, ind]
-        bid_col = bid_cols.apply(lambda x: ', '.join(x.dropna(
-            ).astype(str)), axis=1)
-        # Remove additional BID columns, keep only one
-        ind = [False if regex.search(x) else True for x in df.columns]
-        df = df.loc[:, ind]
-        df["old_bid"] = bid_col
+    if merge_bid:
+        records = [__merge_old_bids(res) for res in records]
+        columns = [x for x in columns if not x.startswith("old_bid_")]
+    df = pd.DataFrame.from_records(records, columns=columns)
+    # Missing values are marked with NaN
+    df = df.astype(object).where(df.notna(), np.nan)
     # Convert column names into right language if Finnish or Swedish
     if language == "fi":
-        columns = {
+        new_colnames = {
             "registration_date": "rekisteröintipäivä",
             "company_form_short": "yhtiömuoto_lyhyt",
             "liquidation": "konkurssitiedot",
@@ -648,11 +614,11 @@ def fetch_company_data(ser, language="en", only_ltd=False, merge_bid=True,
             "muni": "kotipaikka",
             "old_bid": "vanha_bid",
             }
-        df = df.rename(columns=columns)
+        df = df.rename(columns=new_colnames)
         df.columns = [re.sub("old_bid_", "vanha_bid_", str(x))
                       for x in df.columns.tolist()]
     elif language == "sv":
-        columns = {
+        new_colnames = {
             "registration_date": "registrering_dag",
             "company_form_short": "företags_form_kort",
             "liquidation": "konkurs_info",
@@ -661,7 +627,7 @@ def fetch_company_data(ser, language="en", only_ltd=False, merge_bid=True,
             "muni": "hemkommun",
             "old_bid": "gamla_bid",
             }
-        df = df.rename(columns=columns)
+        df = df.rename(columns=new_colnames)
         df.columns = [re.sub("old_bid_", "gamla_bid_", str(x))
                       for x in df.columns.tolist()]
     # Stop progress bar
@@ -669,6 +635,132 @@ def fetch_company_data(ser, language="en", only_ltd=False, merge_bid=True,
     return df
 
 
+def __merge_old_bids(res):
+    """
+    This function combines old business IDs into one value.
+    Input: dictionary with company data
+    Output: dictionary with company data
+    """
+    keys = sorted([x for x in res if x.startswith("old_bid")],
+                  key=__get_old_bid_order)
+    values = [str(res[x]) for x in keys if not pd.isna(res[x])]
+    res = {x: y for x, y in res.items() if not x.startswith("old_bid_")}
+    res["old_bid"] = ", ".join(values)
+    return res
+
+
+def __get_old_bid_order(col):
+    """
+    This function gets the order of old business ID columns (old_bid,
+    old_bid_2, old_bid_3...). Other columns are ordered by their name.
+    Input: name of the column
+    Output: tuple
+    """
+    res = (1, col, 0)
+    if col == "old_bid":
+        res = (0, col, 1)
+    elif col.startswith("old_bid_") and col[8:].isdigit():
+        res = (0, "old_bid", int(col[8:]))
+    return res
+
+
+def __fetch_company_data_help(bid, language, only_ltd, rate_limiter):
+    """
+    This function fetches company data of one business ID.
+    Input: business ID, language, whether to search only limited companies,
+    rate limiter
+    Output: dictionary with company data
+    """
+    # Get data from database
+    path = "https://avoindata.prh.fi/bis/v1/" + str(bid)
+    r = http.__request("GET", path, rate_limiter=rate_limiter)
+    # Convert to dictionaries
+    text = r.json()
+    # Get results only
+    results = [x for x in text["results"] if isinstance(x, dict)]
+    # If results were found, continue
+    if len(results) > 0:
+        res = __flatten_company_data(results, language)
+    elif not only_ltd:
+        # If BID was not found from the database, try to find
+        # with web search
+        try:
+            res = __fetch_company_data_from_website(bid, language)
+            res = res.iloc[0].to_dict()
+        except Exception:
+            res = {"bid": bid}
+    else:
+        # If user want only ltd info and data was not found
+        res = {"bid": bid}
+    return res
+
+
+def __flatten_company_data(results, language):
+    """
+    This function converts company data from database into flat dictionary.
+    Input: list of results from database, language
+    Output: dictionary with company data
+    """
+    # Get language in right format for database
+    lan = "se" if language == "sv" else language
+    # Get name and BID
+    res = {
+        "bid": results[0].get("businessId"),
+        "name": results[0].get("name"),
+        }
+    # Names of nested information fields in database
+    info = {
+        "liquidation": "liquidations",
+        "company_form": "companyForms",
+        "business_line": "businessLines",
+        "muni": "registedOffices",
+        "old_bid": "businessIdChanges",
+        }
+    for col, field in info.items():
+        # Get data of all results
+        temp = []
+        for x in results:
+            value = x.get(field)
+            if isinstance(value, list):
+                temp.extend([y for y in value if isinstance(y, dict)])
+            elif isinstance(value, dict):
+                temp.append(value)
+        # If information is not included, continue to next field
+        if not any(y is not None for x in temp for y in x.values()):
+            continue
+        if col in ["company_form", "business_line", "muni"]:
+            # Remove those values that are outdated
+            ind = [x for x in temp if pd.isna(x.get("endDate"))]
+            if len(ind) > 0:
+                temp = ind
+            # Get only specific language and capitalize
+            temp = __get_values_with_language(temp, lan)
+            res[col] = str(temp[0].get("name")).capitalize()
+        elif col == "liquidation":
+            # Get name and date with specific language
+            temp = __get_values_with_language(temp, lan)
+            res[col] = str(temp[0].get("description")).capitalize()
+            res[col + "_date"] = temp[0].get("registrationDate")
+        elif col == "old_bid":
+            # Add column names with numbers
+            for i, x in enumerate(temp):
+                name = col if i == 0 else col + "_" + str(i+1)
+                res[name] = x.get("oldBusinessId")
+    return res
+
+
+def __get_values_with_language(values, lan):
+    """
+    This function gets values with specific language. If there are no values
+    with the language, all values are returned.
+    Input: list of dictionaries, language
+    Output: list of dictionaries
+    """
+    res = [x for x in values if str(x.get("language")).lower() == lan]
+    res = res if len(res) > 0 else values
+    return res
+
+
 def __fetch_company_data_from_website(bid, language):
     """
     This function fetch company data from PRH's website that includes
@@ -676,6 +768,11 @@ def __fetch_company_data_from_website(bid, language):
     Input: business ID or business name
     Output: df with company data
     """
+    # Import here so that importing osta does not require loading selenium
+    import selenium.webdriver as webdriver
+    from selenium.webdriver.firefox.options import Options as firefox_opt
+    from selenium.webdriver.chrome.options import Options as chrome_opt
+    from selenium.webdriver.ie.options import Options as ie_opt
     # Test if BID is business ID or name
     # bid_option = utils.__are_valid_bids(pd.Series([bid])).all()
     bid_option = True
@@ -750,6 +847,8 @@ def __search_companies_with_web_search(bid, bid_option, url, browser):
     Input: business ID, url and driver
     Output: list including company data
     """
+    # Import here so that importing osta does not require loading selenium
+    from selenium.webdriver.common.keys import Keys
     # Go to the web page
     browser.get(url)
     # Search by BID or name
@@ -870,7 +969,7 @@ def fetch_org_data(org_codes, years, language="en", add_bid=True):
             )
     # Find the most recent data
     url = "https://statfin.stat.fi/PXWeb/api/v1/fi/Kuntien_avainluvut"
-    r = requests.get(url)
+    r = http.__request("GET", url)
 
     # If the call was not succesfull, return empty DF
     df = pd.DataFrame()
@@ -885,7 +984,7 @@ def fetch_org_data(org_codes, years, language="en", add_bid=True):
     # Check which years are in time series database
     url = ("https://statfin.stat.fi/PXWeb/api/v1/fi/Kuntien_avainluvut/" +
            year_max)
-    r = requests.get(url)
+    r = http.__request("GET", url)
     text = r.json()
     # Find available years based on pattern in id
     found_year = [x.get("text") for x in text if x.get("id") ==
@@ -907,9 +1006,8 @@ def fetch_org_data(org_codes, years, language="en", add_bid=True):
             category=Warning
             )
     # Check which municipalties are found from the database / are correct
-    path = pkg_resources.resource_filename(
-        "osta", "resources/" + "municipality_codes.csv")
-    org_data = pd.read_csv(path, index_col=0, dtype="object")
+    org_data = resources.__load_resource("municipality_codes.csv",
+                                         index_col=0, dtype="object")
     # Get only correct municipality codes
     codes_temp = [x if x in org_data["number"].tolist() else
                   None for x in org_codes]
@@ -940,7 +1038,7 @@ def fetch_org_data(org_codes, years, language="en", add_bid=True):
               "response": {"format": "json-stat2"}
               }
     # Find results
-    r = requests.post(url, json=params)
+    r = http.__request("POST", url, json=params)
     if r.ok:
         text = r.json()
         # Find labels, code, years and values
@@ -1007,6 +1105,14 @@ def fetch_financial_data(org_bids, years, subset=True, wide_format=True,
         in Finnish and Swedish. The function requires working internet
         connection.
 
+        The catalogue of the database is fetched only once per call. It is
+        stored to on-disk cache when `use_cache` is True (by default), and
+        it is fetched again when it is older than `cache_ttl` days. As in
+        fetch_company_data, `cache_ttl` must be None or a positive number,
+        and None means that the cache does not expire
+        (By default: cache_ttl=1). The cache is stored in `temp_dir`
+        (By default: device's default temporary directory).
+
         When data is subsetted, only certain key figures are returned. They
         include (in Finnish):
 
@@ -1204,6 +1310,9 @@ def fetch_financial_data(org_bids, years, subset=True, wide_format=True,
     df_org = df_org.transpose()
     df_org = df_org.drop_duplicates()
     df_org = df_org.reset_index(drop=True)
+    # Get the information on database, what data it includes? It is fetched
+    # only once and indexed so that data can be searched fast
+    catalogue = __fetch_financial_catalogue(**args)
     # For progress bar, specify the width of it
     progress_bar_width = 50
     # Loop over rows
@@ -1219,7 +1328,8 @@ def fetch_financial_data(org_bids, years, subset=True, wide_format=True,
         sys.stdout.flush()
         # Get data from the database
         df_temp = __fetch_org_financial_data_help(
-            r["org_bid"], r["year"], subset=subset, language=language, **args)
+            r["org_bid"], r["year"], subset=subset, language=language,
+            catalogue=catalogue, **args)
         # Add organization and year info
         df_temp["bid"] = r["org_bid"]
         df_temp["year"] = r["year"]
@@ -1270,30 +1380,15 @@ def fetch_financial_data(org_bids, years, subset=True, wide_format=True,
     return df
 
 
-def __fetch_org_financial_data_help(org_bid, year, subset, language, **args):
+def __fetch_org_financial_data_help(org_bid, year, subset, language,
+                                    catalogue, **args):
     """
     Fetch financial data of municipalities (KKNR, KKTR, KKOTR).
 
     Input: business ID of municipality, year,
-    whether to take only certain values
+    whether to take only certain values, indexed catalogue of the database
     Output: pd.DataFrame including financial data.
     """
-    ready_col = "hyvaksymisvaihe"
-    # Get the information on database, what data it includes?
-    url = ("https://prodkuntarest.westeurope.cloudapp.azure.com/" +
-           "rest/v1/json/aineistot")
-    r = requests.get(url)
-    r.status_code
-    text = r.json()
-    text = text.get("aineistot")
-    df_info = pd.DataFrame(text)
-    # Subset by taking only specific city
-    df_info = df_info.loc[df_info["ytunnus"] == org_bid, :]
-    # Sort data based on the readiness of the data
-    order = ["Lopullinen", "Hyväksytty", "Alustava"]
-    df_info[ready_col] = pd.Categorical(
-        df_info[ready_col], categories=order)
-    df_info = df_info.sort_values(ready_col)
     # Initialize result DF
     df = pd.DataFrame()
     # Get kknr data
@@ -1311,7 +1406,7 @@ def __fetch_org_financial_data_help(org_bid, year, subset, language, **args):
         "Toimintatulot",
         ]
     df = __fetch_financial_data(
-        df=df, df_info=df_info,
+        df=df, catalogue=catalogue, org_bid=org_bid,
         datatype="KKNR", year=(year + "C12"), key_figs=key_figs,
         subset=subset, language=language, **args)
     # Get kktr data
@@ -1346,7 +1441,7 @@ def __fetch_org_financial_data_help(org_bid, year, subset, language, **args):
         "Vuosikate",
         ]
     df = __fetch_financial_data(
-        df=df, df_info=df_info,
+        df=df, catalogue=catalogue, org_bid=org_bid,
         datatype="KKTR", year=year, key_figs=key_figs,
         subset=subset, language=language, **args)
     # Get kkotr data
@@ -1382,7 +1477,7 @@ def __fetch_org_financial_data_help(org_bid, year, subset, language, **args):
         "Vuosikate",
         ]
     df = __fetch_financial_data(
-        df=df, df_info=df_info,
+        df=df, catalogue=catalogue, org_bid=org_bid,
         datatype="KKOTR", year=year, key_figs=key_figs,
         subset=subset, language=language, **args)
     # Get ktpe data including only tax rate
@@ -1390,7 +1485,7 @@ def __fetch_org_financial_data_help(org_bid, year, subset, language, **args):
         "Tuloveroprosentti",
         ]
     df = __fetch_financial_data(
-        df=df, df_info=df_info,
+        df=df, catalogue=catalogue, org_bid=org_bid,
         datatype="KTPE", year=year, key_figs=key_figs,
         subset=True, language=language, **args)
     # Reset index and return whole data
@@ -1398,15 +1493,112 @@ def __fetch_org_financial_data_help(org_bid, year, subset, language, **args):
     return df
 
 
-def __fetch_financial_data(df, df_info,
+def __fetch_financial_catalogue(use_cache=True, temp_dir=None, cache_ttl=1,
+                                **args):
+    """
+    Fetch the catalogue of financial data that tells which reports database
+    includes. The catalogue is stored to on-disk cache, and it is fetched
+    again when it is older than the time-to-live.
+
+    Input: whether to use on-disk cache, the name of temp_dir, time-to-live
+    of cache in days (None if cache does not expire).
+    Output: dictionary where keys are (business ID, reporting period,
+    report entity) and values are reports
+    """
+    # INPUT CHECK
+    if not isinstance(use_cache, bool):
+        raise Exception(
+            "'use_cache' must be True or False."
+            )
+    if not (isinstance(temp_dir, str) or temp_dir is None):
+        raise Exception(
+            "'temp_dir' must be None or string specifying temporary directory."
+            )
+    if not (cache_ttl is None or (isinstance(cache_ttl, (int, float)) and
+                                  not isinstance(cache_ttl, bool) and
+                                  cache_ttl > 0)):
+        raise Exception(
+            "'cache_ttl' must be None or a positive number."
+            )
+    # INPUT CHECK END
+    download_from_web = True
+    filename = "financial_data_catalogue.json"
+    # If cache is used, check if up-to-date file can be found from temp
+    # directory
+    if use_cache:
+        if temp_dir is None:
+            # Get the name of higher level tmp directory
+            temp_dir_path = tempfile.gettempdir()
+            temp_dir = temp_dir_path + "/osta_tmp_dir"
+        # Check if spedicified directory exists. If not, create it
+        if not os.path.isdir(temp_dir):
+            os.makedirs(temp_dir)
+        # Check if file can be found and whether it is fresh
+        path = temp_dir + "/" + filename
+        if os.path.isfile(path):
+            # If time-to-live is None, cached file does not expire
+            age = time.time() - os.path.getmtime(path)
+            download_from_web = (cache_ttl is not None and
+                                 age > cache_ttl*24*60*60)
+    # Download from web or use cache
+    if download_from_web:
+        url = ("https://prodkuntarest.westeurope.cloudapp.azure.com/" +
+               "rest/v1/json/aineistot")
+        r = http.__request("GET", url)
+        text = r.json()
+        text = text.get("aineistot")
+        # Save the file to temporary directory if cache is used. Write to
+        # other file first so that other processes do not read partial file
+        if use_cache:
+            temp_path = path + "." + str(os.getpid()) + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(text, f)
+            os.replace(temp_path, path)
+    else:
+        # Load the data from cache
+        with open(path) as f:
+            text = json.load(f)
+    # Create an index from the catalogue
+    res = __index_report_catalogue(text)
+    return res
+
+
+def __index_report_catalogue(catalogue):
+    """
+    Create an index of the catalogue of reports (financial data or data on
+    companies). If there are multiple reports, the most ready report is
+    selected.
+
+    Input: list of reports
+    Output: dictionary where keys are (business ID, reporting period,
+    report entity) and values are reports
+    """
+    # Order of the readiness of the data
+    stages = ["Lopullinen", "Hyväksytty", "Alustava"]
+    order = {unicodedata.normalize("NFC", x): i for i, x in enumerate(stages)}
+    res: Dict[Tuple[Any, Any, Any], Dict[str, Any]] = {}
+    priority: Dict[Tuple[Any, Any, Any], int] = {}
+    for x in catalogue if catalogue is not None else []:
+        key = (x.get("ytunnus"), x.get("raportointikausi"),
+               x.get("raportointikokonaisuus"))
+        value = order.get(unicodedata.normalize(
+            "NFC", str(x.get("hyvaksymisvaihe"))), len(order))
+        # Add report if it is more ready than the previous one
+        if key not in res or value < priority[key]:
+            res[key] = x
+            priority[key] = value
+    return res
+
+
+def __fetch_financial_data(df, catalogue, org_bid,
                            datatype, year, key_figs,
                            subset, language, **args):
     """
     Fetch certain financial data of municipalities.
 
-    Input: DF to append, DF including URL, DF including labels of financial
-    codes, which data is fetched, year, which values will be returned if
-    subset is True.
+    Input: DF to append, indexed catalogue including URLs, business ID of
+    municipality, which data is fetched, year, which values will be returned
+    if subset is True.
     Output: pd.DataFrame including financial data.
     """
     # Specify columns where label and values can be found
@@ -1416,21 +1608,15 @@ def __fetch_financial_data(df, df_info,
                  ("tunnusluku_" + language))
     field_id = "solutunniste"
     value_col = "arvo"
-    datatype_col = "raportointikokonaisuus"
-    data_year = "raportointikausi"
     # Initialize for results
     df_temp = pd.DataFrame()
     # Get specific data information
-    ind = ((df_info[datatype_col] == datatype) &
-           (df_info[data_year] == year))
+    info = catalogue.get((org_bid, year, datatype))
     # If certain data can be found from the database
-    if any(ind):
-        # Get the data info based on index
-        ind = ind[ind]
-        ind = ind.first_valid_index()
+    if info is not None:
         # Get the url and fetch the data
-        url = df_info.loc[ind, url_col]
-        r = requests.get(url)
+        url = info.get(url_col)
+        r = http.__request("GET", url)
         text = r.json()
         # Create DF from the data
         df_temp = pd.DataFrame(text)
@@ -1463,7 +1649,7 @@ def __fetch_financial_data(df, df_info,
     return df
 
 
-def fetch_org_company_data(org_bids, years, rename_cols=True):
+def fetch_org_company_data(org_bids, years, rename_cols=True, n_workers=4):
     """
     Fetch data about companies of municipality.
 
@@ -1477,6 +1663,9 @@ def fetch_org_company_data(org_bids, years, rename_cols=True):
         a way that is expected by other functions.
         (By default: rename_cols=True)
 
+        `n_workers`: An integer value specifying the maximum number of
+        reports that are fetched concurrently. (By default: n_workers=4)
+
     Details:
         This function fetches data on companies of municipalities (TOLT)
         from the database of State Treasury of Finland (Valtiokonttori).
@@ -1507,6 +1696,11 @@ def fetch_org_company_data(org_bids, years, rename_cols=True):
         raise Exception(
             "'rename_cols' must be a boolean value."
             )
+    if not (isinstance(n_workers, int) and not isinstance(n_workers, bool)
+            and n_workers > 0):
+        raise Exception(
+            "'n_workers' must be a positive integer."
+            )
     # INPUT CHECK END
     # Test if year can be detected
     try:
@@ -1526,26 +1720,44 @@ def fetch_org_company_data(org_bids, years, rename_cols=True):
     df_org_temp["type"] = "HTOLT"
     df_org = pd.concat([df_org, df_org_temp])
     df_org = df_org.reset_index(drop=True)
-    # For progress bar, specify the width of it
-    progress_bar_width = 50
-    # Loop over rows
-    df = pd.DataFrame()
-    for i, r in df_org.iterrows():
-        # Update the progress bar
-        percent = 100*((i+1)/df_org.shape[0])
-        sys.stdout.write('\r')
-        sys.stdout.write("Completed: [{:{}}] {:>3}%"
-                         .format('='*int(percent/(100/progress_bar_width)),
-                                 progress_bar_width, int(percent)))
-        sys.stdout.flush()
-        # Get data from the database
-        df_temp = __fetch_org_company_data_help(
-            r["org_bid"], r["year"], r["type"])
-        # Add organization and year info
-        df_temp["org_bid"] = r["org_bid"]
-        df_temp["year"] = r["year"]
-        # Add to whole data
-        df = pd.concat([df, df_temp])
+    # Get the information on database, what data it includes? It is fetched
+    # only once and indexed so that data can be searched fast
+    url = ("https://prodkuntarest.westeurope.cloudapp.azure.com/" +
+           "rest/v1/json/tolt-aineistot")
+    r = http.__request("GET", url)
+    catalogue = __index_report_catalogue(r.json().get("tolt_aineisto"))
+    # Fetch the data of each row concurrently. Results are handled in the
+    # original order.
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        futures = [executor.submit(
+            __fetch_org_company_data_help, x[0], x[1], x[2],
+            catalogue=catalogue)
+            for x in zip(df_org["org_bid"], df_org["year"], df_org["type"])]
+        try:
+            # For progress bar, specify the width of it
+            progress_bar_width = 50
+            # Loop over rows
+            dfs = []
+            for i, future in enumerate(futures):
+                df_temp = future.result()
+                # Update the progress bar
+                percent = 100*((i+1)/df_org.shape[0])
+                sys.stdout.write('\r')
+                sys.stdout.write("Completed: [{:{}}] {:>3}%"
+                                 .format('='*int(percent/(100/progress_bar_width)),
+                                         progress_bar_width, int(percent)))
+                sys.stdout.flush()
+                # Add organization and year info
+                df_temp["org_bid"] = df_org.loc[i, "org_bid"]
+                df_temp["year"] = df_org.loc[i, "year"]
+                dfs.append(df_temp)
+        except BaseException:
+            # Cancel fetches that are not yet started
+            for future in futures:
+                future.cancel()
+            raise
+    # Combine data
+    df = pd.concat(dfs)
     # Reset index and return whole data
     df = df.reset_index(drop=True)
     # Rename columns if specified
@@ -1583,44 +1795,24 @@ def fetch_org_company_data(org_bids, years, rename_cols=True):
     return df
 
 
-def __fetch_org_company_data_help(org_bid, year, datatype):
+def __fetch_org_company_data_help(org_bid, year, datatype, catalogue):
     """
     Fetch data about companies of municipality.
 
-    Input: business ID of municipality, year, datatype.
+    Input: business ID of municipality, year, datatype, indexed catalogue of
+    the database.
     Output: pd.DataFrame including company data.
     """
     # Specify columns of the data
-    bid_col = "ytunnus"
-    ready_col = "hyvaksymisvaihe"
-    data_year = "raportointikausi"
-    datatype_col = "raportointikokonaisuus"
     url_col = "tolt_tiedot"
     tolt_col = "tolt_yksiköt"
-    # Get the information on database, what data it includes?
-    url = ("https://prodkuntarest.westeurope.cloudapp.azure.com/" +
-           "rest/v1/json/tolt-aineistot")
-    r = requests.get(url)
-    text = r.json()
-    text = text.get("tolt_aineisto")
-    df_info = pd.DataFrame(text)
-    # Sort data based on the readiness of the data
-    order = ["Lopullinen", "Hyväksytty", "Alustava"]
-    df_info[ready_col] = pd.Categorical(
-        df_info[ready_col], categories=order)
-    df_info = df_info.sort_values(ready_col)
     # Get specific data information
-    ind = ((df_info[datatype_col] == datatype) &
-           (df_info[data_year] == year) &
-           (df_info[bid_col] == org_bid))
+    info = catalogue.get((org_bid, year, datatype))
     # If certain data can be found from the database
-    if any(ind):
-        # Get the data info based on index
-        ind = ind[ind]
-        ind = ind.first_valid_index()
+    if info is not None:
         # Get the url and fetch the data
-        url = df_info.loc[ind, url_col]
-        r = requests.get(url)
+        url = info.get(url_col)
+        r = http.__request("GET", url)
         text = r.json()
         text = text.get(tolt_col)
         # Create DF from the data
@@ -1669,7 +1861,7 @@ def __fetch_financial_taxonomy(datatype, subset, key_figs,
         url = ("https://tkdpprodjrpstacc02.blob.core.windows.net" +
                "/kuntataloudentaksonomia/" +
                datatype + ".json")
-        r = requests.get(url)
+        r = http.__request("GET", url)
         text = r.json()
         # Save the file to temporary directory if cache is used
         if use_cache:
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import osta.__cache as cache
+import time
+
+
+def test_cache(tmp_path):
+    con = cache.__open_cache(str(tmp_path / "cache.sqlite"))
+    cache.__cache_put(con, "a", {"bid": "a", "name": None})
+    cache.__cache_put(con, "b", {"bid": "b", "name": "test"})
+    cache.__cache_put(con, "b", {"bid": "b", "name": "test2"})
+    res = cache.__cache_get_many(con, ["a", "b", "c"])
+    assert res == {"a": {"bid": "a", "name": None},
+                   "b": {"bid": "b", "name": "test2"}}
+    # Many keys can be searched at once
+    res = cache.__cache_get_many(con, [str(x) for x in range(2000)] + ["a"])
+    assert list(res.keys()) == ["a"]
+    # Expired values are not returned
+    con.execute("UPDATE cache SET created = ? WHERE key = 'a'",
+                (time.time() - 2*24*60*60,))
+    con.commit()
+    res = cache.__cache_get_many(con, ["a", "b"], ttl=1)
+    assert list(res.keys()) == ["b"]
+    res = cache.__cache_get_many(con, ["a", "b"])
+    assert list(res.keys()) == ["a", "b"]
+    con.close()
+    # Another connection sees the stored values
+    con = cache.__open_cache(str(tmp_path / "cache.sqlite"))
+    assert len(cache.__cache_get_many(con, ["a", "b"])) == 2
+    con.close()
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 from osta.change_names import change_names
+import osta.change_names as cn
+import osta.__utils as utils
+import osta.__cache as cache
 import pandas as pd
+import numpy as np
 from pandas.testing import assert_frame_equal
 import pytest
 import copy
+import threading
+import os
 
 
 def test_check_names_wrong_arguments():
@@ -243,6 +249,28 @@ def test_change_names_test_sums():
     # Expect that are equal
     assert_frame_equal(df, df_ref)
 
+    # Sums are found together from unnamed columns. Rounding errors and
+    # missing values are allowed
+    data = {"test1": [1.0, 2.0, 3.0, 4.0],
+            "test2": [8.06, 9.67, None, 100.0],
+            "test3": [5.5, 6.5, 7.5, 8.5],
+            "test4": [10.0, 12.0, 13.5, 124.0],
+            "test5": [1.94, 2.32, 3.0, 24.0],
+            }
+    df = pd.DataFrame(data)
+    df_ref = copy.copy(df)
+    with pytest.warns(Warning):
+        df = change_names(df)
+    df_ref.columns = ["test1", "price_ex_vat", "test3", "total",
+                      "vat_amount"]
+    assert_frame_equal(df, df_ref)
+    # Names that are already found are used
+    df.columns = ["test1", "vat_amount", "test3", "test4", "test5"]
+    with pytest.warns(Warning):
+        df = change_names(df)
+    assert df.columns.tolist() == ["test1", "vat_amount", "test3", "total",
+                                   "price_ex_vat"]
+
 
 def test_change_names_data_patterns():
     # matching land code, date, and voucher
@@ -526,6 +554,162 @@ def test_change_names_match_th4():
     assert_frame_equal(df, df_ref)
 
 
+def test_change_names_cache(tmp_path):
+    data = {"test1": [10, 10, 10],
+            "test2": ["test1", "test2", "test3"],
+            "test3": ["0000000-0", "0204819-8", "0133226-9"]
+            }
+    df = pd.DataFrame(data)
+    df.columns = ["Test1", "Test2", "suppl_id"]
+    df_ref = change_names(df.copy())
+    # Names are stored to cache
+    with pytest.warns(Warning):
+        df_cache = change_names(df.copy(), use_cache=True,
+                                temp_dir=str(tmp_path))
+    assert_frame_equal(df_cache, df_ref)
+    assert "change_names_cache.sqlite" in os.listdir(tmp_path)
+    # Names are got from cache
+    fields = cn.__get_fields_df(None)
+    key = cn.__get_colnames_fingerprint(df, True, fields)
+    con = cache.__open_cache(str(tmp_path / "change_names_cache.sqlite"))
+    res = cache.__cache_get_many(con, [key])[key]
+    assert res["colnames"] == df_ref.columns.tolist()
+    res["colnames"] = ["Test1", "Test2", "cached"]
+    cache.__cache_put(con, key, res)
+    with pytest.warns(Warning):
+        df_cache = change_names(df.copy(), use_cache=True,
+                                temp_dir=str(tmp_path))
+    assert df_cache.columns.tolist() == ["Test1", "Test2", "cached"]
+    # If names are verified from sample, wrong names are noticed
+    with pytest.warns(Warning):
+        df_cache = change_names(df.copy(), use_cache=True,
+                                temp_dir=str(tmp_path), verify_sample=2)
+    assert_frame_equal(df_cache, df_ref)
+    res = cache.__cache_get_many(con, [key])[key]
+    assert res["colnames"] == df_ref.columns.tolist()
+    con.close()
+    # Data with other data types or arguments is not got from cache
+    key2 = cn.__get_colnames_fingerprint(df.astype(str), True, fields)
+    key3 = cn.__get_colnames_fingerprint(df, True, fields, match_th=0.5)
+    assert len({key, key2, key3}) == 3
+    with pytest.raises(Exception):
+        change_names(df, use_cache=1)
+    with pytest.raises(Exception):
+        change_names(df, temp_dir=1)
+    with pytest.raises(Exception):
+        change_names(df, verify_sample=0)
+
+
+def test_change_names_sample_size():
+    data = {"test1": ["FI", "SE", "FI", "DK"] * 50,
+            "test2": ["02.04.2023", "02.10.2023", "23.06.2022", None] * 50,
+            "test3": ["0201256-6", "1234567-8", "0135202-4", "test"] * 50,
+            "test4": ["test", "testi", "test", "test"] * 50,
+            }
+    df = pd.DataFrame(data)
+    with pytest.warns(Warning):
+        df_ref = change_names(df.copy())
+    # Names that are guessed from sample are same as from whole data
+    for sample_margin in [0, 0.1, 1]:
+        with pytest.warns(Warning):
+            df_sample = change_names(df.copy(), sample_size=10,
+                                     sample_margin=sample_margin)
+        assert df_sample.columns.tolist() == df_ref.columns.tolist()
+    # Sample includes rows from whole data
+    ind = utils.__get_sample_index(200, 10)
+    assert len(ind) == 10
+    assert all(ind[1:] > ind[:-1])
+    assert ind[0] < 20 and ind[-1] >= 180
+    with pytest.raises(Exception):
+        change_names(df, sample_size=0)
+    with pytest.raises(Exception):
+        change_names(df, sample_size=1.5)
+    with pytest.raises(Exception):
+        change_names(df, sample_margin=2)
+
+
+def test_change_names_n_workers():
+    data = {"test1": ["test", "testi", "test", "test"],
+            "test2": [1, 2, 3, 3],
+            "test3": ["0000000-0", "0000000-0", "0000000-0", "0000000-0"],
+            "test4": ["02.04.2023", "02.10.2023", "23.06.2022", None],
+            "test5": ["FI", "SE", "FI", "FI"],
+            "test6": [5, 6, 7, 8],
+            }
+    df = pd.DataFrame(data)
+    with pytest.warns(Warning):
+        df_ref = change_names(df.copy())
+    # Result does not depend on the number of workers
+    with pytest.warns(Warning):
+        df_workers = change_names(df.copy(), n_workers=4)
+    assert_frame_equal(df_workers, df_ref)
+    # Wide data with different kind of columns whose names are guessed
+    n = 60
+    columns = {
+        "bid": ["0135202-4", "0204819-8", "1567535-0"],
+        "date": ["02.04.2023", "02.10.2023", "23.06.2022"],
+        "country": ["FI", "SE", "DE"],
+        "vat_number": ["FI01352024", "FI02048198", "FI15675350"],
+        "voucher": [1, 2, 3],
+        "price": [1.5, 2.5, 4.0],
+        "name": ["Turun kaupunki", "Akaa", "Helsinki"],
+        "bool": [True, False, False],
+        }
+    data = {}
+    for i in range(48):
+        key = list(columns.keys())[i % len(columns)]
+        data["col" + str(i)] = (columns[key] * n)[i:n+i]
+    df = pd.DataFrame(data)
+    with pytest.warns(Warning):
+        df_ref = change_names(df.copy())
+    for n_workers in [2, 8]:
+        with pytest.warns(Warning):
+            df_workers = change_names(df.copy(), n_workers=n_workers)
+        assert_frame_equal(df_workers, df_ref)
+    with pytest.raises(Exception):
+        change_names(df, n_workers=0)
+    with pytest.raises(Exception):
+        change_names(df, n_workers=True)
+
+
+def test_change_names_n_workers_column_tests(monkeypatch):
+    # Tests that depend only on the column are run by the workers, and they
+    # are not run again when the names are decided
+    data = {"test1": ["0135202-4", "0204819-8", "1567535-0"],
+            "test2": ["02.04.2023", "02.10.2023", "23.06.2022"],
+            "test3": ["FI", "SE", "DE"],
+            "test4": ["Helsinki", "Espoo", "Vantaa"],
+            "test5": [1, 2, 3],
+            }
+    df = pd.DataFrame(data)
+    calls = []
+    lock = threading.Lock()
+
+    def count(module, name):
+        test = getattr(module, name)
+
+        def wrapper(*args, **kwargs):
+            with lock:
+                calls.append((name, kwargs["col_i"] if "col_i" in kwargs
+                              else kwargs["df"].name, kwargs.get("db_file"),
+                              kwargs.get("test"), threading.current_thread()))
+            return test(*args, **kwargs)
+        monkeypatch.setattr(module, name, wrapper)
+    count(cn, "__test_if_BID")
+    count(cn, "__test_if_vat_number")
+    count(cn, "__test_if_found_in_db")
+    count(utils, "__test_if_date")
+    with pytest.warns(Warning):
+        df = change_names(df, n_workers=4)
+    assert df.columns.tolist() == ["bid", "date", "country", "org_name",
+                                   "org_number"]
+    assert len(calls) > 0
+    # Tests were run by workers and each test was run once per column
+    assert all(x[4] is not threading.main_thread() for x in calls)
+    tests = [x[:4] for x in calls]
+    assert len(tests) == len(set(tests))
+
+
 def __create_dummy_data():
     data = {"test1": ["test", "testi", "test"],
             "test2": [1, 2, 3],
@@ -533,3 +717,17 @@ def __create_dummy_data():
             }
     df = pd.DataFrame(data)
     return df
+
+
+def test_change_names_test_sums_wide():
+    # Sums are found among many columns also when pairs are compared in
+    # small chunks
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(rng.uniform(1, 1000, size=(200, 40)).round(2),
+                      columns=["test" + str(i) for i in range(40)])
+    df["test7"] = (df["test7"] / 10).round(2)
+    df["test31"] = df["test7"] + df["test23"]
+    colnames = df.columns.tolist()
+    res = cn.__find_sum_columns(df=df, colnames=colnames,
+                                cols=list(range(40)), max_values=1000)
+    assert res == {31: "total", 7: "vat_amount", 23: "price_ex_vat"}
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from osta.clean_data import clean_data
+import osta.clean_data as cd
 import pandas as pd
+import numpy as np
 from pandas.testing import assert_frame_equal
 import pytest
 import pkg_resources
@@ -119,7 +121,9 @@ def test_check_names_wrong_arguments():
         with pytest.raises(Exception):
             df = clean_data(df, service_data="test_file")
         # date_fomat does not raise errors, pandas can take different values
-        # and it is fed to it.
+        # and it is fed to it. However, it must be a string or None.
+        with pytest.raises(Exception):
+            df = clean_data(df, date_format=1)
         with pytest.raises(Exception):
             df = clean_data(df, country_format="test")
         with pytest.raises(Exception):
@@ -238,6 +242,21 @@ def test_clean_data_org():
     # Expect that are equal
     assert_frame_equal(df, df_expect)
 
+    data = {"org_number": ["020", "020", 5, "test"],
+            "org_name": ["Akaa", "Akaa", "Alajärvi", "test"],
+            }
+    df = pd.DataFrame(data)
+    # Expect a warning
+    with pytest.warns(Warning):
+        df = clean_data(df)
+    # Expected names; duplicated rows are matched similarly
+    data = {"org_number": ["020", "020", "005", "test"],
+            "org_name": ["Akaa", "Akaa", "Alajärvi", "test"],
+            }
+    df_expect = pd.DataFrame(data)
+    # Expect that are equal
+    assert_frame_equal(df, df_expect)
+
 
 def test_clean_data_suppl():
     data = {"suppl_number": [4844, 4833544, 4234344],
@@ -558,6 +577,13 @@ def test_clean_data_country():
     # Expect that are equal
     assert_frame_equal(df, df_expect)
 
+    # All names and codes are found; case insensitive search
+    ser = pd.Series(["suomi", "FIN", 246, "finland", "fi", None, "test"])
+    pos = cd.__find_countries(ser)
+    assert pos[0] >= 0
+    assert all(pos[0:5] == pos[0])
+    assert all(pos[5:7] == -1)
+
 
 def test_clean_data_date():
     data = {"date": ["10.h.2013", "12.12-12", "12.12.12"],
@@ -616,6 +642,52 @@ def test_clean_data_date():
     # Expect that are equal
     assert_frame_equal(df, df_expect)
 
+    # 7 characters; place of day and month is determined from all values.
+    # Dates that do not exist are converted to NaN.
+    data = {"date": ["3132012", "2122012", "31122012", "31022012"],
+            "test": ["0135202-4", "0135202-4", "test", "test"]
+            }
+    df = pd.DataFrame(data)
+    with pytest.warns(Warning):
+        df = clean_data(df)
+    data["date"] = ["31-03-2012", "21-02-2012", "31-12-2012", None]
+    df_expect = pd.DataFrame(data)
+    # Expect that are equal
+    assert_frame_equal(df, df_expect)
+
+    # Without date_format, dates are returned as datetime values
+    data = {"date": ["28.3.16", "12.12.21", "28.03.16"],
+            "test": ["0135202-4", "0135202-4", "test"]
+            }
+    df = pd.DataFrame(data)
+    df = clean_data(df, date_format=None)
+    date = pd.to_datetime(["2016-03-28", "2021-12-12", "2016-03-28"])
+    assert str(df["date"].dtype) == "datetime64[ns]"
+    assert df["date"].equals(pd.Series(date, name="date"))
+
+    # Dates in different formats
+    data = {"date": ["02.01.2023", "13.01.2023", "2023-01-02", "2023-12-31",
+                     "20230102", "20231231", None],
+            "test": ["0135202-4", "0135202-4", "test", "test", "test", "test",
+                     "test"]
+            }
+    df = pd.DataFrame(data)
+    df = clean_data(df, mixed_dates=True)
+    data["date"] = ["02-01-2023", "13-01-2023", "02-01-2023", "31-12-2023",
+                    "02-01-2023", "31-12-2023", None]
+    df_expect = pd.DataFrame(data)
+    # Expect that are equal
+    assert_frame_equal(df, df_expect)
+    # Dates that are not detected are converted to NaN
+    df = pd.DataFrame({"date": ["02.01.2023", "13.01.2023", "test"],
+                       "test": ["0135202-4", "0135202-4", "test"]})
+    with pytest.warns(Warning):
+        df = clean_data(df, mixed_dates=True)
+    assert df["date"].tolist()[0:2] == ["02-01-2023", "13-01-2023"]
+    assert pd.isna(df["date"].iloc[2])
+    with pytest.raises(Exception):
+        df = clean_data(df, mixed_dates=None)
+
     data = {"date": ["01122013", "3122012", "200212"],
             "test": ["0135202-4", "0135202-4", "test"]
             }
@@ -768,6 +840,42 @@ def test_clean_data_sums():
     assert_frame_equal(df, df_expect)
 
 
+def test_clean_data_missmatch_db():
+    # Column names that are part of other names are not mixed
+    values_db = pd.DataFrame({"vat_number": ["FI01352024", "FI02048198"],
+                              "number": ["1", "2"]})
+    pos = pd.DataFrame({"org_vat_number": [0.0], "org_number": [1.0]})
+    missmatch, missmatch_df = cd.__check_if_missmatch_db(
+        pos=pos, found=np.array([True]), col_used=np.array([0]),
+        row_pos=np.array([0]), values_db=values_db,
+        cols_to_check=["org_vat_number", "org_number"],
+        cols_to_match=["vat_number", "number"])
+    assert missmatch.tolist() == [True]
+    assert missmatch_df.iloc[:, 0].tolist() == ["1", "2"]
+
+
+def test_clean_data_replace_values():
+    df = pd.DataFrame({"name": ["a", "b", "a", None, "c", "b"],
+                       "number": [1, 2, 1, 4, 5, 2],
+                       })
+    old_values = df.drop_duplicates()
+    new_values = old_values.copy()
+    # a -> b and b -> c; values are replaced in order
+    new_values.iloc[0, 0] = "b"
+    new_values.iloc[1, 0] = "c"
+    # Rows with missing values are not replaced
+    new_values.iloc[2, 0] = "d"
+    res = cd.__replace_old_values_with_new(df=df.copy(),
+                                           old_values=old_values,
+                                           new_values=new_values,
+                                           cols_to_check=["name", "number"],
+                                           cols_to_match=["name", "number"])
+    df_ref = pd.DataFrame({"name": ["b", "c", "b", None, "c", "c"],
+                           "number": [1, 2, 1, 4, 5, 2],
+                           })
+    assert_frame_equal(res, df_ref)
+
+
 def __create_dummy_data():
     data = {"org_name": ["test", "testi", "test"],
             "org_number": [1, 2, 3],
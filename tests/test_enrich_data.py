@@ -7,8 +7,10 @@ from osta.enrich_data import fetch_org_company_data
 from osta.enrich_data import fetch_org_data
 import pandas as pd
 from pandas.testing import assert_frame_equal
+import osta.__http as http
 import pytest
 import requests
+import types
 
 
 def test_enrich_data_wrong_arguments():
@@ -153,6 +155,22 @@ def test_fetch_company_data_wrong_arguments():
         fetch_company_data(bids, temp_dir=1)
     with pytest.raises(Exception):
         fetch_company_data(bids, temp_dir=True)
+    with pytest.raises(Exception):
+        fetch_company_data(bids, n_workers=0)
+    with pytest.raises(Exception):
+        fetch_company_data(bids, n_workers=1.5)
+    with pytest.raises(Exception):
+        fetch_company_data(bids, n_workers=True)
+    with pytest.raises(Exception):
+        fetch_company_data(bids, rate_limit=0)
+    with pytest.raises(Exception):
+        fetch_company_data(bids, rate_limit="test")
+    with pytest.raises(Exception):
+        fetch_company_data(bids, rate_limit=True)
+    with pytest.raises(Exception):
+        fetch_company_data(bids, cache_ttl=0)
+    with pytest.raises(Exception):
+        fetch_company_data(bids, cache_ttl="test")
 
 
 def test_fetch_financial_data_wrong_arguments():
@@ -235,6 +253,10 @@ def test_fetch_org_company_data_wrong_arguments():
         fetch_org_company_data(codes, years, rename_cols="test")
     with pytest.raises(Exception):
         fetch_org_company_data(codes, years, rename_cols=None)
+    with pytest.raises(Exception):
+        fetch_org_company_data(codes, years, n_workers=0)
+    with pytest.raises(Exception):
+        fetch_org_company_data(codes, years, n_workers="test")
 
 
 def test_fetch_org_data_wrong_arguments():
@@ -354,6 +376,143 @@ def test_enrich_data():
     assert_frame_equal(df, df_expect)
 
 
+def test_fetch_company_data_concurrent(monkeypatch):
+    calls = []
+    __use_transport(monkeypatch, __create_fake_prh(calls))
+    bids = pd.Series(["1567535-0", "2403929-2", "test", "0135202-4"])
+    df = fetch_company_data(bids, only_ltd=True, use_cache=False,
+                            rate_limit=None)
+    df_par = fetch_company_data(bids, only_ltd=True, use_cache=False,
+                                n_workers=4, rate_limit=None)
+    assert_frame_equal(df, df_par)
+    assert df["bid"].tolist() == bids.tolist()
+    assert df["name"].tolist()[:2] == ["Company 1567535-0",
+                                       "Company 2403929-2"]
+    # Server is busy for the first request, and it is retried
+    calls.clear()
+    calls.append("busy")
+    df_retry = fetch_company_data(bids, only_ltd=True, use_cache=False,
+                                  n_workers=2, rate_limit=100)
+    assert_frame_equal(df, df_retry)
+    assert len(calls[1:]) == 5
+    assert calls[1:].count(bids[0]) == 2
+
+
+def test_fetch_company_data_nested_fields(monkeypatch):
+    calls = []
+    __use_transport(monkeypatch, __create_fake_prh(calls))
+    bids = pd.Series(["1567535-0", "test", "2403929-2"])
+    df = fetch_company_data(bids, only_ltd=True, use_cache=False,
+                            rate_limit=None)
+    # Columns are same regardless of found data
+    assert df.columns.tolist() == [
+        "bid", "name", "liquidation", "liquidation_date", "company_form",
+        "business_line", "muni", "old_bid"]
+    assert df["company_form"].tolist()[0] == "Osakeyhtiö"
+    assert df["muni"].tolist()[0] == "Helsinki"
+    assert df["old_bid"].tolist() == ["", "", "1234567-8, 1111111-1"]
+    assert df.loc[1, ["name", "company_form"]].isna().all()
+    df = fetch_company_data(bids, only_ltd=True, use_cache=False,
+                            rate_limit=None, merge_bid=False, language="fi")
+    assert df["vanha_bid"].tolist()[2] == "1234567-8"
+    assert df["vanha_bid_2"].tolist()[2] == "1111111-1"
+
+
+def test_fetch_company_data_cache(monkeypatch, tmp_path):
+    calls = []
+    __use_transport(monkeypatch, __create_fake_prh(calls))
+    bids = pd.Series(["1567535-0", "2403929-2", "test"])
+    df_expect = fetch_company_data(bids, only_ltd=True, use_cache=False,
+                                   rate_limit=None)
+    calls.clear()
+    df = fetch_company_data(bids[:2], only_ltd=True, temp_dir=str(tmp_path),
+                            rate_limit=None)
+    assert len(calls) == 2
+    # Found BIDs are got from cache, BID that was not found is searched again
+    calls.clear()
+    df = fetch_company_data(bids, only_ltd=True, temp_dir=str(tmp_path),
+                            rate_limit=None)
+    assert calls == ["test"]
+    assert_frame_equal(df, df_expect)
+    # Results depend on language
+    calls.clear()
+    fetch_company_data(bids[:2], only_ltd=True, temp_dir=str(tmp_path),
+                       rate_limit=None, language="fi")
+    assert len(calls) == 2
+
+
+def test_fetch_financial_data_catalogue(monkeypatch, tmp_path):
+    calls = []
+    __use_transport(monkeypatch, __create_fake_financial_db(calls))
+    codes = pd.Series(["0135202-4", "0135202-4", "test"])
+    years = pd.Series(["2021", "2020", "2021"])
+    with pytest.warns(Warning):
+        df = fetch_financial_data(codes, years, temp_dir=str(tmp_path))
+    # Catalogue is fetched only once and most ready report is used
+    assert sum(x.endswith("aineistot") for x in calls) == 1
+    assert "final/2021" in calls and "draft/2021" not in calls
+    assert df["bid"].tolist() == ["0135202-4"]
+    assert df["Tax revenue"].tolist() == [2021.0]
+    # Catalogue is loaded from cache if it is fresh
+    calls.clear()
+    with pytest.warns(Warning):
+        df_cache = fetch_financial_data(codes, years, temp_dir=str(tmp_path))
+    assert not any(x.endswith("aineistot") for x in calls)
+    assert_frame_equal(df, df_cache)
+    # Cache does not expire if time-to-live is None
+    with pytest.warns(Warning):
+        fetch_financial_data(codes, years, temp_dir=str(tmp_path),
+                             cache_ttl=None)
+    assert not any(x.endswith("aineistot") for x in calls)
+    # Catalogue is fetched again when cache is expired
+    calls.clear()
+    with pytest.warns(Warning):
+        fetch_financial_data(codes, years, temp_dir=str(tmp_path),
+                             cache_ttl=1e-12)
+    assert sum(x.endswith("aineistot") for x in calls) == 1
+    # Time-to-live is validated as in fetch_company_data
+    with pytest.raises(Exception):
+        fetch_financial_data(codes, years, cache_ttl="test")
+    with pytest.raises(Exception):
+        fetch_financial_data(codes, years, cache_ttl=0)
+
+
+def test_fetch_org_company_data_concurrent(monkeypatch):
+    calls = []
+    catalogue = [
+        {"ytunnus": "0204819-8", "raportointikausi": "2021",
+         "raportointikokonaisuus": "TOLT", "hyvaksymisvaihe": "Alustava",
+         "tolt_tiedot": "draft"},
+        {"ytunnus": "0204819-8", "raportointikausi": "2021",
+         "raportointikokonaisuus": "TOLT", "hyvaksymisvaihe": "Lopullinen",
+         "tolt_tiedot": "final"},
+        {"ytunnus": "0204819-8", "raportointikausi": "2021",
+         "raportointikokonaisuus": "HTOLT", "hyvaksymisvaihe": "Lopullinen",
+         "tolt_tiedot": "other"},
+        ]
+
+    def request(method, url, **args):
+        calls.append(url)
+        if url.endswith("tolt-aineistot"):
+            data = {"tolt_aineisto": catalogue}
+        else:
+            data = {"tolt_yksik\u00f6t": [
+                {"tolt_nimi": url + " Oy", "osuus_aanivallasta": "50.5"}]}
+        return __FakeResponse(200, data)
+    __use_transport(monkeypatch, request)
+    codes = pd.Series(["0204819-8", "test"])
+    years = pd.Series(["2021", "2021"])
+    df = fetch_org_company_data(codes, years, n_workers=3)
+    # Catalogue is fetched only once
+    assert sum(x.endswith("tolt-aineistot") for x in calls) == 1
+    assert sorted(calls[1:]) == ["final", "other"]
+    assert df["company_name"].tolist() == ["final Oy", "other Oy"]
+    assert df["share_vote"].tolist() == [50.5, 50.5]
+    assert df["org_bid"].tolist() == ["0204819-8", "0204819-8"]
+    df_seq = fetch_org_company_data(codes, years, n_workers=1)
+    assert_frame_equal(df, df_seq)
+
+
 def internet_connection_ok(url, timeout=5):
     try:
         request = requests.get(url, timeout=timeout)
@@ -425,3 +584,75 @@ def __create_dummy_data():
             }
     df = pd.DataFrame(data)
     return df
+
+
+class __FakeResponse:
+    def __init__(self, status_code, data, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = {} if headers is None else headers
+
+    def json(self):
+        return self.data
+
+
+def __create_fake_prh(calls):
+    def request(method, url, **args):
+        bid = url.split("/")[-1]
+        # Simulate busy server if it is requested
+        if calls and calls[-1] == "busy":
+            calls.append(bid)
+            return __FakeResponse(429, {}, {"Retry-After": "0"})
+        calls.append(bid)
+        results = []
+        if bid != "test":
+            results = [{
+                "businessId": bid,
+                "name": "Company " + bid,
+                "registrationDate": "2000-01-01",
+                "companyForm": "OY",
+                "liquidations": [],
+                "companyForms": [{"name": "Osakeyhtiö", "language": "FI",
+                                  "endDate": None}],
+                "businessLines": [],
+                "registedOffices": [{"name": "HELSINKI", "language": "EN",
+                                     "endDate": None}],
+                "businessIdChanges": [],
+                }]
+            if bid == "2403929-2":
+                results[0]["businessIdChanges"] = [
+                    {"oldBusinessId": "1234567-8", "language": None},
+                    {"oldBusinessId": "1111111-1", "language": None},
+                    ]
+        return __FakeResponse(200, {"results": results})
+    return request
+
+
+def __create_fake_financial_db(calls):
+    catalogue = [
+        {"ytunnus": "0135202-4", "raportointikausi": "2021",
+         "raportointikokonaisuus": "KKTR", "hyvaksymisvaihe": "Alustava",
+         "tunnusluvut": "draft/2021"},
+        {"ytunnus": "0135202-4", "raportointikausi": "2021",
+         "raportointikokonaisuus": "KKTR",
+         "hyvaksymisvaihe": "Hyv\u00e4ksytty", "tunnusluvut": "final/2021"},
+        ]
+    taxonomy = [{"tunnusluku": "Verotulot", "solutunniste": "1",
+                 "tunnusluku_en": "Tax revenue", "tunnusluku_sv": "Skatt"}]
+
+    def request(method, url, **args):
+        calls.append(url)
+        if url.endswith("aineistot"):
+            data = {"aineistot": catalogue}
+        elif url.endswith(".json"):
+            data = taxonomy
+        else:
+            data = [{"tunnusluku": "1", "arvo": url.split("/")[-1]}]
+        return __FakeResponse(200, data)
+    return request
+
+
+def __use_transport(monkeypatch, request):
+    # Replace the network with a function that creates responses
+    transport = types.SimpleNamespace(request=request)
+    monkeypatch.setitem(http.__CLIENT, "transport", transport)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import osta.__http as http
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import threading
+import time
+import types
+
+
+def test_http_transport():
+    calls = []
+
+    def request(method, url, **args):
+        calls.append((method, url, args))
+        return types.SimpleNamespace(status_code=200, headers={})
+    transport = types.SimpleNamespace(request=request)
+    previous = http.__set_transport(transport)
+    try:
+        r = http.__request("GET", "https://test.fi/a")
+        http.__request("POST", "https://test.fi/b", json={"a": 1},
+                       timeout=1)
+        assert r.status_code == 200
+        # Default timeout is used if it is not specified
+        assert calls[0] == ("GET", "https://test.fi/a",
+                            {"timeout": http.__DEFAULT_TIMEOUT})
+        assert calls[1] == ("POST", "https://test.fi/b",
+                            {"json": {"a": 1}, "timeout": 1})
+        assert http.__set_transport(None) is transport
+        with pytest.raises(Exception):
+            http.__set_transport("test")
+    finally:
+        http.__set_transport(previous)
+
+
+def test_http_session():
+    session = http.__create_session(pool_size=3)
+    assert "gzip" in session.headers["Accept-Encoding"]
+    adapter = session.get_adapter("https://avoindata.prh.fi")
+    assert adapter._pool_maxsize == 3
+    session.close()
+
+
+def test_http_retry_and_host_limit():
+    lock = threading.Lock()
+    state = {"active": {}, "max": {}, "calls": 0}
+
+    def request(method, url, **args):
+        host = url.split("/")[2]
+        with lock:
+            state["calls"] += 1
+            status = 503 if state["calls"] == 1 else 200
+            state["active"][host] = state["active"].get(host, 0) + 1
+            state["max"][host] = max(state["max"].get(host, 0),
+                                     state["active"][host])
+        time.sleep(0.01)
+        with lock:
+            state["active"][host] -= 1
+        return types.SimpleNamespace(status_code=status, headers={})
+    previous = http.__set_transport(types.SimpleNamespace(request=request))
+    try:
+        urls = ["https://a.fi/" + str(i) for i in range(40)]
+        urls.extend(["https://b.fi/" + str(i) for i in range(40)])
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            res = list(executor.map(
+                lambda x: http.__request("GET", x, backoff=0.01), urls))
+        # Server error is retried
+        assert all(r.status_code == 200 for r in res)
+        assert state["calls"] == len(urls) + 1
+        # Number of concurrent requests per host is limited
+        assert max(state["max"].values()) <= http.__MAX_CONNECTIONS_PER_HOST
+        assert min(state["max"].values()) > 1
+    finally:
+        http.__set_transport(previous)
+
+
+def test_http_retry_after():
+    def response(value):
+        return types.SimpleNamespace(headers={"Retry-After": value})
+    assert http.__get_retry_after(response("2")) == 2.0
+    assert http.__get_retry_after(response("1000")) == 60.0
+    # Negative wait is not waited, and invalid values are ignored
+    assert http.__get_retry_after(response("-5")) == 0.0
+    assert http.__get_retry_after(response("nan")) is None
+    assert http.__get_retry_after(response("inf")) is None
+    assert http.__get_retry_after(response("test")) is None
+    assert http.__get_retry_after(
+        types.SimpleNamespace(headers={})) is None
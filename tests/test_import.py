@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import subprocess
+import pytest
+import sys
+import os
+
+
+def test_import_lazy_dependencies():
+    # Heavy optional dependencies are not imported with osta. They are
+    # imported only when they are needed.
+    code = ("import sys; import osta.clean_data, osta.change_names, "
+            "osta.enrich_data; print(','.join(sorted(sys.modules)))")
+    res = subprocess.run([sys.executable, "-c", code],
+                         capture_output=True, text=True, check=True)
+    modules = res.stdout.strip().split(",")
+    for module in ["selenium", "requests", "urllib3", "fuzzywuzzy",
+                   "Levenshtein", "bs4", "pkg_resources", "http.server",
+                   "osta.__replay"]:
+        assert module not in modules
+
+
+# Wall-clock time depends on the machine, so the test is run only if it is
+# requested with environment variable OSTA_TEST_IMPORT_TIME
+@pytest.mark.skipif(not os.environ.get("OSTA_TEST_IMPORT_TIME"),
+                    reason="Set OSTA_TEST_IMPORT_TIME to measure import time")
+def test_import_time():
+    # Measure import time of osta with 'python -X importtime'. pandas and
+    # numpy are imported first so that only osta's own cost is measured.
+    code = ("import pandas, numpy; import osta.clean_data, "
+            "osta.change_names, osta.enrich_data")
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                         capture_output=True, text=True, check=True)
+    # Get cumulative import times (microseconds) of top-level osta modules
+    times = {}
+    for line in res.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].startswith(" osta"):
+            times[fields[2].strip()] = int(fields[1])
+    assert all(x in times for x in ["osta.clean_data", "osta.change_names",
+                                    "osta.enrich_data"])
+    # Import time budget: 1 s
+    assert sum(times.values()) < 1000000
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from osta.enrich_data import fetch_company_data
+import osta.__http as http
+import osta.__replay as replay
+from pandas.testing import assert_frame_equal
+import pandas as pd
+import pytest
+import requests
+import json
+import os
+import types
+
+
+def test_replay(tmp_path):
+    fixture_dir = str(tmp_path / "fixtures")
+    bids = pd.Series(["1567535-0", "2403929-2", "test"])
+    # Record responses of fake server
+    calls = []
+    transport = replay.__create_recording_transport(
+        fixture_dir, transport=__create_fake_prh(calls))
+    previous = http.__set_transport(transport)
+    try:
+        df = fetch_company_data(bids, only_ltd=True, use_cache=False)
+        res = transport.request("POST", "https://test.fi/a", json={"a": 1})
+        assert res.json() == {"a": 1}
+        assert len(calls) == 4
+        assert len(os.listdir(fixture_dir)) == 4
+        # Replay responses without network
+        http.__set_transport(replay.__create_replay_transport(fixture_dir))
+        df_replay = fetch_company_data(bids, only_ltd=True, use_cache=False)
+        assert_frame_equal(df, df_replay)
+        res = http.__request("POST", "https://test.fi/a", json={"a": 1})
+        assert res.json() == {"a": 1}
+        with pytest.raises(Exception):
+            http.__request("POST", "https://test.fi/a", json={"a": 2})
+        assert len(calls) == 4
+    finally:
+        http.__set_transport(previous)
+
+
+def test_replay_server(tmp_path):
+    fixture_dir = str(tmp_path / "fixtures")
+    bids = pd.Series(["1567535-0", "2403929-2", "test"])
+    calls = []
+    transport = replay.__create_recording_transport(
+        fixture_dir, transport=__create_fake_prh(calls))
+    previous = http.__set_transport(transport)
+    try:
+        df = fetch_company_data(bids, only_ltd=True, use_cache=False)
+    finally:
+        http.__set_transport(previous)
+    # Serve fixtures from local server with latency and server errors
+    server = replay.__start_fixture_server(
+        fixture_dir, latency=(0, 0.01), error_rate=0.2, seed=1)
+    previous = http.__set_transport(replay.__create_server_transport(server))
+    try:
+        df_server = fetch_company_data(bids, only_ltd=True, use_cache=False)
+        assert_frame_equal(df, df_server)
+        res = http.__request("GET", "https://avoindata.prh.fi/bis/v1/x",
+                             max_retries=10, backoff=0)
+        assert res.status_code == 404
+    finally:
+        http.__set_transport(previous)
+        server.shutdown()
+        server.server_close()
+    with pytest.raises(Exception):
+        replay.__start_fixture_server(fixture_dir, latency=-1)
+    with pytest.raises(Exception):
+        replay.__start_fixture_server(fixture_dir, error_rate=2)
+
+
+def __create_fake_prh(calls):
+    def request(method, url, **args):
+        calls.append(url)
+        if "json" in args:
+            data = args["json"]
+        elif url.endswith("test"):
+            data = {"results": []}
+        else:
+            data = {"results": [{"businessId": url.split("/")[-1],
+                                 "name": "Company"}]}
+        res = requests.models.Response()
+        res.status_code = 200
+        res.headers["Content-Type"] = "application/json"
+        res._content = json.dumps(data).encode("utf-8")
+        return res
+    res = types.SimpleNamespace(request=request)
+    return res
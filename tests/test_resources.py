@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import osta.__resources as resources
+import pandas as pd
+from pandas.testing import assert_frame_equal
+import pkg_resources
+import hashlib
+import json
+import os
+
+
+def test_resources_load():
+    resources.__clear_resource_cache()
+    path = pkg_resources.resource_filename("osta", "resources/" +
+                                           "land_codes.csv")
+    df_expect = pd.read_csv(path, index_col=0)
+    df = resources.__load_resource("land_codes.csv", index_col=0)
+    assert_frame_equal(df, df_expect)
+    # Modifying the result does not modify the cache
+    df.iloc[0, 0] = "test"
+    df = resources.__load_resource("land_codes.csv", index_col=0)
+    assert_frame_equal(df, df_expect)
+    # Different arguments give different table
+    df = resources.__load_resource("land_codes.csv", index_col=0, dtype=str)
+    assert df["code_num"].dtype == "object"
+
+
+def test_resources_keys():
+    resources.__clear_resource_cache()
+    df = resources.__load_resource_keys("land_codes.csv",
+                                        cols=["name_fin", "code_2char"],
+                                        index_col=0)
+    assert df.columns.tolist() == ["name_fin", "code_2char"]
+    assert "fi" in df["code_2char"].tolist()
+    assert "suomi" in df["name_fin"].tolist()
+
+
+def test_resources_compiled():
+    resources.__clear_resource_cache()
+    path = resources.__compile_resource("optional_fields.csv")
+    path_meta = os.path.splitext(path)[0] + ".json"
+    try:
+        df_expect = resources.__load_resource("optional_fields.csv")
+        df_test = pd.DataFrame({"key": ["test"], "value": ["test"]})
+        sha1 = resources.__get_file_hash(resources.__get_resource_path(
+            "optional_fields.csv"))
+        # Artifact that is not up-to-date is not used
+        resources.__write_compiled_resource(path, df_test, "test")
+        resources.__clear_resource_cache()
+        df = resources.__load_resource("optional_fields.csv")
+        assert_frame_equal(df, df_expect)
+        # Up-to-date artifact is used
+        resources.__write_compiled_resource(path, df_test, sha1)
+        resources.__clear_resource_cache()
+        df = resources.__load_resource("optional_fields.csv")
+        assert df["key"].tolist() == ["test"]
+        # Artifact that does not match with metadata is not unpickled
+        with open(path, "wb") as f:
+            f.write(b"test")
+        resources.__clear_resource_cache()
+        df = resources.__load_resource("optional_fields.csv")
+        assert_frame_equal(df, df_expect)
+        # Artifact that fails to load is not used
+        content = b"\x80\x04costa_test_module\ntest\n."
+        with open(path, "wb") as f:
+            f.write(content)
+        with open(path_meta) as f:
+            metadata = json.load(f)
+        metadata["artifact_sha1"] = hashlib.sha1(content).hexdigest()
+        with open(path_meta, "w") as f:
+            json.dump(metadata, f)
+        resources.__clear_resource_cache()
+        df = resources.__load_resource("optional_fields.csv")
+        assert_frame_equal(df, df_expect)
+        # Artifact without metadata is not used
+        resources.__write_compiled_resource(path, df_test, sha1)
+        os.remove(path_meta)
+        resources.__clear_resource_cache()
+        df = resources.__load_resource("optional_fields.csv")
+        assert_frame_equal(df, df_expect)
+    finally:
+        for x in [path, path_meta]:
+            if os.path.isfile(x):
+                os.remove(x)
+        resources.__clear_resource_cache()
+
+
+def test_resources_compiled_cache_dir(monkeypatch, tmp_path):
+    # If resources of the package are not writable, artifact is stored in
+    # cache directory of user
+    resources.__clear_resource_cache()
+    res_dir = os.path.dirname(pkg_resources.resource_filename(
+        "osta", "resources/optional_fields.csv"))
+    access = os.access
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(os, "access", lambda path, mode: (
+        os.path.abspath(path) != os.path.abspath(res_dir) and
+        access(path, mode)))
+    path = resources.__compile_resource("optional_fields.csv")
+    try:
+        assert os.path.dirname(path) == str(tmp_path / "osta")
+        # Artifact is used from the cache directory
+        sha1 = resources.__get_file_hash(resources.__get_resource_path(
+            "optional_fields.csv"))
+        resources.__write_compiled_resource(
+            path, pd.DataFrame({"key": ["test"], "value": ["test"]}), sha1)
+        df = resources.__load_resource("optional_fields.csv")
+        assert df["key"].tolist() == ["test"]
+    finally:
+        os.remove(path)
+        os.remove(os.path.splitext(path)[0] + ".json")
+        resources.__clear_resource_cache()
+    # If no directory is writable, artifact is not stored
+    monkeypatch.setattr(os, "access", lambda path, mode: False)
+    assert resources.__compile_resource("optional_fields.csv") is None
@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 import osta.__utils as utils
 import pandas as pd
+import pytest
+from fuzzywuzzy import fuzz
 
 
 def test_utils_df():
@@ -44,6 +46,11 @@ def test_utils_bid():
     assert all(utils.__are_valid_bids(ser)) is True
     ser = pd.Series(["0135dd2-4", "0135ff2-4", "0135442-4"])
     assert all(utils.__are_valid_bids(ser)) is False
+    ser = pd.Series(["0204819-8", None, "0135202-5", 1352024, "0135202-4"],
+                    index=[4, 2, 0, 1, 3])
+    res = utils.__are_valid_bids(ser)
+    assert res.index.tolist() == [4, 2, 0, 1, 3]
+    assert res.tolist() == [True, False, False, False, True]
 
 
 def test_utils_vat_number():
@@ -51,6 +58,45 @@ def test_utils_vat_number():
     assert all(utils.__are_valid_vat_numbers(ser)) is True
     ser = pd.Series(["0135332-4", "0135332-4", "0135442-4"])
     assert all(utils.__are_valid_vat_numbers(ser)) is False
+    ser = pd.Series(["CZ123456789", "hu 12345678 9", "DE136695976",
+                     "FI01352025", None])
+    res = utils.__are_valid_vat_numbers(ser)
+    assert res.tolist() == [True, True, True, True, False]
+    ser = pd.Series(["FI01352024", "FI01352025", "DE136695976",
+                     "DE136695977", "IT00743110157", "NL004495445B01",
+                     "SE556036079301", "BE0403170701", "PL5260001246",
+                     "CZ123456789"])
+    res = utils.__are_valid_vat_numbers(ser, check_checksum=True)
+    assert res.tolist() == [True, False, True, False, True, True, True,
+                            True, True, True]
+    # Digits that are not ASCII are not valid
+    ser = pd.Series(["FI\uff10\uff11\uff13\uff15\uff12\uff10\uff12\uff14",
+                     "FI01352024"])
+    res = utils.__are_valid_vat_numbers(ser, check_checksum=True)
+    assert res.tolist() == [False, True]
+    res = utils.__are_valid_vat_numbers(ser)
+    assert res.tolist() == [False, True]
+
+
+def test_utils_fuzzy_index():
+    ser = pd.Series(["Turun kaupunki", "Akaa", None, "Turun kaupunki",
+                     "Alajärven kunta"])
+    index = utils.__build_fuzzy_index(ser)
+    assert index["names"] == ["Turun kaupunki", "Akaa", "Alajärven kunta"]
+    res = utils.__fuzzy_index_extract_one(
+        "kaupunki Turun", index, scorer=fuzz.token_sort_ratio)
+    assert res == ["Turun kaupunki", 100, 0]
+    res = utils.__fuzzy_index_extract_one(
+        "Alajärvi kunta", index, scorer=fuzz.token_sort_ratio,
+        score_cutoff=70)
+    assert res[0] == "Alajärven kunta" and res[2] == 4
+    res = utils.__fuzzy_index_extract_one(
+        "Akaan seurakunta", index, scorer=fuzz.token_sort_ratio,
+        score_cutoff=90)
+    assert res is None
+    res = utils.__fuzzy_index_extract_one(
+        "xyz", index, scorer=fuzz.token_sort_ratio)
+    assert res is None
 
 
 def test_utils_voucher():
@@ -64,6 +110,80 @@ def test_utils_voucher():
     assert utils.__test_if_voucher(df, 7, df.columns.tolist()) is True
 
 
+def test_utils_column_profile():
+    df = pd.Series(["1234567-8", "0201256-6", None, "0201256-6", "2.4.2023"])
+    profile = utils.__create_column_profile(df)
+    assert profile["n"] == 5
+    assert profile["n_not_null"] == 4
+    assert profile["null_ratio"] == 0.2
+    assert profile["values"].tolist() == ["1234567-8", "0201256-6", "2.4.2023"]
+    assert profile["counts"].tolist() == [1, 2, 1]
+    assert profile["lengths"].tolist() == [9, 9, 8]
+    assert profile["length_hist"] == {8: 1, 9: 3}
+    assert profile["digit_ratio"] == 0
+    # Patterns are detected only for unique values
+    assert "bid" not in profile
+    assert utils.__get_profile_item(profile, "bid").tolist() == [
+        False, True, False]
+    assert utils.__get_profile_item(profile, "date")[2]
+    assert utils.__get_profile_ratio(
+        profile, utils.__get_profile_item(profile, "bid")) == 0.4
+    assert utils.__get_profile_ratio(
+        profile, profile["lengths"] == 9, n=profile["n_not_null"]) == 0.75
+    with pytest.raises(Exception):
+        utils.__get_profile_item(profile, "test")
+    # Date is detected in same way with and without the profile
+    df = pd.Series(["02.04.2023", None, "02.10.2023", "02.04.2023"])
+    profile = utils.__create_column_profile(df)
+    assert utils.__test_if_date(df) is True
+    assert utils.__test_if_date(df, profile=profile) is True
+    df = pd.Series(["02.04.2023", "test"])
+    assert utils.__test_if_date(df) is False
+
+
+def test_utils_header_scores():
+    res = utils.__normalize_headers(["Päivämäärä ", "ALV-määrä", "Åland_1"])
+    assert res.tolist() == ["paivamaara", "alv maara", "aland_1"]
+    keys = ["tositepäivämäärä", "TOSITEPÄIVÄMÄÄRÄ", "summa"]
+    header_scores = utils.__score_headers(
+        ["Tositepaivamaara", "summa", "---"], keys, utils.__token_sort_ratio)
+    # Names that are same after normalization are scored only once
+    assert header_scores["scores"].shape == (3, 2)
+    assert utils.__get_header_match(
+        header_scores, "Tositepaivamaara") == ["tositepäivämäärä", 100]
+    assert utils.__get_header_match(header_scores, "summa") == ["summa", 100]
+    assert utils.__get_header_match(header_scores, "---")[1] == 0
+    assert utils.__get_header_match(header_scores, "test") is None
+    # Only pairs that can be the best match are scored with known scorer.
+    # The result is same as when all the pairs are scored.
+    headers = ["tositepvm", "summa alv", "kunta nro", "toimittaja", "x"]
+    keys = ["tositepäivämäärä", "summa", "alv", "kunnan numero", "kunta",
+            "toimittajan nimi", "toimittaja", "y"]
+    header_scores = utils.__score_headers(headers, keys,
+                                          utils.__token_sort_ratio)
+    header_scores_all = utils.__score_headers(
+        headers, keys, lambda x, y: utils.__token_sort_ratio(x, y))
+    for header in headers:
+        assert (utils.__get_header_match(header_scores, header) ==
+                utils.__get_header_match(header_scores_all, header))
+
+
+def test_utils_column_relations():
+    df = pd.DataFrame({"a": [1, 1, 2, 2, None],
+                       "b": ["x", "x", "y", "z", "z"],
+                       "c": [1.5, 1.5, 1.5, None, 2.5],
+                       })
+    relations = utils.__create_column_relations(df)
+    for cols in [[0], [1], [0, 1], [1, 2], [0, 1, 2], [2, 0, 0]]:
+        ref = df.iloc[:, sorted(set(cols))].dropna().drop_duplicates()
+        assert utils.__get_n_unique_rows(relations, cols) == ref.shape[0]
+    # "b" determines "a", but "a" does not determine "b"
+    assert utils.__column_determines(relations, 1, 0)
+    assert not utils.__column_determines(relations, 0, 1)
+    # Combinations are calculated only once
+    assert (1, 2) in relations["n_unique"]
+
+
 def __create_dummy_data():
     data = {"org_name": ["test", "testi", "test"],
             "org_number": [1, 2, 3],